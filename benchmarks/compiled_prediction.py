@@ -0,0 +1,91 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Compares LudwigModel.predict and LudwigModel.predict_batch on small
+batches of rows of a csv: checks that the predictions are the same and
+prints the mean time per call of each."""
+import argparse
+import time
+
+import numpy as np
+
+from ludwig.api import LudwigModel
+from ludwig.utils.data_utils import read_csv
+
+
+def time_calls(function, repeats):
+    start_time = time.time()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.time() - start_time) / repeats
+
+
+def same_column(expected, actual):
+    expected = np.asarray(list(expected))
+    actual = np.asarray(list(actual))
+    if expected.dtype.kind in 'fc':
+        return np.allclose(expected, actual, rtol=1e-5, atol=1e-6)
+    return np.array_equal(expected, actual)
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description='Benchmark predict_batch against predict'
+    )
+    parser.add_argument('model_path')
+    parser.add_argument('data_csv')
+    parser.add_argument('--batch_sizes', type=int, nargs='+',
+                        default=[1, 10, 100])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    ludwig_model = LudwigModel.load(args.model_path)
+    input_names = [feature['name'] for feature in
+                   ludwig_model.model_definition['input_features']]
+    data_df = read_csv(args.data_csv)[input_names]
+
+    print('{:>8}{:>14}{:>18}{:>10}{:>8}'.format(
+        'rows', 'predict ms', 'predict_batch ms', 'speedup', 'same'
+    ))
+    for batch_size in args.batch_sizes:
+        batch_df = data_df[:batch_size].reset_index(drop=True)
+        records = batch_df.to_dict(orient='records')
+
+        expected, predict_time = time_calls(
+            lambda: ludwig_model.predict(data_df=batch_df.copy()),
+            args.repeats
+        )
+        actual, predict_batch_time = time_calls(
+            lambda: ludwig_model.predict_batch(records),
+            args.repeats
+        )
+        same = (list(expected.columns) == list(actual) and
+                all(same_column(expected[name], actual[name])
+                    for name in expected.columns))
+
+        print('{:>8}{:>14.2f}{:>18.2f}{:>9.1f}x{:>8}'.format(
+            len(batch_df),
+            predict_time * 1000.0,
+            predict_batch_time * 1000.0,
+            predict_time / predict_batch_time,
+            'yes' if same else 'NO'
+        ))
+
+    ludwig_model.close()
+
+
+if __name__ == '__main__':
+    cli()
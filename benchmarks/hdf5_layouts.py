@@ -0,0 +1,124 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Compares the size on disk and the read throughput of preprocessed data
+written with different dtypes, chunk shapes and compression filters: the
+int32 / float64 layout used before vocabulary aware dtypes, and the compact
+dtypes with h5py guessed chunks, batch aligned chunks, gzip and lzf."""
+import argparse
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as np
+from scipy import sparse
+
+from ludwig.utils.data_utils import load_hdf5_value
+from ludwig.utils.data_utils import save_hdf5
+from ludwig.utils.math_utils import int_type
+
+
+def random_data(num_rows, length, vocab_size, random_seed=42):
+    random_state = np.random.RandomState(random_seed)
+    # zipfian ids with right padding, as in sequence and text features
+    ids = np.minimum(
+        random_state.zipf(1.3, (num_rows, length)),
+        vocab_size - 1
+    )
+    lengths = random_state.randint(1, length + 1, num_rows)
+    ids[np.arange(length)[None, :] >= lengths[:, None]] = 0
+    bag = sparse.csr_matrix(
+        (np.ones(num_rows * 10), (
+            np.repeat(np.arange(num_rows), 10),
+            np.minimum(random_state.zipf(1.3, num_rows * 10), vocab_size - 1)
+        )),
+        shape=(num_rows, vocab_size)
+    )
+    bag.sum_duplicates()
+    return ids, bag
+
+
+def read_batches(data_hdf5_fp, batch_size, num_batches, num_rows):
+    random_state = np.random.RandomState(0)
+    with h5py.File(data_hdf5_fp, 'r') as h5_file:
+        dataset = h5_file['sequence']
+        start_time = time.time()
+        for _ in range(num_batches):
+            start = random_state.randint(0, num_rows - batch_size)
+            dataset[start:start + batch_size]
+        batch_time = time.time() - start_time
+
+        start_time = time.time()
+        for key in h5_file.keys():
+            load_hdf5_value(h5_file[key])
+        load_time = time.time() - start_time
+    return num_batches * batch_size / batch_time, num_rows / load_time
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description='Benchmark hdf5 layouts of preprocessed data'
+    )
+    parser.add_argument('--num_rows', type=int, default=200000)
+    parser.add_argument('--length', type=int, default=50)
+    parser.add_argument('--vocab_size', type=int, default=20000)
+    parser.add_argument('--batch_size', type=int, default=128)
+    parser.add_argument('--num_batches', type=int, default=1000)
+    args = parser.parse_args()
+
+    ids, bag = random_data(args.num_rows, args.length, args.vocab_size)
+    compact = {
+        'sequence': ids.astype(int_type(args.vocab_size)),
+        'bag': bag.astype(np.float32)
+    }
+    layouts = [
+        ('int32/float64', {
+            'sequence': ids.astype(np.int32),
+            'bag': bag.astype(np.float64)
+        }, {}),
+        ('compact', compact, {}),
+        ('compact, batch chunks', compact,
+         {'chunk_rows': args.batch_size}),
+        ('compact, batch chunks, gzip', compact,
+         {'chunk_rows': args.batch_size, 'compression': 'gzip'}),
+        ('compact, batch chunks, lzf', compact,
+         {'chunk_rows': args.batch_size, 'compression': 'lzf'}),
+    ]
+
+    print('{:<30}{:>12}{:>16}{:>16}'.format(
+        'layout', 'size (MB)', 'batch rows/s', 'load rows/s'
+    ))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i, (name, data, options) in enumerate(layouts):
+            data_hdf5_fp = os.path.join(tmpdir, '{}.hdf5'.format(i))
+            save_hdf5(data_hdf5_fp, data, **options)
+            batch_throughput, load_throughput = read_batches(
+                data_hdf5_fp,
+                args.batch_size,
+                args.num_batches,
+                args.num_rows
+            )
+            print('{:<30}{:>12.1f}{:>16.0f}{:>16.0f}'.format(
+                name,
+                os.path.getsize(data_hdf5_fp) / (1024 * 1024),
+                batch_throughput,
+                load_throughput
+            ))
+
+
+if __name__ == '__main__':
+    cli()
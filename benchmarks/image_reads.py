@@ -0,0 +1,103 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Compares images per second read by Dataset.get for image features that are
+not in memory against opening the hdf5 file and reading with sorted fancy
+indexing on every batch."""
+import argparse
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+from ludwig.data.dataset import Dataset
+
+
+def reopen_and_fancy_index(data_hdf5_fp, feature_name, sub_batch):
+    indices = np.empty((3, len(sub_batch)), dtype=np.int64)
+    indices[0, :] = sub_batch
+    indices[1, :] = np.arange(len(sub_batch))
+    indices = indices[:, np.argsort(indices[0])]
+
+    with h5py.File(data_hdf5_fp, 'r') as h5_file:
+        im_data = h5_file[feature_name + '_data'][indices[0, :], :, :]
+    indices[2, :] = np.arange(len(sub_batch))
+    indices = indices[:, np.argsort(indices[1])]
+    return im_data[indices[2, :]]
+
+
+def benchmark(read_batch, num_images, batch_size, num_batches):
+    permutation = np.random.permutation(num_images)
+    start_time = time.time()
+    for i in range(num_batches):
+        start = (i * batch_size) % (num_images - batch_size)
+        read_batch(permutation[start:start + batch_size])
+    return num_batches * batch_size / (time.time() - start_time)
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description='Benchmark reads of images that are not in memory'
+    )
+    parser.add_argument('--num_images', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--num_channels', type=int, default=3)
+    parser.add_argument('--batch_size', type=int, default=128)
+    parser.add_argument('--num_batches', type=int, default=100)
+    args = parser.parse_args()
+
+    feature = {'name': 'image', 'type': 'image', 'in_memory': False}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_hdf5_fp = os.path.join(tmpdir, 'images.hdf5')
+        with h5py.File(data_hdf5_fp, 'w') as h5_file:
+            image_dataset = h5_file.create_dataset(
+                'image_data',
+                (args.num_images, args.size, args.size, args.num_channels),
+                dtype=np.uint8
+            )
+            for i in range(0, args.num_images, 1000):
+                num = min(1000, args.num_images - i)
+                image_dataset[i:i + num] = np.random.randint(
+                    0, 256,
+                    (num, args.size, args.size, args.num_channels),
+                    dtype=np.uint8
+                )
+
+        dataset = Dataset(
+            {'image': np.arange(args.num_images)},
+            [feature],
+            [],
+            data_hdf5_fp
+        )
+
+        baseline = benchmark(
+            lambda idx: reopen_and_fancy_index(data_hdf5_fp, 'image', idx),
+            args.num_images, args.batch_size, args.num_batches
+        )
+        current = benchmark(
+            lambda idx: dataset.get('image', idx),
+            args.num_images, args.batch_size, args.num_batches
+        )
+
+    print('reopen and fancy index: {:.1f} images/s'.format(baseline))
+    print('Dataset.get:            {:.1f} images/s'.format(current))
+    print('speedup:                {:.2f}x'.format(current / baseline))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,114 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Compares the training examples per second of a small tabular model fed
+through feed_dict and through the tf.data input pipeline."""
+import argparse
+import time
+
+import numpy as np
+
+from ludwig.data.dataset import Dataset
+from ludwig.models.model import Model
+from ludwig.utils.defaults import merge_with_defaults
+
+
+def random_dataset(model_definition, num_rows, random_seed=42):
+    random_state = np.random.RandomState(random_seed)
+    data = {}
+    for feature in model_definition['input_features']:
+        if feature['type'] == 'binary':
+            data[feature['name']] = random_state.rand(num_rows) > 0.5
+        else:
+            data[feature['name']] = random_state.randn(num_rows).astype(
+                np.float32
+            )
+    for feature in model_definition['output_features']:
+        data[feature['name']] = random_state.rand(num_rows) > 0.5
+    return Dataset(
+        data,
+        model_definition['input_features'],
+        model_definition['output_features'],
+        None
+    )
+
+
+def benchmark(model_definition, dataset, batch_size, epochs):
+    model = Model(
+        model_definition['input_features'],
+        model_definition['output_features'],
+        model_definition['combiner'],
+        model_definition['training'],
+        model_definition['preprocessing']
+    )
+    session = model.initialize_session()
+    batcher = model.initialize_batcher(dataset, batch_size)
+
+    start_time = time.time()
+    for _ in range(epochs):
+        while not batcher.last_batch():
+            batch = batcher.next_batch()
+            session.run(
+                model.optimize,
+                feed_dict=model.feed_dict(
+                    batch,
+                    learning_rate=0.001,
+                    is_training=True
+                )
+            )
+        batcher.reset()
+    examples_per_second = epochs * dataset.size / (time.time() - start_time)
+    model.close_session()
+    return examples_per_second
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description='Benchmark feed_dict against the tf.data input pipeline'
+    )
+    parser.add_argument('--num_rows', type=int, default=200000)
+    parser.add_argument('--num_features', type=int, default=50)
+    parser.add_argument('--batch_size', type=int, default=4096)
+    parser.add_argument('--epochs', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{:<12}{:>16}'.format('input', 'examples/s'))
+    for input_pipeline in ('feed_dict', 'tf_data'):
+        model_definition = merge_with_defaults({
+            'input_features': [
+                {
+                    'name': 'feature_{}'.format(i),
+                    'type': 'numerical' if i % 2 else 'binary'
+                }
+                for i in range(args.num_features)
+            ],
+            'output_features': [{'name': 'label', 'type': 'binary'}],
+            'training': {'input_pipeline': input_pipeline}
+        })
+        dataset = random_dataset(model_definition, args.num_rows)
+        print('{:<12}{:>16.0f}'.format(
+            input_pipeline,
+            benchmark(
+                model_definition,
+                dataset,
+                args.batch_size,
+                args.epochs
+            )
+        ))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Compares rows per second of postprocessing random category and sequence
+predictions into a DataFrame, mapping them element by element and with the
+vectorized postprocess_df, and checks that both build the same DataFrame."""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ludwig.constants import *
+from ludwig.data.postprocessing import postprocess_df
+from ludwig.features.feature_utils import trim_to_lengths
+
+
+def random_outputs(num_rows, vocab_size, max_length, top_k, random_seed=42):
+    random_state = np.random.RandomState(random_seed)
+    idx2str = ['unit_{}'.format(i) for i in range(vocab_size)]
+    probabilities = random_state.rand(num_rows, vocab_size).astype(np.float32)
+    lengths = random_state.randint(1, max_length + 1, size=num_rows)
+    sequence_probabilities = random_state.rand(
+        num_rows, max_length, vocab_size
+    ).astype(np.float32)
+    sequence_predictions = np.argmax(sequence_probabilities, axis=-1)
+    output = {
+        'category': {
+            PREDICTIONS: np.argmax(probabilities, axis=1),
+            PROBABILITIES: probabilities,
+            'predictions_top_k': np.argsort(
+                -probabilities, axis=1
+            )[:, :top_k]
+        },
+        'sequence': {
+            PREDICTIONS: trim_to_lengths(sequence_predictions, lengths),
+            LAST_PREDICTIONS: sequence_predictions[
+                np.arange(num_rows), lengths - 1
+            ],
+            PROBABILITIES: trim_to_lengths(sequence_probabilities, lengths),
+            LENGTHS: lengths
+        }
+    }
+    output_features = [
+        {'name': 'category', 'type': CATEGORY},
+        {'name': 'sequence', 'type': SEQUENCE}
+    ]
+    metadata = {
+        'category': {'idx2str': idx2str},
+        'sequence': {'idx2str': idx2str}
+    }
+    return output, output_features, metadata
+
+
+def copy_value(value):
+    if not value.dtype.hasobject:
+        return value.copy()
+    copied = np.empty(len(value), dtype=object)
+    for i, row in enumerate(value):
+        copied[i] = list(row)
+    return copied
+
+
+def copy_output(output):
+    # postprocessing removes the outputs it consumed and trimmed probability
+    # lists used to be modified in place
+    return {
+        name: {
+            key: copy_value(value)
+            for key, value in feature_output.items()
+        }
+        for name, feature_output in output.items()
+    }
+
+
+def elementwise_postprocess_df(output, metadata):
+    category = output['category']
+    idx2str = metadata['category']['idx2str']
+    data_for_df = {
+        'category_predictions': [
+            idx2str[pred] for pred in category[PREDICTIONS]
+        ]
+    }
+    for i, value in enumerate(category[PROBABILITIES].T):
+        data_for_df['category_probabilities_{}'.format(idx2str[i])] = value
+    data_for_df['category_probability'] = np.amax(
+        category[PROBABILITIES], axis=1
+    )
+    data_for_df['category_predictions_top_k'] = [
+        [idx2str[pred] for pred in pred_top_k]
+        for pred_top_k in category['predictions_top_k']
+    ]
+
+    sequence = output['sequence']
+    idx2str = metadata['sequence']['idx2str']
+    data_for_df['sequence_predictions'] = [
+        [idx2str[token] for token in pred] for pred in sequence[PREDICTIONS]
+    ]
+    data_for_df['sequence_last_predictions'] = [
+        idx2str[last_pred] for last_pred in sequence[LAST_PREDICTIONS]
+    ]
+    probs = sequence[PROBABILITIES]
+    prob = []
+    for i in range(len(probs)):
+        for j in range(len(probs[i])):
+            probs[i][j] = np.max(probs[i][j])
+        prob.append(np.prod(probs[i]))
+    data_for_df['sequence_probabilities'] = probs
+    data_for_df['sequence_probability'] = prob
+    return pd.DataFrame(data_for_df)
+
+
+def time_call(function):
+    start_time = time.time()
+    result = function()
+    return result, time.time() - start_time
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description='Benchmark postprocessing of predictions'
+    )
+    parser.add_argument('--num_rows', type=int, default=100000)
+    parser.add_argument('--vocab_size', type=int, default=20)
+    parser.add_argument('--max_length', type=int, default=10)
+    parser.add_argument('--top_k', type=int, default=3)
+    args = parser.parse_args()
+
+    output, output_features, metadata = random_outputs(
+        args.num_rows,
+        args.vocab_size,
+        args.max_length,
+        args.top_k
+    )
+
+    expected, elementwise_time = time_call(
+        lambda: elementwise_postprocess_df(copy_output(output), metadata)
+    )
+    actual, vectorized_time = time_call(
+        lambda: postprocess_df(copy_output(output), output_features, metadata)
+    )
+    same = (list(expected.columns) == list(actual.columns) and
+            all(expected[name].astype(str).equals(actual[name].astype(str))
+                for name in expected.columns))
+
+    print('{:<14} {:>14}'.format('', 'rows/s'))
+    print('{:<14} {:14.1f}'.format(
+        'elementwise', args.num_rows / elementwise_time
+    ))
+    print('{:<14} {:14.1f}'.format(
+        'vectorized', args.num_rows / vectorized_time
+    ))
+    print('same DataFrame: {}'.format('yes' if same else 'NO'))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,108 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Load generator for `ludwig serve`: concurrent clients post single
+records read from a csv to a running server for a fixed time, then the
+latency percentiles seen by the clients, the throughput and the stats of the
+server are printed."""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from ludwig.utils.data_utils import NumpyEncoder
+from ludwig.utils.data_utils import read_csv
+
+
+def post(url, record):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(record, cls=NumpyEncoder).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def client(url, records, deadline, latencies, errors, random_seed):
+    random_state = np.random.RandomState(random_seed)
+    while time.time() < deadline:
+        record = records[random_state.randint(len(records))]
+        start_time = time.time()
+        try:
+            post(url, record)
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.time() - start_time)
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the latency of a running prediction server'
+    )
+    parser.add_argument('data_csv', help='csv of the records to post')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    records = read_csv(args.data_csv).to_dict(orient='records')
+
+    print('{:>12}{:>12}{:>12}{:>14}{:>10}'.format(
+        'clients', 'p50 ms', 'p99 ms', 'requests/s', 'errors'
+    ))
+    for concurrency in args.concurrency:
+        latencies = []
+        errors = []
+        deadline = time.time() + args.duration
+        threads = [
+            threading.Thread(
+                target=client,
+                args=(args.url + '/predict', records, deadline,
+                      latencies, errors, i)
+            )
+            for i in range(concurrency)
+        ]
+        start_time = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed_time = time.time() - start_time
+
+        latencies = np.array(latencies) * 1000.0
+        print('{:>12}{:>12.2f}{:>12.2f}{:>14.1f}{:>10}'.format(
+            concurrency,
+            np.percentile(latencies, 50) if len(latencies) else float('nan'),
+            np.percentile(latencies, 99) if len(latencies) else float('nan'),
+            len(latencies) / elapsed_time,
+            len(errors)
+        ))
+
+    with urllib.request.urlopen(args.url + '/stats') as response:
+        print('Server stats: {}'.format(
+            json.dumps(json.loads(response.read().decode('utf-8')),
+                       indent=2, sort_keys=True)
+        ))
+
+
+if __name__ == '__main__':
+    cli()
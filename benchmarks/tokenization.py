@@ -0,0 +1,95 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Compares rows per second of text tokenization across formats, tokenizing
+one row at a time with the format function and with the batched tokenize
+used by preprocessing."""
+import argparse
+import random
+import string
+import time
+
+from ludwig.utils.strings_utils import english_format_parameters
+from ludwig.utils.strings_utils import format_registry
+from ludwig.utils.strings_utils import tokenize
+
+
+def random_texts(num_rows, num_words, random_seed=42):
+    random.seed(random_seed)
+    words = [
+        ''.join(random.choice(string.ascii_letters) for _ in range(length))
+        for length in range(1, 12) for _ in range(100)
+    ]
+    punctuation = [',', '.', '!', '?', '$3.50', '42']
+    return [
+        ' '.join(random.choice(words + punctuation) for _ in range(num_words))
+        for _ in range(num_rows)
+    ]
+
+
+def rows_per_second(fn, texts):
+    start_time = time.time()
+    fn(texts)
+    return len(texts) / (time.time() - start_time)
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description='Benchmark tokenization of text features'
+    )
+    parser.add_argument('--num_rows', type=int, default=20000)
+    parser.add_argument('--num_words', type=int, default=30)
+    parser.add_argument('--batch_size', type=int, default=1000)
+    parser.add_argument('--num_processes', type=int, default=4)
+    parser.add_argument(
+        '--formats',
+        nargs='+',
+        default=['space', 'space_punct', 'characters', 'english_tokenize',
+                 'english_lemmatize_filter']
+    )
+    args = parser.parse_args()
+
+    texts = random_texts(args.num_rows, args.num_words)
+    print('{:<28} {:>12} {:>12} {:>12}'.format(
+        'format', 'per row', 'batched', 'processes'
+    ))
+    for format in args.formats:
+        format_function = format_registry[format]
+        per_row = rows_per_second(
+            lambda data: [format_function(line.lower()) for line in data],
+            texts
+        )
+        batched = rows_per_second(
+            lambda data: tokenize(data, format,
+                                  batch_size=args.batch_size),
+            texts
+        )
+        if format in english_format_parameters:
+            parallel = '{:12.1f}'.format(rows_per_second(
+                lambda data: tokenize(data, format,
+                                      batch_size=args.batch_size,
+                                      num_processes=args.num_processes),
+                texts
+            ))
+        else:
+            parallel = '{:>12}'.format('-')
+        print('{:<28} {:12.1f} {:12.1f} {}'.format(
+            format, per_row, batched, parallel
+        ))
+
+
+if __name__ == '__main__':
+    cli()
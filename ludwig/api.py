@@ -35,6 +35,8 @@ from pprint import pformat
 import pandas as pd
 import yaml
 
+from ludwig.data.compiled_preprocessing import load_feature_encoders
+from ludwig.data.compiled_preprocessing import save_feature_encoders
 from ludwig.data.dataset import Dataset
 from ludwig.data.postprocessing import postprocess_df, postprocess
 from ludwig.data.preprocessing import build_data
@@ -42,12 +44,14 @@ from ludwig.data.preprocessing import build_dataset
 from ludwig.data.preprocessing import load_metadata
 from ludwig.data.preprocessing import preprocess_for_training
 from ludwig.data.preprocessing import replace_text_feature_level
+from ludwig.globals import FEATURE_ENCODERS_FILE_NAME
 from ludwig.globals import MODEL_HYPERPARAMETERS_FILE_NAME
 from ludwig.globals import MODEL_WEIGHTS_FILE_NAME
 from ludwig.globals import TRAIN_SET_METADATA_FILE_NAME
 from ludwig.globals import set_disable_progressbar
 from ludwig.models.model import Model
 from ludwig.models.model import load_model_and_definition
+from ludwig.models.predictor import Predictor
 from ludwig.models.modules.measure_modules import get_best_function
 from ludwig.predict import calculate_overall_stats
 from ludwig.train import get_experiment_dir_name
@@ -140,6 +144,7 @@ class LudwigModel:
             self.model_definition = merge_with_defaults(model_definition)
         self.train_set_metadata = None
         self.model = None
+        self.predictor = None
 
     @staticmethod
     def _read_data(data_csv, data_dict):
@@ -202,6 +207,21 @@ class LudwigModel:
                 TRAIN_SET_METADATA_FILE_NAME
             )
         )
+        feature_encoders_path = os.path.join(
+            model_dir,
+            FEATURE_ENCODERS_FILE_NAME
+        )
+        # models saved by train have no feature encoders, and encoders that
+        # cannot be loaded are compiled again when predict_batch is called
+        if os.path.isfile(feature_encoders_path):
+            feature_encoders = load_feature_encoders(feature_encoders_path)
+            if feature_encoders is not None:
+                ludwig_model.predictor = Predictor(
+                    model,
+                    model_definition,
+                    ludwig_model.train_set_metadata,
+                    feature_encoders=feature_encoders
+                )
         return ludwig_model
 
     def save(self, save_path):
@@ -241,6 +261,13 @@ class LudwigModel:
         )
         save_json(train_set_metadata_path, self.train_set_metadata)
 
+        # saved so that loading the model for predict_batch
+        # does not compile them from the metadata again
+        save_feature_encoders(
+            os.path.join(save_path, FEATURE_ENCODERS_FILE_NAME),
+            self._get_predictor().feature_encoders
+        )
+
         self.model.save_hyperparameters(
             self.model.hyperparameters,
             model_hyperparameters_path
@@ -933,6 +960,43 @@ class LudwigModel:
 
         return predictions
 
+    def predict_batch(self, data):
+        """This function predicts a small batch of datapoints with much less
+           overhead than `predict`, for online inference. Inputs are
+           preprocessed with encoders built once from the train set metadata
+           instead of through DataFrames, and the whole batch is predicted
+           with a single session run, so it should not be used for
+           datasets that do not fit in a batch.
+
+        # Inputs
+
+        :param data: (list or dict) either a list of dictionaries, one for
+               each datapoint, from input feature name to its raw value, or a
+               dictionary from input feature name to a list or numpy array of
+               raw values, one for each datapoint.
+
+
+        # Return
+
+        :return: (dict) a dictionary with the same columns and values of the
+                 DataFrame returned by `predict`, for instance
+                 `class_predictions` and `class_one_probability`.
+        """
+        if (self.model is None or self.model_definition is None or
+                self.train_set_metadata is None):
+            raise ValueError('Model has not been trained or loaded')
+
+        return self._get_predictor().predict(data)
+
+    def _get_predictor(self):
+        if self.predictor is None or self.predictor.model is not self.model:
+            self.predictor = Predictor(
+                self.model,
+                self.model_definition,
+                self.train_set_metadata
+            )
+        return self.predictor
+
     def test(
             self,
             data_df=None,
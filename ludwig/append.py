@@ -0,0 +1,180 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import argparse
+import logging
+import os
+import sys
+
+import yaml
+
+from ludwig.data.preprocessing import append_dataset
+from ludwig.globals import LUDWIG_VERSION
+from ludwig.globals import MODEL_HYPERPARAMETERS_FILE_NAME
+from ludwig.globals import TRAIN_SET_METADATA_FILE_NAME
+from ludwig.utils.data_utils import load_json
+from ludwig.utils.defaults import default_random_seed
+from ludwig.utils.defaults import merge_with_defaults
+from ludwig.utils.print_utils import logging_level_registry
+from ludwig.utils.print_utils import print_ludwig
+
+
+def append(
+        data_csv,
+        data_hdf5,
+        train_set_metadata_json=None,
+        model_path=None,
+        model_definition=None,
+        model_definition_file=None,
+        dataset_type='generic',
+        random_seed=default_random_seed,
+        **kwargs
+):
+    """Preprocesses new data with the train set metadata of an existing
+    dataset or model and appends it to the hdf5 file of the dataset.
+    :param data_csv: csv file containing the new rows
+    :param data_hdf5: hdf5 file the new rows are appended to
+    :param train_set_metadata_json: train set metadata the new rows are
+           preprocessed with, by default the one of the model
+    :param model_path: model whose definition and train set metadata are used
+    :param model_definition: model definition, if model_path is not provided
+    :param model_definition_file: yaml file containing the model definition,
+           if model_path is not provided
+    :param dataset_type: type of dataset
+    :param random_seed: random seed used for splitting the new rows
+    """
+    if model_path is not None:
+        model_definition = load_json(
+            os.path.join(model_path, MODEL_HYPERPARAMETERS_FILE_NAME)
+        )
+        if train_set_metadata_json is None:
+            train_set_metadata_json = os.path.join(
+                model_path,
+                TRAIN_SET_METADATA_FILE_NAME
+            )
+    elif model_definition_file is not None:
+        with open(model_definition_file, 'r') as def_file:
+            model_definition = merge_with_defaults(yaml.load(def_file))
+    else:
+        model_definition = merge_with_defaults(model_definition)
+
+    if train_set_metadata_json is None:
+        raise ValueError(
+            'The train set metadata json has to be provided '
+            'if a model path is not'
+        )
+
+    logging.info('Dataset path: {}'.format(data_csv))
+    logging.info('HDF5 path: {}'.format(data_hdf5))
+    logging.info('Metadata path: {}'.format(train_set_metadata_json))
+    logging.info('')
+
+    return append_dataset(
+        data_csv,
+        data_hdf5,
+        train_set_metadata_json,
+        model_definition,
+        dataset_type=dataset_type,
+        random_seed=random_seed
+    )
+
+
+def cli(sys_argv):
+    parser = argparse.ArgumentParser(
+        description='This script preprocesses new data with existing '
+                    'metadata and appends it to a preprocessed HDF5 file.',
+        prog='ludwig append',
+        usage='%(prog)s [options]'
+    )
+
+    # ---------------
+    # Data parameters
+    # ---------------
+    parser.add_argument(
+        '--data_csv',
+        help='input data CSV file containing the new rows. '
+             'If it has a split column, it will be used for splitting '
+             '(0: train, 1: validation, 2: test), '
+             'otherwise the new rows will be randomly split',
+        required=True
+    )
+    parser.add_argument(
+        '--data_hdf5',
+        help='HDF5 file the preprocessed rows are appended to',
+        required=True
+    )
+    parser.add_argument(
+        '--train_set_metadata_json',
+        help='metadata JSON file the rows are preprocessed with, '
+             'it is not updated. By default the one of the model'
+    )
+
+    # ----------------
+    # Model parameters
+    # ----------------
+    model_definition = parser.add_mutually_exclusive_group(required=True)
+    model_definition.add_argument(
+        '-m',
+        '--model_path',
+        help='model whose definition and metadata are used'
+    )
+    model_definition.add_argument(
+        '-md',
+        '--model_definition',
+        type=yaml.load,
+        help='model definition'
+    )
+    model_definition.add_argument(
+        '-mdf',
+        '--model_definition_file',
+        help='YAML file describing the model'
+    )
+
+    # ------------------
+    # Generic parameters
+    # ------------------
+    parser.add_argument(
+        '-rs',
+        '--random_seed',
+        type=int,
+        default=42,
+        help='a random seed that is used for splitting the new rows, '
+             'use a different one for each batch of new rows '
+             'appended to the same file'
+    )
+    parser.add_argument(
+        '-l',
+        '--logging_level',
+        default='info',
+        help='the level of logging to use',
+        choices=['critical', 'error', 'warning', 'info', 'debug', 'notset']
+    )
+
+    args = parser.parse_args(sys_argv)
+
+    logging.basicConfig(
+        stream=sys.stdout,
+        level=logging_level_registry[args.logging_level],
+        format='%(message)s'
+    )
+
+    print_ludwig('Append', LUDWIG_VERSION)
+
+    append(**vars(args))
+
+
+if __name__ == '__main__':
+    cli(sys.argv[1:])
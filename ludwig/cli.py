@@ -17,9 +17,11 @@
 import argparse
 import sys
 
+from ludwig import append
 from ludwig import collect
 from ludwig import experiment
 from ludwig import predict
+from ludwig import serve
 from ludwig import train
 from ludwig import visualize
 
@@ -37,6 +39,9 @@ class CLI(object):
       representation
     - collect_activations - For each datapoint, there exists a corresponding
       tensor representation which are collected through this method
+    - append - Preprocesses new data with the metadata of existing data and
+      appends it to its HDF5 file
+    - serve - Serves the predictions of a pretrained model over HTTP
     """
 
     def __init__(self):
@@ -51,6 +56,8 @@ Available sub-commands:
    visualize             Visualizes experimental results
    collect_weights       Collects tensors containing a pretrained model weights
    collect_activations   Collects tensors for each datapoint using a pretrained model
+   append                Appends new data to a preprocessed HDF5 file
+   serve                 Serves predictions of a pretrained model over HTTP
 ''')
         parser.add_argument('command', help='Subcommand to run')
         # parse_args defaults to [1:] for args, but you need to
@@ -81,6 +88,12 @@ Available sub-commands:
     def collect_activations(self):
         collect.cli_collect_activations(sys.argv[2:])
 
+    def append(self):
+        append.cli(sys.argv[2:])
+
+    def serve(self):
+        serve.cli(sys.argv[2:])
+
 
 def main():
     CLI()
@@ -0,0 +1,231 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+
+import h5py
+
+from ludwig.globals import LUDWIG_VERSION
+from ludwig.utils.data_utils import close_hdf5_file
+from ludwig.utils.data_utils import get_hdf5_file
+
+cache_key_attribute = 'preprocessing_cache_key'
+feature_cache_keys_attribute = 'feature_cache_keys'
+cache_entry_regex = re.compile(r'^([0-9a-f]{16}_[0-9a-f]{16})\.')
+
+hash_block_size = 1024 * 1024
+
+
+def get_data_fingerprint(data_fps, content_hash=False):
+    """Fingerprints the raw data files. By default a file is identified by
+    its path, size and modification time, with content_hash its path and
+    time are replaced by a hash of its content.
+    :param data_fps: paths of the data files
+    :param content_hash: whether to hash the content of the files
+    :return: a 16 characters hexadecimal fingerprint
+    """
+    hasher = hashlib.sha1()
+    for data_fp in data_fps:
+        stat = os.stat(data_fp)
+        if content_hash:
+            file_hasher = hashlib.md5()
+            with open(data_fp, 'rb') as data_file:
+                for block in iter(
+                        lambda: data_file.read(hash_block_size), b''
+                ):
+                    file_hasher.update(block)
+            fingerprint = [stat.st_size, file_hasher.hexdigest()]
+        else:
+            fingerprint = [
+                os.path.abspath(data_fp),
+                stat.st_size,
+                stat.st_mtime_ns
+            ]
+        hasher.update(json.dumps(fingerprint).encode('utf-8'))
+    return hasher.hexdigest()[:16]
+
+
+def get_config_fingerprint(config):
+    """Fingerprints the preprocessing configuration together with the
+    version of Ludwig that is preprocessing the data.
+    :param config: json serializable preprocessing configuration
+    :return: a 16 characters hexadecimal fingerprint
+    """
+    config = {'ludwig_version': LUDWIG_VERSION, 'config': config}
+    return hashlib.sha1(
+        json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()[:16]
+
+
+def get_cache_key(data_fingerprint, config_fingerprint):
+    return '{}_{}'.format(data_fingerprint, config_fingerprint)
+
+
+def read_cache_key(data_hdf5_fp):
+    if not os.path.isfile(data_hdf5_fp):
+        return None
+    try:
+        cache_key = get_hdf5_file(data_hdf5_fp).attrs.get(cache_key_attribute)
+    except OSError:
+        return None
+    if isinstance(cache_key, bytes):
+        cache_key = cache_key.decode('utf-8')
+    return cache_key
+
+
+def read_feature_cache_keys(data_hdf5_fp):
+    """Reads the cache keys of the features stored in an hdf5 file.
+    :param data_hdf5_fp: path to the hdf5 file
+    :return: dictionary by feature name of dictionaries containing the
+             cache key of the feature and the fields it is stored in
+    """
+    if not os.path.isfile(data_hdf5_fp):
+        return {}
+    try:
+        feature_cache_keys = get_hdf5_file(data_hdf5_fp).attrs.get(
+            feature_cache_keys_attribute
+        )
+    except OSError:
+        return {}
+    if feature_cache_keys is None:
+        return {}
+    if isinstance(feature_cache_keys, bytes):
+        feature_cache_keys = feature_cache_keys.decode('utf-8')
+    return json.loads(feature_cache_keys)
+
+
+def write_cache_key(data_hdf5_fp, cache_key, feature_cache_keys=None):
+    close_hdf5_file(data_hdf5_fp)
+    with h5py.File(data_hdf5_fp, 'r+') as h5_file:
+        h5_file.attrs[cache_key_attribute] = cache_key
+        if feature_cache_keys:
+            h5_file.attrs[feature_cache_keys_attribute] = json.dumps(
+                feature_cache_keys,
+                sort_keys=True
+            )
+
+
+def clear_cache_keys(data_hdf5_fp):
+    """Removes the cache keys from an hdf5 file whose rows no longer
+    correspond to the data it was preprocessed from.
+    """
+    close_hdf5_file(data_hdf5_fp)
+    with h5py.File(data_hdf5_fp, 'r+') as h5_file:
+        for attribute in (cache_key_attribute, feature_cache_keys_attribute):
+            if attribute in h5_file.attrs:
+                del h5_file.attrs[attribute]
+
+
+def is_cached(data_hdf5_fps, metadata_json_fp, cache_key):
+    """Checks that the hdf5 files were preprocessed with the given cache key
+    and that the metadata they were preprocessed with is available.
+    """
+    if not os.path.isfile(metadata_json_fp):
+        return False
+    return all(
+        read_cache_key(data_hdf5_fp) == cache_key
+        for data_hdf5_fp in data_hdf5_fps
+    )
+
+
+def get_cache_fp(cache_dir, cache_key, suffix):
+    return os.path.join(cache_dir, '{}.{}'.format(cache_key, suffix))
+
+
+def store_in_cache(fps, cache_dir):
+    """Moves preprocessed files into the cache directory.
+    :param fps: dictionary of destination paths in the cache directory
+           by current path
+    """
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    for fp, cache_fp in fps.items():
+        close_hdf5_file(fp)
+        close_hdf5_file(cache_fp)
+        shutil.move(fp, cache_fp)
+
+
+def find_cache_entries(cache_dir, data_fingerprint):
+    """Lists the keys of the cache entries preprocessed from the data with
+    the given fingerprint, most recently used first.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    last_use = {}
+    for name in os.listdir(cache_dir):
+        match = cache_entry_regex.match(name)
+        if match and match.group(1).startswith(data_fingerprint + '_'):
+            last_use[match.group(1)] = max(
+                last_use.get(match.group(1), 0),
+                os.path.getmtime(os.path.join(cache_dir, name))
+            )
+    return sorted(last_use, key=last_use.get, reverse=True)
+
+
+def touch_cache_entry(cache_dir, cache_key):
+    for name in os.listdir(cache_dir):
+        if name.startswith(cache_key + '.'):
+            os.utime(os.path.join(cache_dir, name))
+
+
+def evict_cache(cache_dir, max_size=None, max_age=None, keep=None):
+    """Deletes the cache entries that have not been used for more than
+    max_age days and then the least recently used ones until the cache
+    takes at most max_size megabytes.
+    :param cache_dir: the cache directory
+    :param max_size: maximum size of the cache in megabytes
+    :param max_age: maximum number of days since an entry was last used
+    :param keep: key of an entry that is never evicted
+    """
+    if not os.path.isdir(cache_dir) or (max_size is None and max_age is None):
+        return
+
+    entries = {}
+    for name in os.listdir(cache_dir):
+        match = cache_entry_regex.match(name)
+        if match:
+            entries.setdefault(match.group(1), []).append(
+                os.path.join(cache_dir, name)
+            )
+
+    now = time.time()
+    total_size = 0
+    by_last_use = sorted(
+        entries.items(),
+        key=lambda entry: max(os.path.getmtime(fp) for fp in entry[1]),
+        reverse=True
+    )
+    for cache_key, fps in by_last_use:
+        size = sum(os.path.getsize(fp) for fp in fps) / (1024 * 1024)
+        age = (now - max(os.path.getmtime(fp) for fp in fps)) / (24 * 3600)
+        if cache_key != keep and (
+                (max_age is not None and age > max_age) or
+                (max_size is not None and total_size + size > max_size)
+        ):
+            logging.info('Evicting preprocessed data {} from the cache'.format(
+                cache_key
+            ))
+            for fp in fps:
+                close_hdf5_file(fp)
+                os.remove(fp)
+        else:
+            total_size += size
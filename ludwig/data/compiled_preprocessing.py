@@ -0,0 +1,391 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Preprocessing of small batches of raw values for inference, without
+building DataFrames. Each input feature gets an encoder, built once from the
+train set metadata, that turns a column of raw values (a list or a numpy
+array) into the arrays the model is fed with, the same ones build_data
+would produce for the same values. Encoders can be pickled, so they can be
+saved with a model and sent to worker processes instead of the metadata.
+"""
+import logging
+from collections import Counter
+from functools import partial
+from itertools import chain
+
+import numpy as np
+
+from ludwig.constants import *
+from ludwig.data.preprocessing import get_feature_preprocessing_parameters
+from ludwig.features.image_feature import ImageBaseFeature
+from ludwig.features.image_feature import read_image
+from ludwig.features.timeseries_feature import TimeseriesBaseFeature
+from ludwig.globals import LUDWIG_VERSION
+from ludwig.utils.data_utils import load_object
+from ludwig.utils.data_utils import save_object
+from ludwig.utils.math_utils import int_type
+from ludwig.utils.misc import get_from_registry
+from ludwig.utils.strings_utils import VocabularyTable
+from ludwig.utils.strings_utils import build_sequence_matrix
+from ludwig.utils.strings_utils import tokenize
+
+
+def get_missing_mask(values):
+    if isinstance(values, np.ndarray) and not values.dtype.hasobject:
+        if values.dtype.kind == 'f':
+            return np.isnan(values)
+        return np.zeros(len(values), dtype=bool)
+    return np.fromiter(
+        (value is None or
+         (isinstance(value, (float, np.floating)) and value != value)
+         for value in values),
+        dtype=bool,
+        count=len(values)
+    )
+
+
+def fill_missing_values(values, feature_type, preprocessing_parameters):
+    """Fills the missing values of a column like handle_missing_values
+    does for a DataFrame column: modes, means and propagated values are
+    computed on the column itself.
+    :param values: list or numpy array of raw values
+    :param feature_type: type of the feature
+    :param preprocessing_parameters: preprocessing parameters of the feature
+    :return: the values with missing ones filled, as a list if any was
+    """
+    missing_value_strategy = preprocessing_parameters['missing_value_strategy']
+    if missing_value_strategy == FILL_WITH_MEAN and feature_type != NUMERICAL:
+        raise ValueError(
+            'Filling missing values with mean is supported '
+            'only for numerical types',
+        )
+
+    missing = get_missing_mask(values)
+    if not missing.any():
+        return values
+    values = list(values)
+
+    if missing_value_strategy == FILL_WITH_CONST:
+        fill_values = [preprocessing_parameters['fill_value']] * len(values)
+    elif missing_value_strategy == FILL_WITH_MODE:
+        mode = Counter(
+            value for value, is_missing in zip(values, missing)
+            if not is_missing
+        ).most_common(1)[0][0]
+        fill_values = [mode] * len(values)
+    elif missing_value_strategy == FILL_WITH_MEAN:
+        mean = np.mean([
+            float(value) for value, is_missing in zip(values, missing)
+            if not is_missing
+        ])
+        fill_values = [mean] * len(values)
+    elif missing_value_strategy in ['backfill', 'bfill', 'pad', 'ffill']:
+        # values with nothing to propagate from stay missing
+        fill_values = [np.nan] * len(values)
+        if missing_value_strategy in ['backfill', 'bfill']:
+            order = range(len(values) - 1, -1, -1)
+        else:
+            order = range(len(values))
+        last_value = np.nan
+        for i in order:
+            if missing[i]:
+                fill_values[i] = last_value
+            else:
+                last_value = values[i]
+    else:
+        raise ValueError('Invalid missing value strategy')
+
+    for i in np.flatnonzero(missing):
+        values[i] = fill_values[i]
+    return values
+
+
+def to_strings(values):
+    return [str(value) for value in values]
+
+
+class FeatureEncoder(object):
+    """Builds the data of a feature from a column of raw values. Encoders
+    only keep what they need of the metadata, with vocabularies in
+    VocabularyTables, so they can be pickled and sent to other processes.
+    """
+
+    def __init__(self, feature, feature_metadata, preprocessing_parameters):
+        self.name = feature['name']
+        self.type = feature['type']
+        self.missing_value_parameters = {
+            key: preprocessing_parameters[key]
+            for key in ('missing_value_strategy', 'fill_value')
+            if key in preprocessing_parameters
+        }
+
+    def __call__(self, values):
+        """
+        :param values: list or numpy array with a raw value for each row
+        :return: dictionary from field name to the array the model is fed
+        """
+        return {self.name: self.encode(fill_missing_values(
+            values,
+            self.type,
+            self.missing_value_parameters
+        ))}
+
+    def encode(self, values):
+        raise NotImplementedError
+
+
+class BinaryFeatureEncoder(FeatureEncoder):
+    def encode(self, values):
+        if isinstance(values, np.ndarray) and not values.dtype.hasobject:
+            return values.astype(np.bool_)
+        return np.fromiter(
+            (bool(value) for value in values),
+            dtype=np.bool_,
+            count=len(values)
+        )
+
+
+class NumericalFeatureEncoder(FeatureEncoder):
+    def encode(self, values):
+        return np.asarray(values).astype(np.float32)
+
+
+class CategoryFeatureEncoder(FeatureEncoder):
+    def __init__(self, feature, feature_metadata, preprocessing_parameters):
+        super().__init__(feature, feature_metadata, preprocessing_parameters)
+        self.vocabulary = VocabularyTable(feature_metadata['idx2str'])
+        self.dtype = int_type(feature_metadata['vocab_size'])
+
+    def encode(self, values):
+        return self.vocabulary.lookup(to_strings(values)).astype(self.dtype)
+
+
+class SetFeatureEncoder(FeatureEncoder):
+    dtype = np.bool_
+
+    def __init__(self, feature, feature_metadata, preprocessing_parameters):
+        super().__init__(feature, feature_metadata, preprocessing_parameters)
+        self.vocabulary = VocabularyTable(feature_metadata['idx2str'])
+        self.format = preprocessing_parameters['format']
+        self.lowercase = preprocessing_parameters['lowercase']
+
+    def encode(self, values):
+        unit_lists = tokenize(
+            to_strings(values),
+            self.format,
+            lowercase=self.lowercase,
+            use_cache=False
+        )
+        lengths = [len(units) for units in unit_lists]
+        rows = np.repeat(np.arange(len(unit_lists)), lengths)
+        columns = self.vocabulary.lookup(list(chain.from_iterable(unit_lists)))
+        matrix = np.zeros((len(unit_lists), len(self.vocabulary)),
+                          dtype=self.dtype)
+        self.fill(matrix, rows, columns)
+        return matrix
+
+    @staticmethod
+    def fill(matrix, rows, columns):
+        matrix[rows, columns] = True
+
+
+class BagFeatureEncoder(SetFeatureEncoder):
+    dtype = np.float32
+
+    @staticmethod
+    def fill(matrix, rows, columns):
+        # repeated units are counted, like the duplicates of the csr matrix
+        np.add.at(matrix, (rows, columns), 1)
+
+
+class SequenceFeatureEncoder(FeatureEncoder):
+    def __init__(self, feature, feature_metadata, preprocessing_parameters,
+                 prefix=''):
+        super().__init__(feature, feature_metadata, preprocessing_parameters)
+        self.vocabulary = VocabularyTable(
+            feature_metadata[prefix + 'idx2str']
+        )
+        self.format = preprocessing_parameters[prefix + 'format']
+        self.length_limit = feature_metadata[prefix + 'max_sequence_length']
+        self.padding_symbol = preprocessing_parameters['padding_symbol']
+        self.padding = preprocessing_parameters['padding']
+        self.lowercase = preprocessing_parameters['lowercase']
+
+    def encode(self, values):
+        return build_sequence_matrix(
+            to_strings(values),
+            self.vocabulary,
+            self.format,
+            self.length_limit,
+            self.padding_symbol,
+            padding=self.padding,
+            lowercase=self.lowercase,
+            use_cache=False
+        )
+
+
+class TextFeatureEncoder(SequenceFeatureEncoder):
+    def __init__(self, feature, feature_metadata, preprocessing_parameters):
+        # only the level the model reads is built
+        super().__init__(
+            feature,
+            feature_metadata,
+            preprocessing_parameters,
+            prefix='{}_'.format(feature['level'])
+        )
+
+
+class TimeseriesFeatureEncoder(FeatureEncoder):
+    def __init__(self, feature, feature_metadata, preprocessing_parameters):
+        super().__init__(feature, feature_metadata, preprocessing_parameters)
+        self.format = preprocessing_parameters['format']
+        self.length_limit = feature_metadata['max_timeseries_length']
+        self.padding_value = preprocessing_parameters['padding_value']
+        self.padding = preprocessing_parameters['padding']
+
+    def encode(self, values):
+        return TimeseriesBaseFeature.build_matrix(
+            to_strings(values),
+            self.format,
+            self.length_limit,
+            self.padding_value,
+            self.padding
+        )
+
+
+class ImageFeatureEncoder(FeatureEncoder):
+    def __init__(self, feature, feature_metadata, preprocessing_parameters):
+        super().__init__(feature, feature_metadata, preprocessing_parameters)
+        self.shape = (
+            feature_metadata['height'],
+            feature_metadata['width'],
+            feature_metadata['num_channels']
+        )
+        self.read_image = partial(
+            read_image,
+            csv_path='',
+            shape=self.shape,
+            should_resize=feature['should_resize'],
+            resize_method=feature.get('resize_method')
+        )
+
+    def encode(self, values):
+        images = np.empty((len(values),) + self.shape, dtype=np.uint8)
+        ImageBaseFeature.read_images(self.read_image, list(values), images)
+        return images
+
+
+feature_encoder_registry = {
+    BINARY: BinaryFeatureEncoder,
+    NUMERICAL: NumericalFeatureEncoder,
+    CATEGORY: CategoryFeatureEncoder,
+    SET: SetFeatureEncoder,
+    BAG: BagFeatureEncoder,
+    SEQUENCE: SequenceFeatureEncoder,
+    TEXT: TextFeatureEncoder,
+    TIMESERIES: TimeseriesFeatureEncoder,
+    IMAGE: ImageFeatureEncoder
+}
+
+
+def compile_feature_encoders(
+        features,
+        train_set_metadata,
+        global_preprocessing_parameters
+):
+    """Builds the encoder of each feature.
+    :param features: list of feature definitions
+    :param train_set_metadata: train set metadata of the model
+    :param global_preprocessing_parameters: preprocessing parameters of the
+           model definition
+    :return: list of feature encoders
+    """
+    return [
+        get_from_registry(feature['type'], feature_encoder_registry)(
+            feature,
+            train_set_metadata[feature['name']],
+            get_feature_preprocessing_parameters(
+                feature,
+                global_preprocessing_parameters
+            )
+        )
+        for feature in features
+    ]
+
+
+def encode_records(feature_encoders, records):
+    """Builds the data of a list of dictionaries from feature name to value.
+    :param feature_encoders: list of feature encoders
+    :param records: list of dictionaries with a raw value for each feature
+    :return: dictionary from field name to array
+    """
+    return encode_columns(
+        feature_encoders,
+        {
+            encoder.name: [record[encoder.name] for record in records]
+            for encoder in feature_encoders
+        }
+    )
+
+
+def encode_columns(feature_encoders, columns):
+    """Builds the data of a dictionary of columns.
+    :param feature_encoders: list of feature encoders
+    :param columns: dictionary from feature name to a list or numpy array
+           of raw values
+    :return: dictionary from field name to array
+    """
+    data = {}
+    for encoder in feature_encoders:
+        data.update(encoder(columns[encoder.name]))
+    return data
+
+
+def save_feature_encoders(feature_encoders_fp, feature_encoders):
+    save_object(
+        feature_encoders_fp,
+        {'ludwig_version': LUDWIG_VERSION,
+         'feature_encoders': feature_encoders}
+    )
+
+
+def load_feature_encoders(feature_encoders_fp):
+    """Loads the feature encoders saved with a model. The pickle depends on
+    the layout of the encoder classes, so encoders saved by another version
+    of Ludwig, or that cannot be unpickled, are not loaded.
+    :param feature_encoders_fp: path to the pickled feature encoders
+    :return: list of feature encoders, or None if they have to be compiled
+             again from the train set metadata
+    """
+    try:
+        saved = load_object(feature_encoders_fp)
+    except Exception as e:
+        logging.warning(
+            'Unable to load the feature encoders in {}, they will be '
+            'compiled from the train set metadata: {}'.format(
+                feature_encoders_fp, e
+            )
+        )
+        return None
+    if (not isinstance(saved, dict) or
+            saved.get('ludwig_version') != LUDWIG_VERSION):
+        logging.info(
+            'The feature encoders in {} were saved by another version of '
+            'Ludwig, they will be compiled from the train set '
+            'metadata'.format(feature_encoders_fp)
+        )
+        return None
+    return saved['feature_encoders']
@@ -16,13 +16,26 @@
 # ==============================================================================
 import h5py
 import numpy as np
+from scipy import sparse
+
+from ludwig.constants import TEXT
+from ludwig.utils.data_utils import collapse_rare_labels
+from ludwig.utils.data_utils import get_hdf5_file
+from ludwig.utils.data_utils import load_hdf5_value
+from ludwig.utils.data_utils import sequence_lengths_field
+from ludwig.utils.data_utils import shuffle_inplace
+from ludwig.utils.data_utils import text_feature_data_field
 
 
 class Dataset:
-    def __init__(self, dataset, input_features, output_features, data_hdf5_fp):
+    def __init__(self, dataset, input_features, output_features, data_hdf5_fp,
+                 partitioned=False):
         self.dataset = dataset
+        # whether the dataset only contains the partition of rows
+        # of this worker in distributed training
+        self.partitioned = partitioned
 
-        self.size = min(map(len, self.dataset.values()))
+        self.size = min(value.shape[0] for value in self.dataset.values())
 
         self.input_features = {}
         for feature in input_features:
@@ -41,25 +54,184 @@ class Dataset:
             idx = range(self.size)
         if (self.data_hdf5_fp is None or
                 'in_memory' not in self.features[feature_name]):
-            return self.dataset[feature_name][idx]
+            return read_rows(self.dataset[feature_name], idx)
         if self.features[feature_name]['in_memory']:
-            return self.dataset[feature_name][idx]
+            return read_rows(self.dataset[feature_name], idx)
 
         sub_batch = self.dataset[feature_name][idx]
 
-        indices = np.empty((3, len(sub_batch)), dtype=np.int64)
-        indices[0, :] = sub_batch
-        indices[1, :] = np.arange(len(sub_batch))
-        indices = indices[:, np.argsort(indices[0])]
+        h5_file = get_hdf5_file(self.data_hdf5_fp)
+        return read_rows(
+            get_column(h5_file[feature_name + '_data'], self.data_hdf5_fp),
+            sub_batch
+        )
 
-        with h5py.File(self.data_hdf5_fp, 'r') as h5_file:
-            im_data = h5_file[feature_name + '_data'][indices[0, :], :, :]
-        indices[2, :] = np.arange(len(sub_batch))
-        indices = indices[:, np.argsort(indices[1])]
-        return im_data[indices[2, :]]
+    def get_lengths(self, feature_name):
+        """Returns the number of elements that are not padding of each row of
+        a sequence or text feature, as stored during preprocessing, or
+        counted from the data if they were not stored.
+        """
+        lengths_field = sequence_lengths_field(feature_name)
+        if lengths_field in self.dataset:
+            return self.dataset[lengths_field][:self.size]
+        return np.count_nonzero(self.get(feature_name), axis=1)
 
     def get_dataset(self):
         return self.dataset
 
     def set_dataset(self, dataset):
         self.dataset = dataset
+
+    def shuffle(self):
+        shuffle_inplace(self.dataset)
+
+
+class LazyDataset(Dataset):
+    """Dataset backed by an open HDF5 file. Only the indices of the rows
+    belonging to the dataset are kept in memory, the data is read from disk
+    one batch at a time.
+    """
+
+    def __init__(
+            self,
+            data_hdf5_fp,
+            input_features,
+            output_features,
+            indices=None
+    ):
+        self.data_hdf5_fp = data_hdf5_fp
+        self.h5_file = get_hdf5_file(data_hdf5_fp)
+        self.partitioned = False
+
+        self.input_features = {}
+        for feature in input_features:
+            feature_name = feature['name']
+            self.input_features[feature_name] = feature
+        self.output_features = {}
+        for feature in output_features:
+            feature_name = feature['name']
+            self.output_features[feature_name] = feature
+        self.features = self.input_features.copy()
+        self.features.update(self.output_features)
+
+        self.columns = {}
+        self.fields = {}
+        for feature_name, feature in self.features.items():
+            if feature['type'] == TEXT:
+                field = text_feature_data_field(feature)
+            else:
+                field = feature_name
+            self.fields[feature_name] = field
+            self.columns[feature_name] = get_column(
+                self.h5_file[field],
+                data_hdf5_fp
+            )
+
+        if indices is None:
+            indices = np.arange(
+                min(column.shape[0] for column in self.columns.values())
+            )
+        self.indices = indices
+        self.size = len(indices)
+
+    def get(self, feature_name, idx=None):
+        if idx is None:
+            rows = self.indices
+        else:
+            rows = self.indices[idx]
+        data = read_rows(self.columns[feature_name], rows)
+
+        feature = self.features[feature_name]
+        if 'limit' in feature and feature_name in self.output_features:
+            data = collapse_rare_labels(data, feature['limit'])
+        if 'in_memory' in feature and not feature['in_memory']:
+            data = read_rows(
+                get_column(
+                    self.h5_file[feature_name + '_data'],
+                    self.data_hdf5_fp
+                ),
+                data
+            )
+        return data
+
+    def get_lengths(self, feature_name):
+        lengths_field = sequence_lengths_field(self.fields[feature_name])
+        if lengths_field in self.h5_file:
+            return self.h5_file[lengths_field][()][self.indices]
+        return np.count_nonzero(self.get(feature_name), axis=1)
+
+    def get_dataset(self):
+        return {
+            feature_name: self.get(feature_name)
+            for feature_name in self.features
+        }
+
+    def shuffle(self):
+        np.random.shuffle(self.indices)
+
+
+def get_column(h5_dataset, data_hdf5_fp):
+    """Memory maps contiguous uncompressed HDF5 datasets, so that rows can be
+    read with numpy indexing without going through the HDF5 library.
+    Chunked, compressed or variable length datasets are returned as they are,
+    while sparse matrices, whose size scales with the number of non zero
+    values, are loaded in memory.
+
+    :param h5_dataset: the HDF5 dataset
+    :param data_hdf5_fp: the path of the HDF5 file containing it
+    :return: a numpy memmap, a scipy CSR matrix or the HDF5 dataset
+    """
+    if isinstance(h5_dataset, h5py.Group):
+        return load_hdf5_value(h5_dataset)
+    if (h5_dataset.chunks is not None or
+            h5_dataset.compression is not None or
+            h5_dataset.dtype.hasobject):
+        return h5_dataset
+    offset = h5_dataset.id.get_offset()
+    if offset is None:
+        return h5_dataset
+    return np.memmap(
+        data_hdf5_fp,
+        mode='r',
+        dtype=h5_dataset.dtype,
+        shape=h5_dataset.shape,
+        offset=offset
+    )
+
+
+def read_rows(column, rows):
+    """Reads the rows of a column in the order specified by the rows indices.
+    HDF5 datasets only support increasing indices, so rows are sorted and
+    deduplicated, and contiguous runs of rows are read as single slices.
+    When the rows are dense within their range the whole range is read at
+    once.
+
+    :param column: a numpy array, memmap, scipy sparse matrix or HDF5 dataset
+    :param rows: array of indices of the rows to read
+    :return: numpy array containing the rows
+    """
+    if sparse.issparse(column):
+        # sparse matrices are densified one batch at a time
+        return column[np.asarray(rows)].toarray()
+    if isinstance(column, np.ndarray):
+        return np.asarray(column[rows])
+    rows = np.asarray(rows)
+    if len(rows) == 0:
+        return np.empty((0,) + column.shape[1:], dtype=column.dtype)
+
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    start = unique_rows[0]
+    end = unique_rows[-1] + 1
+    if end - start <= 2 * len(unique_rows):
+        values = column[start:end][unique_rows - start]
+    else:
+        breaks = np.flatnonzero(np.diff(unique_rows) != 1) + 1
+        run_starts = unique_rows[np.concatenate(([0], breaks))]
+        run_ends = unique_rows[
+                       np.concatenate((breaks, [len(unique_rows)])) - 1
+                   ] + 1
+        values = np.concatenate([
+            column[run_start:run_end]
+            for run_start, run_end in zip(run_starts, run_ends)
+        ])
+    return values[inverse]
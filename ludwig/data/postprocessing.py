@@ -60,13 +60,62 @@ def postprocess(
 
 
 def postprocess_df(model_output, output_features, metadata):
+    """Builds the DataFrame of the postprocessed predictions a block at a
+    time: matrices of per class values become frames without copying them
+    and are concatenated with the frames of the other columns, instead of
+    being split into a column each.
+    """
+    frames = []
+    columns = {}
+    for names, values in postprocess_blocks(
+            model_output,
+            output_features,
+            metadata
+    ):
+        if isinstance(names, list):
+            if columns:
+                frames.append(pd.DataFrame(columns))
+                columns = {}
+            frames.append(pd.DataFrame(values, columns=names, copy=False))
+        else:
+            columns[names] = values
+    if columns or not frames:
+        frames.append(pd.DataFrame(columns))
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, axis=1, copy=False)
+
+
+def postprocess_columns(model_output, output_features, metadata):
+    """Postprocesses the predictions into the columns of the DataFrame
+    returned by postprocess_df, without building it.
+    :return: dictionary from column name to array or list
+    """
+    data_for_df = {}
+    for names, values in postprocess_blocks(
+            model_output,
+            output_features,
+            metadata
+    ):
+        if isinstance(names, list):
+            data_for_df.update(zip(names, values.T))
+        else:
+            data_for_df[names] = values
+    return data_for_df
+
+
+def postprocess_blocks(model_output, output_features, metadata):
+    """Postprocesses the predictions and yields them in the order of the
+    columns of the DataFrame: a (list of column names, matrix) pair for
+    matrices with a column for each class, a (column name, column) pair
+    otherwise.
+    """
     postprocessed_output = postprocess(
         model_output,
         output_features,
         metadata,
         skip_save_unprocessed_output=True
     )
-    data_for_df = {}
     for output_feature in output_features:
         output_feature_name = output_feature['name']
         output_feature_type = output_feature['type']
@@ -76,33 +125,37 @@ def postprocess_df(model_output, output_features, metadata):
             if (hasattr(output_type_value, 'shape') and
                 len(output_type_value.shape)) > 1:
                 if output_feature_type in SEQUENCE_TYPES:
-                    data_for_df[
+                    yield (
                         '{}_{}'.format(
                             output_feature_name,
                             output_subgroup_name
-                        )
-                    ] = output_type_value.tolist()
+                        ),
+                        output_type_value.tolist()
+                    )
                 else:
-                    for i, value in enumerate(output_type_value.T):
-                        if (output_feature_name in metadata and
-                                'idx2str' in metadata[output_feature_name]):
-                            class_name = metadata[output_feature_name][
-                                'idx2str'][i]
-                        else:
-                            class_name = str(i)
-                        data_for_df[
+                    if (output_feature_name in metadata and
+                            'idx2str' in metadata[output_feature_name]):
+                        class_names = metadata[output_feature_name][
+                            'idx2str']
+                    else:
+                        class_names = None
+                    yield (
+                        [
                             '{}_{}_{}'.format(
                                 output_feature_name,
                                 output_subgroup_name,
-                                class_name
+                                class_names[i] if class_names is not None
+                                else str(i)
                             )
-                        ] = value
+                            for i in range(output_type_value.shape[1])
+                        ],
+                        output_type_value
+                    )
             else:
-                data_for_df[
+                yield (
                     '{}_{}'.format(
                         output_feature_name,
                         output_subgroup_name
-                    )
-                ] = output_type_value
-    output_df = pd.DataFrame(data_for_df)
-    return output_df
+                    ),
+                    output_type_value
+                )
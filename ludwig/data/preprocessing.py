@@ -15,31 +15,63 @@
 # limitations under the License.
 # ==============================================================================
 import argparse
+import json
 import logging
 import os
+from collections import Counter
+from multiprocessing import Pool
 
 import h5py
 import numpy as np
 import yaml
+from scipy import sparse
 
 from ludwig.constants import *
 from ludwig.constants import TEXT
+from ludwig.data.cache import clear_cache_keys
+from ludwig.data.cache import evict_cache
+from ludwig.data.cache import find_cache_entries
+from ludwig.data.cache import get_cache_fp
+from ludwig.data.cache import get_cache_key
+from ludwig.data.cache import get_config_fingerprint
+from ludwig.data.cache import get_data_fingerprint
+from ludwig.data.cache import is_cached
+from ludwig.data.cache import read_cache_key
+from ludwig.data.cache import read_feature_cache_keys
+from ludwig.data.cache import store_in_cache
+from ludwig.data.cache import touch_cache_entry
+from ludwig.data.cache import write_cache_key
 from ludwig.data.concatenate_datasets import concatenate_csv
 from ludwig.data.concatenate_datasets import concatenate_df
 from ludwig.data.dataset import Dataset
+from ludwig.data.dataset import LazyDataset
+from ludwig.data.dataset import get_column
 from ludwig.features.feature_registries import base_type_registry
 from ludwig.globals import MODEL_HYPERPARAMETERS_FILE_NAME
 from ludwig.utils import data_utils
+from ludwig.utils.data_utils import append_hdf5
+from ludwig.utils.data_utils import close_hdf5_file
 from ludwig.utils.data_utils import collapse_rare_labels
+from ludwig.utils.data_utils import load_hdf5_value
 from ludwig.utils.data_utils import load_json
+from ludwig.utils.data_utils import make_hdf5_resizable
 from ludwig.utils.data_utils import read_csv
+from ludwig.utils.data_utils import read_csv_chunks
+from ludwig.utils.data_utils import sequence_lengths_field
 from ludwig.utils.data_utils import split_dataset_tvt
 from ludwig.utils.data_utils import text_feature_data_field
 from ludwig.utils.defaults import default_preprocessing_parameters
 from ludwig.utils.defaults import default_random_seed
+from ludwig.utils.defaults import default_training_params
 from ludwig.utils.misc import get_from_registry
 from ludwig.utils.misc import merge_dict
 from ludwig.utils.misc import set_random_seed
+from ludwig.utils.strings_utils import clear_tokenization_cache
+
+min_shard_size = 1000
+
+row_ranges_attribute = 'row_ranges'
+partition_block_size = 64 * 1024 ** 2
 
 
 def build_dataset(
@@ -68,27 +100,65 @@ def build_dataset_df(
         global_preprocessing_parameters,
         train_set_metadata=None,
         random_seed=default_random_seed,
+        cached_features=None,
+        data_fields=None,
         **kwargs
 ):
+    """Builds the preprocessed data and the train set metadata of a dataset.
+    :param cached_features: dictionary by feature name of (metadata, data)
+           tuples of features already preprocessed with the same parameters
+           from the same data, that are reused instead of being built again
+    :param data_fields: if provided, it is filled with the list of the
+           fields of the data of each feature, by feature name
+    """
     global_preprocessing_parameters = merge_dict(
         default_preprocessing_parameters,
         global_preprocessing_parameters
     )
 
+    if cached_features is None:
+        cached_features = {}
+    else:
+        logging.info('Reusing preprocessed data of features: {}'.format(
+            ', '.join(sorted(cached_features))
+        ))
+    features_to_build = [feature for feature in features
+                         if feature['name'] not in cached_features]
+
     if train_set_metadata is None:
         train_set_metadata = build_metadata(
             dataset_df,
-            features,
+            features_to_build,
             global_preprocessing_parameters
         )
 
     data_val = build_data(
         dataset_df,
-        features,
+        features_to_build,
         train_set_metadata,
-        global_preprocessing_parameters
+        global_preprocessing_parameters,
+        data_fields=data_fields
     )
 
+    for feature in features:
+        if feature['name'] in cached_features:
+            feature_metadata, feature_data = cached_features[feature['name']]
+            train_set_metadata[feature['name']] = feature_metadata
+            data_val.update(feature_data)
+            if data_fields is not None:
+                data_fields[feature['name']] = sorted(feature_data)
+            if feature['name'] == global_preprocessing_parameters['stratify']:
+                # the split is stratified on the column with missing values
+                # filled, as it would be if the feature was built
+                handle_missing_values(
+                    dataset_df,
+                    feature,
+                    get_feature_preprocessing_parameters(
+                        feature,
+                        global_preprocessing_parameters
+                    )
+                )
+
     data_val['split'] = get_split(
         dataset_df,
         force_split=global_preprocessing_parameters['force_split'],
@@ -99,27 +169,370 @@ def build_dataset_df(
         random_seed=random_seed
     )
 
+    clear_tokenization_cache()
     return data_val, train_set_metadata
 
 
+def build_dataset_chunked(
+        dataset_csv,
+        data_hdf5_fp,
+        features,
+        global_preprocessing_parameters,
+        train_set_metadata=None,
+        random_seed=default_random_seed,
+        hdf5_options=None,
+        **kwargs
+):
+    """Builds the dataset reading the csv a chunk of rows at a time, so that
+    peak memory depends on the chunk size and not on the size of the file.
+    A first pass over the file computes the train set metadata and the
+    values used for filling missing values, a second pass preprocesses each
+    chunk and appends it to the hdf5 file.
+    :param dataset_csv: path to the csv file
+    :param data_hdf5_fp: path of the hdf5 file the dataset is written to
+    :param features: list of features to preprocess
+    :param global_preprocessing_parameters: preprocessing parameters,
+           the number of rows of each chunk is specified by `chunk_size`
+    :param train_set_metadata: if provided, vocabularies and statistics are
+           not recomputed
+    :param random_seed: random seed used for splitting
+    :param hdf5_options: compression and chunking options of the hdf5
+           datasets, by default the ones of the preprocessing parameters
+    :returns: Train set metadata
+    """
+    global_preprocessing_parameters = merge_dict(
+        default_preprocessing_parameters,
+        global_preprocessing_parameters
+    )
+    chunk_size = global_preprocessing_parameters['chunk_size']
+    if hdf5_options is None:
+        hdf5_options = get_hdf5_options(global_preprocessing_parameters)
+
+    for feature in features:
+        if feature['type'] == IMAGE and not feature.get('in_memory', True):
+            raise ValueError(
+                'Chunked preprocessing is not supported for image features '
+                'that are not in memory, feature: {}'.format(feature['name'])
+            )
+
+    logging.debug('Computing metadata, {} rows at a time'.format(chunk_size))
+    feature_stats, missing_value_stats = get_stats_chunked(
+        dataset_csv,
+        features,
+        global_preprocessing_parameters,
+        chunk_size,
+        compute_feature_stats=train_set_metadata is None
+    )
+    if train_set_metadata is None:
+        train_set_metadata = {}
+        for feature in features:
+            train_set_metadata[feature['name']] = get_from_registry(
+                feature['type'],
+                base_type_registry
+            ).get_feature_meta_from_stats(
+                feature_stats[feature['name']],
+                get_feature_preprocessing_parameters(
+                    feature,
+                    global_preprocessing_parameters
+                )
+            )
+
+    # start from an empty file, chunks are appended to it
+    close_hdf5_file(data_hdf5_fp)
+    h5py.File(data_hdf5_fp, 'w').close()
+
+    logging.debug('Building dataset, {} rows at a time'.format(chunk_size))
+    split_random_state = np.random.RandomState(random_seed)
+    num_rows = 0
+    for chunk in fill_missing_values_chunked(
+            read_csv_chunks(dataset_csv, chunk_size),
+            features,
+            global_preprocessing_parameters,
+            missing_value_stats
+    ):
+        chunk.csv = dataset_csv
+        data_val = build_data(
+            chunk,
+            features,
+            train_set_metadata,
+            global_preprocessing_parameters
+        )
+        data_val['split'] = get_split(
+            chunk,
+            force_split=global_preprocessing_parameters['force_split'],
+            split_probabilities=global_preprocessing_parameters[
+                'split_probabilities'
+            ],
+            stratify=global_preprocessing_parameters['stratify'],
+            random_state=split_random_state
+        )
+        append_hdf5(
+            data_hdf5_fp,
+            data_val,
+            train_set_metadata,
+            **hdf5_options
+        )
+        num_rows += len(chunk)
+        logging.debug('  {} rows processed'.format(num_rows))
+
+    clear_tokenization_cache()
+    return train_set_metadata
+
+
+def get_stats_chunked(
+        dataset_csv,
+        features,
+        global_preprocessing_parameters,
+        chunk_size,
+        compute_feature_stats=True
+):
+    feature_stats = {}
+    missing_value_stats = {}
+    for chunk in read_csv_chunks(dataset_csv, chunk_size):
+        if compute_feature_stats:
+            chunk_feature_stats = build_feature_stats(
+                chunk,
+                features,
+                global_preprocessing_parameters
+            )
+        for feature in features:
+            preprocessing_parameters = get_feature_preprocessing_parameters(
+                feature,
+                global_preprocessing_parameters
+            )
+            column = chunk[feature['name']]
+
+            if compute_feature_stats:
+                chunk_stats = chunk_feature_stats[feature['name']]
+                if feature['name'] in feature_stats:
+                    chunk_stats = get_from_registry(
+                        feature['type'],
+                        base_type_registry
+                    ).merge_feature_stats(
+                        feature_stats[feature['name']],
+                        chunk_stats
+                    )
+                feature_stats[feature['name']] = chunk_stats
+
+            strategy = preprocessing_parameters['missing_value_strategy']
+            if strategy == FILL_WITH_MODE:
+                value_counts = missing_value_stats.get(
+                    feature['name'],
+                    Counter()
+                )
+                value_counts.update(column.value_counts().to_dict())
+                missing_value_stats[feature['name']] = value_counts
+            elif strategy == FILL_WITH_MEAN:
+                total, count = missing_value_stats.get(feature['name'], (0, 0))
+                missing_value_stats[feature['name']] = (
+                    total + column.sum(),
+                    count + column.count()
+                )
+
+    return feature_stats, missing_value_stats
+
+
+def fill_missing_values_chunked(
+        chunks,
+        features,
+        global_preprocessing_parameters,
+        missing_value_stats
+):
+    # modes and means are computed on the whole file and forward and
+    # backward filling are carried over the boundaries between chunks,
+    # so that chunks are filled the same way a full dataframe would be
+    fill_values = {}
+    forward_fill_features = []
+    backward_fill_features = []
+    for feature in features:
+        preprocessing_parameters = get_feature_preprocessing_parameters(
+            feature,
+            global_preprocessing_parameters
+        )
+        strategy = preprocessing_parameters['missing_value_strategy']
+        if strategy == FILL_WITH_MODE:
+            fill_values[feature['name']] = missing_value_stats[
+                feature['name']
+            ].most_common(1)[0][0]
+        elif strategy == FILL_WITH_MEAN:
+            if feature['type'] != NUMERICAL:
+                raise ValueError(
+                    'Filling missing values with mean is supported '
+                    'only for numerical types',
+                )
+            total, count = missing_value_stats[feature['name']]
+            fill_values[feature['name']] = total / count
+        elif strategy in ['pad', 'ffill']:
+            forward_fill_features.append(feature['name'])
+        elif strategy in ['backfill', 'bfill']:
+            backward_fill_features.append(feature['name'])
+
+    last_values = {}
+    # chunks whose backward filled features still end with missing values
+    # are held back until a later chunk has a value to fill them with
+    pending_chunks = []
+    for chunk in chunks:
+        for name, fill_value in fill_values.items():
+            chunk[name] = chunk[name].fillna(fill_value)
+
+        for name in forward_fill_features:
+            chunk[name] = chunk[name].fillna(method='ffill')
+            if name in last_values:
+                chunk[name] = chunk[name].fillna(last_values[name])
+            last_valid_index = chunk[name].last_valid_index()
+            if last_valid_index is not None:
+                last_values[name] = chunk[name][last_valid_index]
+
+        for name in backward_fill_features:
+            chunk[name] = chunk[name].fillna(method='bfill')
+            first_valid_index = chunk[name].first_valid_index()
+            if first_valid_index is not None:
+                for pending_chunk in pending_chunks:
+                    pending_chunk[name] = pending_chunk[name].fillna(
+                        chunk[name][first_valid_index]
+                    )
+
+        pending_chunks.append(chunk)
+        while pending_chunks and not any(
+                pending_chunks[0][name].isnull().any()
+                for name in backward_fill_features
+        ):
+            yield pending_chunks.pop(0)
+
+    # values at the end of the file have nothing to be filled with
+    for chunk in pending_chunks:
+        yield chunk
+
+
+def get_feature_preprocessing_parameters(
+        feature,
+        global_preprocessing_parameters
+):
+    if 'preprocessing' in feature:
+        return merge_dict(
+            global_preprocessing_parameters[feature['type']],
+            feature['preprocessing']
+        )
+    return global_preprocessing_parameters[feature['type']]
+
+
+def get_hdf5_options(global_preprocessing_parameters, batch_size=None):
+    """Returns the compression and chunking options of the hdf5 datasets.
+    Unless specified, chunks are made of batch_size rows, so that reading a
+    batch decompresses as few chunks as possible.
+    :param global_preprocessing_parameters: preprocessing parameters
+    :param batch_size: training batch size
+    :return: keyword arguments of save_hdf5 and append_hdf5
+    """
+    chunk_rows = global_preprocessing_parameters['hdf5_chunk_rows']
+    if chunk_rows is None:
+        chunk_rows = batch_size
+    return {
+        'compression': global_preprocessing_parameters['hdf5_compression'],
+        'compression_opts': global_preprocessing_parameters[
+            'hdf5_compression_level'
+        ],
+        'chunk_rows': chunk_rows
+    }
+
+
+def get_row_shards(num_rows, num_processes):
+    """Splits the rows of a dataset in contiguous shards of at least
+    `min_shard_size` rows, one for each process at most.
+
+    :param num_rows: number of rows in the dataset
+    :param num_processes: number of processes available
+    :return: a list of (start, end) tuples
+    """
+    num_shards = min(num_processes, num_rows // min_shard_size)
+    if num_shards <= 1:
+        return [(0, num_rows)]
+    bounds = np.linspace(0, num_rows, num_shards + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def get_feature_stats_shard(args):
+    feature, column, preprocessing_parameters = args
+    return get_from_registry(
+        feature['type'],
+        base_type_registry
+    ).get_feature_stats(column, preprocessing_parameters)
+
+
+def add_feature_data_shard(args):
+    feature, shard_df, feature_metadata, preprocessing_parameters = args
+    data = {}
+    get_from_registry(
+        feature['type'],
+        base_type_registry
+    ).add_feature_data(
+        feature,
+        shard_df,
+        data,
+        {feature['name']: feature_metadata},
+        preprocessing_parameters
+    )
+    return data
+
+
+def build_feature_stats(dataset_df, features, global_preprocessing_parameters):
+    num_processes = global_preprocessing_parameters.get(
+        'num_processes',
+        default_preprocessing_parameters['num_processes']
+    )
+    shards = get_row_shards(len(dataset_df), num_processes)
+
+    tasks = []
+    for feature in features:
+        preprocessing_parameters = get_feature_preprocessing_parameters(
+            feature,
+            global_preprocessing_parameters
+        )
+        column = dataset_df[feature['name']].astype(str)
+        for start, end in shards:
+            tasks.append((
+                feature,
+                column[start:end].reset_index(drop=True),
+                preprocessing_parameters
+            ))
+
+    if len(shards) > 1:
+        with Pool(num_processes) as pool:
+            shard_stats = pool.map(get_feature_stats_shard, tasks)
+    else:
+        shard_stats = [get_feature_stats_shard(task) for task in tasks]
+
+    # shards are merged in order so that ties in the vocabularies
+    # are broken exactly as they would be on the whole dataset
+    feature_stats = {}
+    for (feature, _, _), stats in zip(tasks, shard_stats):
+        if feature['name'] in feature_stats:
+            stats = get_from_registry(
+                feature['type'],
+                base_type_registry
+            ).merge_feature_stats(feature_stats[feature['name']], stats)
+        feature_stats[feature['name']] = stats
+    return feature_stats
+
+
 def build_metadata(dataset_df, features, global_preprocessing_parameters):
+    feature_stats = build_feature_stats(
+        dataset_df,
+        features,
+        global_preprocessing_parameters
+    )
     train_set_metadata = {}
     for feature in features:
-        get_feature_meta = get_from_registry(
+        get_feature_meta_from_stats = get_from_registry(
             feature['type'],
             base_type_registry
-        ).get_feature_meta
-        if 'preprocessing' in feature:
-            preprocessing_parameters = merge_dict(
-                global_preprocessing_parameters[feature['type']],
-                feature['preprocessing']
-            )
-        else:
-            preprocessing_parameters = global_preprocessing_parameters[
-                feature['type']
-            ]
-        train_set_metadata[feature['name']] = get_feature_meta(
-            dataset_df[feature['name']].astype(str),
+        ).get_feature_meta_from_stats
+        preprocessing_parameters = get_feature_preprocessing_parameters(
+            feature,
+            global_preprocessing_parameters
+        )
+        train_set_metadata[feature['name']] = get_feature_meta_from_stats(
+            feature_stats[feature['name']],
             preprocessing_parameters
         )
     return train_set_metadata
@@ -129,23 +542,26 @@ def build_data(
         dataset_df,
         features,
         train_set_metadata,
-        global_preprocessing_parameters
+        global_preprocessing_parameters,
+        data_fields=None
 ):
+    num_processes = global_preprocessing_parameters.get(
+        'num_processes',
+        default_preprocessing_parameters['num_processes']
+    )
+    shards = get_row_shards(len(dataset_df), num_processes)
+
     data = {}
+    tasks = []
     for feature in features:
         add_feature_data = get_from_registry(
             feature['type'],
             base_type_registry
         ).add_feature_data
-        if 'preprocessing' in feature:
-            preprocessing_parameters = merge_dict(
-                global_preprocessing_parameters[feature['type']],
-                feature['preprocessing']
-            )
-        else:
-            preprocessing_parameters = global_preprocessing_parameters[
-                feature['type']
-            ]
+        preprocessing_parameters = get_feature_preprocessing_parameters(
+            feature,
+            global_preprocessing_parameters
+        )
         handle_missing_values(
             dataset_df,
             feature,
@@ -156,13 +572,45 @@ def build_data(
         train_set_metadata[
             feature['name']
         ]['preprocessing'] = preprocessing_parameters
-        add_feature_data(
-            feature,
-            dataset_df,
-            data,
-            train_set_metadata,
-            preprocessing_parameters
-        )
+
+        # images may write to the hdf5 file and update the metadata,
+        # so they are always added by the main process
+        if len(shards) > 1 and feature['type'] != IMAGE:
+            shard_df = dataset_df[[feature['name']]]
+            for start, end in shards:
+                tasks.append((
+                    feature,
+                    shard_df[start:end].reset_index(drop=True),
+                    train_set_metadata[feature['name']],
+                    preprocessing_parameters
+                ))
+        else:
+            fields = set(data)
+            add_feature_data(
+                feature,
+                dataset_df,
+                data,
+                train_set_metadata,
+                preprocessing_parameters
+            )
+            if data_fields is not None:
+                data_fields[feature['name']] = sorted(set(data) - fields)
+
+    if tasks:
+        with Pool(num_processes) as pool:
+            shard_data = pool.map(add_feature_data_shard, tasks)
+        shard_data_by_key = {}
+        for (feature, _, _, _), shard in zip(tasks, shard_data):
+            if data_fields is not None:
+                data_fields[feature['name']] = sorted(shard)
+            for key, value in shard.items():
+                shard_data_by_key.setdefault(key, []).append(value)
+        for key, values in shard_data_by_key.items():
+            if sparse.issparse(values[0]):
+                data[key] = sparse.vstack(values, format='csr')
+            else:
+                data[key] = np.concatenate(values)
+
     return data
 
 
@@ -200,13 +648,16 @@ def get_split(
         split_probabilities=(0.7, 0.1, 0.2),
         stratify=None,
         random_seed=default_random_seed,
+        random_state=None
 ):
     if 'split' in dataset_df and not force_split:
         split = dataset_df['split']
     else:
-        set_random_seed(random_seed)
+        if random_state is None:
+            set_random_seed(random_seed)
+            random_state = np.random
         if stratify is None:
-            split = np.random.choice(
+            split = random_state.choice(
                 3,
                 len(dataset_df),
                 p=split_probabilities,
@@ -217,7 +668,7 @@ def get_split(
                 idx_list = (
                     dataset_df.index[dataset_df[stratify] == val].tolist()
                 )
-                val_list = np.random.choice(
+                val_list = random_state.choice(
                     3,
                     len(idx_list),
                     p=split_probabilities,
@@ -231,40 +682,86 @@ def load_data(
         input_features,
         output_features,
         split_data=True,
-        shuffle_training=False
+        shuffle_training=False,
+        in_memory=True,
+        partition=None,
+        shuffle_partition=True,
+        random_seed=default_random_seed
 ):
+    if not in_memory:
+        # rows are read from disk one batch at a time,
+        # so the batchers take care of partitioning them among workers
+        return load_data_lazy(
+            hdf5_file_path,
+            input_features,
+            output_features,
+            split_data=split_data,
+            shuffle_training=shuffle_training
+        )
+
     logging.info('Loading data from: {0}'.format(hdf5_file_path))
     # Load data from file
     hdf5_data = h5py.File(hdf5_file_path, 'r')
+    split = None
+    if split_data:
+        split = hdf5_data['split'][()]
+
+    rows = None
+    if partition is not None:
+        if split is None:
+            num_rows = next(
+                len(value) for value in hdf5_data.values()
+                if isinstance(value, h5py.Dataset)
+            )
+            rows = get_partition_rows(
+                np.zeros(num_rows, dtype=np.int8),
+                partition,
+                random_seed,
+                shuffled_splits=(0,) if shuffle_partition else ()
+            )
+        else:
+            rows = get_partition_rows(split, partition, random_seed)
+            split = split[rows]
+
+    def load_field(field):
+        if rows is None:
+            return load_hdf5_value(hdf5_data[field])
+        if isinstance(hdf5_data[field], h5py.Group):
+            return load_hdf5_value(hdf5_data[field])[rows]
+        return read_partition(
+            get_column(hdf5_data[field], hdf5_file_path),
+            rows
+        )
+
     dataset = {}
     for input_feature in input_features:
         if input_feature['type'] == TEXT:
-            text_data_field = text_feature_data_field(input_feature)
-            dataset[text_data_field] = hdf5_data[text_data_field].value
+            field = text_feature_data_field(input_feature)
         else:
-            dataset[input_feature['name']] = hdf5_data[
-                input_feature['name']
-            ].value
+            field = input_feature['name']
+        dataset[field] = load_field(field)
+        # lengths of sequences, used for bucketing
+        lengths_field = sequence_lengths_field(field)
+        if lengths_field in hdf5_data:
+            dataset[lengths_field] = load_field(lengths_field)
     for output_feature in output_features:
         if output_feature['type'] == TEXT:
-            dataset[text_feature_data_field(output_feature)] = hdf5_data[
-                text_feature_data_field(output_feature)
-            ].value
+            text_data_field = text_feature_data_field(output_feature)
+            dataset[text_data_field] = load_field(text_data_field)
         else:
-            dataset[output_feature['name']] = hdf5_data[
-                output_feature['name']].value
+            dataset[output_feature['name']] = load_field(
+                output_feature['name']
+            )
         if 'limit' in output_feature:
             dataset[output_feature['name']] = collapse_rare_labels(
                 dataset[output_feature['name']],
                 output_feature['limit']
             )
+    hdf5_data.close()
 
     if not split_data:
-        hdf5_data.close()
         return dataset
 
-    split = hdf5_data['split'].value
-    hdf5_data.close()
     training_set, test_set, validation_set = split_dataset_tvt(dataset, split)
 
     # shuffle up
@@ -274,6 +771,107 @@ def load_data(
     return training_set, test_set, validation_set
 
 
+def read_partition(column, rows, block_size=partition_block_size):
+    """Reads the rows of a partition of a column one block of contiguous
+    rows at a time, so that reading rows scattered over the whole column
+    holds at most one block of the rows of other partitions in memory.
+
+    :param column: a numpy array, memmap or HDF5 dataset
+    :param rows: sorted array of the indices of the rows to read
+    :param block_size: size in bytes of the blocks of rows
+    :return: numpy array containing the rows
+    """
+    if isinstance(column, np.ndarray):
+        return np.asarray(column[rows])
+    row_size = column.dtype.itemsize * int(np.prod(column.shape[1:]))
+    block_rows = max(1, block_size // max(row_size, 1))
+    block_starts = np.arange(0, column.shape[0] + block_rows, block_rows)
+    bounds = np.searchsorted(rows, block_starts)
+    values = [
+        column[start:start + block_rows][rows[lower:upper] - start]
+        for start, lower, upper in zip(block_starts, bounds[:-1], bounds[1:])
+        if upper > lower
+    ]
+    if not values:
+        return np.empty((0,) + column.shape[1:], dtype=column.dtype)
+    return np.concatenate(values)
+
+
+def get_partition_rows(split, partition, random_seed=default_random_seed,
+                       shuffled_splits=(0,)):
+    """Returns the sorted indices of the rows of a partition of the data.
+    The rows of the shuffled splits are dealt to the partitions following a
+    permutation that every worker computes from the same seed, so partitions
+    are random samples of the split of the same size, repeating a few rows
+    when the split does not divide evenly. The rows of the other splits are
+    divided in contiguous ranges, the same ones used by the distributed
+    batcher, so that concatenating the outputs of the workers in order of
+    rank preserves the order of the rows.
+
+    :param split: array of the split of each row
+    :param partition: tuple of the index of the partition and the number of
+           partitions
+    :param random_seed: seed of the permutation
+    :param shuffled_splits: splits whose rows are dealt randomly
+    :return: array of row indices
+    """
+    partition_index, num_partitions = partition
+    random_state = np.random.RandomState(random_seed)
+    rows = []
+    for split_value in np.unique(split):
+        split_rows = np.flatnonzero(split == split_value)
+        if split_value in shuffled_splits:
+            # rows are repeated so that all partitions have the same size
+            # and all workers train for the same number of steps
+            split_rows = np.resize(
+                random_state.permutation(split_rows),
+                -(-len(split_rows) // num_partitions) * num_partitions
+            )
+            rows.append(split_rows[partition_index::num_partitions])
+        else:
+            partition_size = len(split_rows) // num_partitions
+            start = partition_size * partition_index
+            if partition_index == num_partitions - 1:
+                rows.append(split_rows[start:])
+            else:
+                rows.append(split_rows[start:start + partition_size])
+    return np.sort(np.concatenate(rows))
+
+
+def load_data_lazy(
+        hdf5_file_path,
+        input_features,
+        output_features,
+        split_data=True,
+        shuffle_training=False
+):
+    logging.info('Opening data from: {0}'.format(hdf5_file_path))
+    if not split_data:
+        return LazyDataset(hdf5_file_path, input_features, output_features)
+
+    with h5py.File(hdf5_file_path, 'r') as hdf5_data:
+        split = hdf5_data['split'][()]
+
+    datasets = []
+    for value_to_split in (0, 2, 1):
+        indices = np.flatnonzero(split == value_to_split)
+        if len(indices) == 0:
+            datasets.append(None)
+        else:
+            datasets.append(LazyDataset(
+                hdf5_file_path,
+                input_features,
+                output_features,
+                indices
+            ))
+    training_set, test_set, validation_set = datasets
+
+    if shuffle_training and training_set is not None:
+        training_set.shuffle()
+
+    return training_set, test_set, validation_set
+
+
 def load_metadata(metadata_file_path):
     logging.info('Loading metadata from: {0}'.format(metadata_file_path))
     return data_utils.load_json(metadata_file_path)
@@ -296,6 +894,204 @@ dataset_type_registry = {
 }
 
 
+def get_feature_cache_config(feature, global_preprocessing_parameters):
+    return {
+        'name': feature['name'],
+        'type': feature['type'],
+        'preprocessing': get_feature_preprocessing_parameters(
+            feature,
+            global_preprocessing_parameters
+        ),
+        'feature': {
+            key: feature.get(key) for key in get_from_registry(
+                feature['type'],
+                base_type_registry
+            ).feature_preprocessing_keys
+        }
+    }
+
+
+def get_preprocessing_cache_key(
+        data_fingerprint,
+        features,
+        global_preprocessing_parameters,
+        random_seed
+):
+    """Computes the key identifying the preprocessed version of the data
+    files, from their fingerprint, the preprocessing parameters of each
+    feature and the parameters used for splitting the data.
+    """
+    config = {
+        'features': [
+            get_feature_cache_config(feature, global_preprocessing_parameters)
+            for feature in features
+        ],
+        'force_split': global_preprocessing_parameters['force_split'],
+        'split_probabilities': global_preprocessing_parameters[
+            'split_probabilities'
+        ],
+        'stratify': global_preprocessing_parameters['stratify'],
+        'random_seed': random_seed
+    }
+    return get_cache_key(data_fingerprint, get_config_fingerprint(config))
+
+
+def get_feature_cache_keys(
+        data_fingerprint,
+        features,
+        global_preprocessing_parameters
+):
+    """Computes the keys identifying the preprocessed data of each feature,
+    so that the features whose parameters did not change can be reused when
+    the parameters of other features change.
+    :return: dictionary of cache keys by feature name
+    """
+    feature_cache_keys = {}
+    for feature in features:
+        # images that are not in memory are written to the hdf5 file
+        # while they are built, so they are always built again
+        if feature['type'] == IMAGE and not feature.get('in_memory', True):
+            continue
+        feature_cache_keys[feature['name']] = get_cache_key(
+            data_fingerprint,
+            get_config_fingerprint(
+                get_feature_cache_config(
+                    feature,
+                    global_preprocessing_parameters
+                )
+            )
+        )
+    return feature_cache_keys
+
+
+def load_cached_features(
+        data_hdf5_fps,
+        metadata_json_fp,
+        feature_cache_keys
+):
+    """Loads the data and metadata of the features of previously preprocessed
+    files that were preprocessed with the same feature cache keys.
+    :param data_hdf5_fps: paths of the hdf5 files, the rows of which
+           concatenated in order are the rows of the dataset
+    :param metadata_json_fp: path of the train set metadata json
+    :param feature_cache_keys: dictionary of cache keys by feature name
+    :return: dictionary of (metadata, data) tuples by feature name
+    """
+    if (not os.path.isfile(metadata_json_fp) or
+            not all(os.path.isfile(fp) for fp in data_hdf5_fps)):
+        return {}
+    stored_cache_keys = [read_feature_cache_keys(fp) for fp in data_hdf5_fps]
+    cached_feature_names = [
+        name for name, cache_key in feature_cache_keys.items()
+        if all(stored.get(name, {}).get('key') == cache_key
+               for stored in stored_cache_keys)
+    ]
+    if not cached_feature_names:
+        return {}
+
+    train_set_metadata = load_json(metadata_json_fp)
+    cached_features = {}
+    for name in cached_feature_names:
+        feature_data = {}
+        for field in stored_cache_keys[0][name]['fields']:
+            values = []
+            for data_hdf5_fp in data_hdf5_fps:
+                close_hdf5_file(data_hdf5_fp)
+                with h5py.File(data_hdf5_fp, 'r') as h5_file:
+                    values.append(load_hdf5_value(h5_file[field]))
+            if sparse.issparse(values[0]):
+                feature_data[field] = sparse.vstack(values, format='csr')
+            else:
+                feature_data[field] = np.concatenate(values)
+        cached_features[name] = (train_set_metadata[name], feature_data)
+    return cached_features
+
+
+def find_cached_features(
+        cache_fps,
+        metadata_json_fp,
+        data_fingerprint,
+        feature_cache_keys,
+        global_preprocessing_parameters
+):
+    """Looks for the most recently preprocessed version of the same data
+    files, either with the same filename of the csv or in the cache
+    directory, and loads the features that can be reused from it.
+    :param cache_fps: dictionary of suffixes in the cache by path
+           of the preprocessed files
+    :param metadata_json_fp: path of the train set metadata json
+    :return: dictionary of (metadata, data) tuples by feature name
+    """
+    cache_dir = global_preprocessing_parameters['cache_dir']
+    if cache_dir is None:
+        candidates = [(
+            [fp for fp in cache_fps if fp.endswith('.hdf5')],
+            metadata_json_fp
+        )]
+    else:
+        candidates = [
+            (
+                [get_cache_fp(cache_dir, cache_key, suffix)
+                 for suffix in cache_fps.values()
+                 if suffix.endswith('hdf5')],
+                get_cache_fp(cache_dir, cache_key, cache_fps[metadata_json_fp])
+            )
+            for cache_key in find_cache_entries(cache_dir, data_fingerprint)
+        ]
+
+    for data_hdf5_fps, candidate_json_fp in candidates:
+        cached_features = load_cached_features(
+            data_hdf5_fps,
+            candidate_json_fp,
+            feature_cache_keys
+        )
+        if cached_features:
+            return cached_features
+    return None
+
+
+def cache_preprocessed_data(
+        cache_fps,
+        cache_key,
+        global_preprocessing_parameters,
+        feature_cache_keys=None,
+        data_fields=None
+):
+    """Tags the preprocessed hdf5 files with the cache key and, if a cache
+    directory is specified, moves them and the metadata json into it.
+    :param cache_fps: dictionary of paths in the cache by path
+           of the preprocessed files
+    :param cache_key: key of the preprocessed data
+    :param global_preprocessing_parameters: preprocessing parameters
+    :param feature_cache_keys: dictionary of cache keys by feature name
+    :param data_fields: dictionary of the fields of the data of each feature
+    """
+    stored_cache_keys = None
+    if feature_cache_keys is not None and data_fields is not None:
+        stored_cache_keys = {
+            name: {'key': feature_cache_key, 'fields': data_fields[name]}
+            for name, feature_cache_key in feature_cache_keys.items()
+            if name in data_fields
+        }
+    for fp in cache_fps:
+        if fp.endswith('.hdf5') and os.path.isfile(fp):
+            write_cache_key(fp, cache_key, stored_cache_keys)
+
+    cache_dir = global_preprocessing_parameters['cache_dir']
+    if cache_dir is not None:
+        store_in_cache(
+            {fp: cache_fp for fp, cache_fp in cache_fps.items()
+             if os.path.isfile(fp)},
+            cache_dir
+        )
+        evict_cache(
+            cache_dir,
+            max_size=global_preprocessing_parameters['cache_max_size'],
+            max_age=global_preprocessing_parameters['cache_max_age'],
+            keep=cache_key
+        )
+
+
 def preprocess_for_training(
         model_definition,
         dataset_type='generic',
@@ -314,67 +1110,179 @@ def preprocess_for_training(
         train_set_metadata_json=None,
         skip_save_processed_input=False,
         preprocessing_params=default_preprocessing_parameters,
-        random_seed=default_random_seed
+        random_seed=default_random_seed,
+        partition=None
 ):
+    in_memory = preprocessing_params.get(
+        'in_memory',
+        default_preprocessing_parameters['in_memory']
+    )
+
+    global_preprocessing_parameters = merge_dict(
+        default_preprocessing_parameters,
+        preprocessing_params
+    )
+    cache_dir = global_preprocessing_parameters['cache_dir']
+    hdf5_options = get_hdf5_options(
+        global_preprocessing_parameters,
+        model_definition['training']['batch_size']
+    )
+    features = (model_definition['input_features'] +
+                model_definition['output_features'])
+
     # Check if hdf5 and json already exist
     data_hdf5_fp = None
     data_train_hdf5_fp = None
     data_validation_hdf5_fp = None
     data_test_hdf5_fp = None
     train_set_metadata_json_fp = 'metadata.json'
+    cache_key = None
+    cache_fps = {}
+    data_fps = []
     if data_csv is not None:
         data_hdf5_fp = os.path.splitext(data_csv)[0] + '.hdf5'
         train_set_metadata_json_fp = os.path.splitext(data_csv)[0] + '.json'
-        if (os.path.isfile(data_hdf5_fp) and
-                os.path.isfile(train_set_metadata_json_fp)):
-            logging.info(
-                'Found hdf5 and json with the same filename '
-                'of the csv, using them instead'
-            )
-            data_csv = None
-            data_hdf5 = data_hdf5_fp
-            train_set_metadata_json = train_set_metadata_json_fp
+        data_fps = [data_csv]
+        cache_fps = {data_hdf5_fp: 'hdf5',
+                     train_set_metadata_json_fp: 'json'}
 
-    if data_train_csv is not None:
+    elif data_train_csv is not None:
         data_train_hdf5_fp = os.path.splitext(data_train_csv)[0] + '.hdf5'
         train_set_metadata_json_fp = os.path.splitext(data_train_csv)[
                                          0] + '.json'
-        if (os.path.isfile(data_train_hdf5_fp) and
-                os.path.isfile(train_set_metadata_json_fp)):
-            logging.info(
-                'Found hdf5 and json with the same filename of '
-                'the train csv, using them instead'
-            )
-            data_train_csv = None
-            data_train_hdf5 = data_train_hdf5_fp
-            train_set_metadata_json = train_set_metadata_json_fp
-
-    if data_validation_csv is not None:
-        data_validation_hdf5_fp = os.path.splitext(
-            data_validation_csv)[0] + '.hdf5'
-        if os.path.isfile(data_validation_hdf5_fp):
-            logging.info(
-                'Found hdf5 with the same filename of '
-                'the validation csv, using it instead'
-            )
-            data_validation_csv = None
-            data_validation_hdf5 = data_validation_hdf5_fp
+        cache_fps = {data_train_hdf5_fp: 'training.hdf5',
+                     train_set_metadata_json_fp: 'json'}
+        if data_validation_csv is not None:
+            data_validation_hdf5_fp = os.path.splitext(
+                data_validation_csv)[0] + '.hdf5'
+            cache_fps[data_validation_hdf5_fp] = 'validation.hdf5'
+        if data_test_csv is not None:
+            data_test_hdf5_fp = os.path.splitext(data_test_csv)[0] + '.hdf5'
+            cache_fps[data_test_hdf5_fp] = 'test.hdf5'
+        data_fps = [
+            fp for fp in (data_train_csv, data_validation_csv, data_test_csv)
+            if fp is not None
+        ]
+
+    cached_features = None
+    data_fields = {}
+    # only data loaded from hdf5 is loaded one partition at a time
+    partitioned = False
+    feature_cache_keys = None
+    if data_fps:
+        data_fingerprint = get_data_fingerprint(
+            data_fps,
+            global_preprocessing_parameters['cache_content_hash']
+        )
+        cache_key = get_preprocessing_cache_key(
+            data_fingerprint,
+            features,
+            global_preprocessing_parameters,
+            random_seed
+        )
+        feature_cache_keys = get_feature_cache_keys(
+            data_fingerprint,
+            features,
+            global_preprocessing_parameters
+        )
+        cache_suffixes = cache_fps
+
+        # the preprocessed files are next to the csv files
+        # or in the cache directory, named after the cache key
+        if cache_dir is not None:
+            cache_fps = {
+                fp: get_cache_fp(cache_dir, cache_key, suffix)
+                for fp, suffix in cache_fps.items()
+            }
+        else:
+            cache_fps = {fp: fp for fp in cache_fps}
+        cached_hdf5_fps = [cache_fp for cache_fp in cache_fps.values()
+                           if cache_fp.endswith('.hdf5')]
+        cached_json_fp = cache_fps[train_set_metadata_json_fp]
 
-    if data_test_csv is not None:
-        data_test_hdf5_fp = os.path.splitext(data_test_csv)[0] + '.hdf5'
-        if os.path.isfile(data_test_hdf5_fp):
+        if is_cached(cached_hdf5_fps, cached_json_fp, cache_key):
             logging.info(
-                'Found hdf5 with the same filename of '
-                'the validation csv, using it instead'
+                'Found hdf5 and json preprocessed from the same csv '
+                'with the same parameters, using them instead'
             )
-            data_test_csv = None
-            data_test_hdf5 = data_test_hdf5_fp
+            if cache_dir is not None:
+                touch_cache_entry(cache_dir, cache_key)
+                evict_cache(
+                    cache_dir,
+                    max_size=global_preprocessing_parameters['cache_max_size'],
+                    max_age=global_preprocessing_parameters['cache_max_age'],
+                    keep=cache_key
+                )
+            if data_csv is not None:
+                data_csv = None
+                data_hdf5_fp = cache_fps[data_hdf5_fp]
+                data_hdf5 = data_hdf5_fp
+            else:
+                data_train_csv = None
+                data_train_hdf5 = cache_fps[data_train_hdf5_fp]
+                data_validation_hdf5 = cache_fps.get(data_validation_hdf5_fp)
+                data_test_hdf5 = cache_fps.get(data_test_hdf5_fp)
+            train_set_metadata_json = cached_json_fp
+        else:
+            # features whose parameters did not change are reused from the
+            # previous version of the preprocessed data, unless the rows are
+            # streamed in chunks or the train, validation and test files
+            # are not stored in the order of the csv files
+            if (not (data_csv is not None and
+                     global_preprocessing_parameters['chunk_size']) and
+                    not (data_train_csv is not None and
+                         global_preprocessing_parameters['force_split'])):
+                cached_features = find_cached_features(
+                    cache_suffixes,
+                    train_set_metadata_json_fp,
+                    data_fingerprint,
+                    feature_cache_keys,
+                    global_preprocessing_parameters
+                )
 
-    model_definition['data_hdf5_fp'] = data_hdf5_fp
+            # stale preprocessed files are removed, as the hdf5 files are
+            # written next to the csv files, before being moved into
+            # cache_dir, and in_memory false images are written into
+            # existing hdf5 files with mode r+. Only files tagged with a
+            # cache key were written by Ludwig preprocessing, and the files
+            # next to the csv are not removed when caching in cache_dir
+            for fp in cache_fps.values():
+                if (fp.endswith('.hdf5') and os.path.isfile(fp) and
+                        read_cache_key(fp) is not None):
+                    logging.info(
+                        'Removing {} as it was preprocessed from different '
+                        'data or with different parameters'.format(fp)
+                    )
+                    close_hdf5_file(fp)
+                    os.remove(fp)
+
+            # any other file where this run writes its hdf5 files is not
+            # written into, as its content was not produced by this run
+            writes_hdf5 = (
+                not skip_save_processed_input or
+                (data_csv is not None and
+                 global_preprocessing_parameters['chunk_size']) or
+                any(feature['type'] == IMAGE and
+                    not feature.get('in_memory', True)
+                    for feature in features)
+            )
+            for fp in cache_fps:
+                if (writes_hdf5 and fp.endswith('.hdf5') and
+                        os.path.isfile(fp)):
+                    if cache_dir is not None:
+                        reason = ('preprocessed files are stored in '
+                                  'cache_dir {}'.format(cache_dir))
+                    else:
+                        reason = ('it has no preprocessing cache key, so it '
+                                  'was not written by this version of Ludwig')
+                    raise ValueError(
+                        'Preprocessing writes {0}, which already exists and '
+                        'is not replaced, as {1}. Remove or rename it, or '
+                        'pass it as data hdf5 along with its train set '
+                        'metadata json to use it as it is'.format(fp, reason)
+                    )
 
     # Decide if to preprocess or just load
-    features = (model_definition['input_features'] +
-                model_definition['output_features'])
     (
         concatenate_csv,
         concatenate_df,
@@ -394,7 +1302,12 @@ def preprocess_for_training(
         )
         if not skip_save_processed_input:
             logging.info('Writing dataset')
-            data_utils.save_hdf5(data_hdf5_fp, data, train_set_metadata)
+            data_utils.save_hdf5(
+                data_hdf5_fp,
+                data,
+                train_set_metadata,
+                **hdf5_options
+            )
         logging.info('Writing train set metadata with vocabulary')
         data_utils.save_json(train_set_metadata_json_fp, train_set_metadata)
         training_set, test_set, validation_set = split_dataset_tvt(
@@ -426,19 +1339,22 @@ def preprocess_for_training(
             data_utils.save_hdf5(
                 data_train_hdf5_fp,
                 training_set,
-                train_set_metadata
+                train_set_metadata,
+                **hdf5_options
             )
             if validation_set is not None:
                 data_utils.save_hdf5(
                     data_validation_hdf5_fp,
                     validation_set,
-                    train_set_metadata
+                    train_set_metadata,
+                    **hdf5_options
                 )
             if test_set is not None:
                 data_utils.save_hdf5(
                     data_test_hdf5_fp,
                     test_set,
-                    train_set_metadata
+                    train_set_metadata,
+                    **hdf5_options
                 )
         logging.info('Writing train set metadata with vocabulary')
         data_utils.save_json(train_set_metadata_json_fp, train_set_metadata)
@@ -451,22 +1367,68 @@ def preprocess_for_training(
             'with the same name have been found'
         )
         logging.info('Building dataset (it may take a while)')
-        data, train_set_metadata = build_dataset(
-            data_csv,
-            features,
-            preprocessing_params,
-            random_seed=random_seed
-        )
-        if not skip_save_processed_input:
-            logging.info('Writing dataset')
-            data_utils.save_hdf5(data_hdf5_fp, data, train_set_metadata)
-            logging.info('Writing train set metadata with vocabulary')
-            data_utils.save_json(
-                train_set_metadata_json_fp, train_set_metadata)
-        training_set, test_set, validation_set = split_dataset_tvt(
-            data,
-            data['split']
-        )
+        if preprocessing_params.get('chunk_size'):
+            # the dataset is written to hdf5 while it is built,
+            # so that the whole csv is never loaded in memory
+            train_set_metadata = build_dataset_chunked(
+                data_csv,
+                data_hdf5_fp,
+                features,
+                preprocessing_params,
+                random_seed=random_seed,
+                hdf5_options=hdf5_options
+            )
+            if not skip_save_processed_input:
+                logging.info('Writing train set metadata with vocabulary')
+                data_utils.save_json(
+                    train_set_metadata_json_fp, train_set_metadata)
+                cache_preprocessed_data(
+                    cache_fps,
+                    cache_key,
+                    global_preprocessing_parameters
+                )
+                data_hdf5_fp = cache_fps[data_hdf5_fp]
+            training_set, test_set, validation_set = load_data(
+                data_hdf5_fp,
+                model_definition['input_features'],
+                model_definition['output_features'],
+                in_memory=in_memory,
+                partition=partition,
+                random_seed=random_seed
+            )
+            partitioned = partition is not None
+        else:
+            data, train_set_metadata = build_dataset(
+                data_csv,
+                features,
+                preprocessing_params,
+                random_seed=random_seed,
+                cached_features=cached_features,
+                data_fields=data_fields
+            )
+            if not skip_save_processed_input:
+                logging.info('Writing dataset')
+                data_utils.save_hdf5(
+                    data_hdf5_fp,
+                    data,
+                    train_set_metadata,
+                    **hdf5_options
+                )
+                logging.info('Writing train set metadata with vocabulary')
+                data_utils.save_json(
+                    train_set_metadata_json_fp, train_set_metadata)
+                cache_preprocessed_data(
+                    cache_fps,
+                    cache_key,
+                    global_preprocessing_parameters,
+                    feature_cache_keys=feature_cache_keys,
+                    data_fields=data_fields
+                )
+                data_hdf5_fp = cache_fps[data_hdf5_fp]
+            training_set, test_set, validation_set = split_dataset_tvt(
+                data,
+                data['split']
+            )
 
     elif data_train_csv is not None:
         # use data_train (including _validation and _test if they are present)
@@ -487,7 +1449,9 @@ def preprocess_for_training(
             concatenated_df,
             features,
             preprocessing_params,
-            random_seed=random_seed
+            random_seed=random_seed,
+            cached_features=cached_features,
+            data_fields=data_fields
         )
         training_set, test_set, validation_set = split_dataset_tvt(
             data,
@@ -498,23 +1462,33 @@ def preprocess_for_training(
             data_utils.save_hdf5(
                 data_train_hdf5_fp,
                 training_set,
-                train_set_metadata
+                train_set_metadata,
+                **hdf5_options
             )
             if validation_set is not None:
                 data_utils.save_hdf5(
                     data_validation_hdf5_fp,
                     validation_set,
-                    train_set_metadata
+                    train_set_metadata,
+                    **hdf5_options
                 )
             if test_set is not None:
                 data_utils.save_hdf5(
                     data_test_hdf5_fp,
                     test_set,
-                    train_set_metadata
+                    train_set_metadata,
+                    **hdf5_options
                 )
             logging.info('Writing train set metadata with vocabulary')
             data_utils.save_json(
                 train_set_metadata_json_fp, train_set_metadata)
+            cache_preprocessed_data(
+                cache_fps,
+                cache_key,
+                global_preprocessing_parameters,
+                feature_cache_keys=feature_cache_keys,
+                data_fields=data_fields
+            )
 
     elif data_hdf5 is not None and train_set_metadata_json is not None:
         # use data and train set metadata
@@ -524,9 +1498,13 @@ def preprocess_for_training(
             data_hdf5,
             model_definition['input_features'],
             model_definition['output_features'],
-            shuffle_training=True
+            shuffle_training=True,
+            in_memory=in_memory,
+            partition=partition,
+            random_seed=random_seed
         )
         train_set_metadata = load_metadata(train_set_metadata_json)
+        partitioned = partition is not None
 
     elif data_train_hdf5 is not None and train_set_metadata_json is not None:
         # use data and train set metadata
@@ -536,7 +1514,10 @@ def preprocess_for_training(
             data_train_hdf5,
             model_definition['input_features'],
             model_definition['output_features'],
-            split_data=False
+            split_data=False,
+            in_memory=in_memory,
+            partition=partition,
+            random_seed=random_seed
         )
         train_set_metadata = load_metadata(train_set_metadata_json)
         if data_validation_hdf5 is not None:
@@ -544,7 +1525,11 @@ def preprocess_for_training(
                 data_validation_hdf5,
                 model_definition['input_features'],
                 model_definition['output_features'],
-                split_data=False
+                split_data=False,
+                in_memory=in_memory,
+                partition=partition,
+                shuffle_partition=False,
+                random_seed=random_seed
             )
         else:
             validation_set = None
@@ -553,14 +1538,25 @@ def preprocess_for_training(
                 data_test_hdf5,
                 model_definition['input_features'],
                 model_definition['output_features'],
-                split_data=False
+                split_data=False,
+                in_memory=in_memory,
+                partition=partition,
+                shuffle_partition=False,
+                random_seed=random_seed
             )
         else:
             test_set = None
+        partitioned = partition is not None
 
     else:
         raise RuntimeError('Insufficient input parameters')
 
+    model_definition['data_hdf5_fp'] = data_hdf5_fp
+
+    if isinstance(training_set, Dataset):
+        # datasets read lazily from hdf5 are already built
+        return training_set, validation_set, test_set, train_set_metadata
+
     replace_text_feature_level(
         model_definition,
         [training_set, validation_set, test_set]
@@ -570,7 +1566,8 @@ def preprocess_for_training(
         training_set,
         model_definition['input_features'],
         model_definition['output_features'],
-        data_hdf5_fp
+        data_hdf5_fp,
+        partitioned=partitioned
     )
 
     validation_dataset = None
@@ -579,7 +1576,8 @@ def preprocess_for_training(
             validation_set,
             model_definition['input_features'],
             model_definition['output_features'],
-            data_hdf5_fp
+            data_hdf5_fp,
+            partitioned=partitioned
         )
 
     test_dataset = None
@@ -588,7 +1586,8 @@ def preprocess_for_training(
             test_set,
             model_definition['input_features'],
             model_definition['output_features'],
-            data_hdf5_fp
+            data_hdf5_fp,
+            partitioned=partitioned
         )
 
     return (
@@ -599,6 +1598,78 @@ def preprocess_for_training(
     )
 
 
+def preprocess_for_horovod_training(model_definition, **kwargs):
+    """Preprocesses the data for distributed training with Horovod. Csv files
+    are preprocessed only by the master while the other workers wait, then
+    every worker loads from the preprocessed hdf5 only its partition of the
+    rows, so that the memory used by each worker scales with the inverse of
+    the number of workers. Datasets that are not kept in memory are read
+    from disk one batch at a time and partitioned by the batcher.
+    The parameters are the same of `preprocess_for_training`.
+    """
+    import horovod.tensorflow as hvd
+    from mpi4py import MPI
+
+    needs_preprocessing = (kwargs.get('data_csv') is not None or
+                           kwargs.get('data_train_csv') is not None)
+    if needs_preprocessing and not kwargs.get('skip_save_processed_input'):
+        if hvd.rank() == 0:
+            preprocess_for_training(model_definition, **kwargs)
+        # the other workers then find the preprocessed hdf5 in the cache
+        MPI.COMM_WORLD.barrier()
+    elif needs_preprocessing:
+        # without saving the preprocessed data, each worker builds all of it
+        return preprocess_for_training(model_definition, **kwargs)
+
+    return preprocess_for_training(
+        model_definition,
+        partition=(hvd.rank(), hvd.size()),
+        **kwargs
+    )
+
+
+def find_preprocessed_data(
+        data_csv,
+        train_set_metadata,
+        global_preprocessing_parameters
+):
+    """Looks for an hdf5 file preprocessed from the csv, either with the same
+    filename of the csv or in the cache directory, whose metadata is the
+    same of the model.
+    :param data_csv: path to the csv file
+    :param train_set_metadata: train set metadata of the model
+    :param global_preprocessing_parameters: preprocessing parameters
+    :returns: the path of the hdf5 file or None
+    """
+    data_fingerprint = get_data_fingerprint(
+        [data_csv],
+        global_preprocessing_parameters['cache_content_hash']
+    )
+    cache_dir = global_preprocessing_parameters['cache_dir']
+    if cache_dir is not None:
+        if not os.path.isdir(cache_dir):
+            return None
+        candidates = [
+            (os.path.join(cache_dir, name),
+             os.path.join(cache_dir, os.path.splitext(name)[0] + '.json'))
+            for name in sorted(os.listdir(cache_dir))
+            if name.startswith(data_fingerprint + '_') and
+            name.endswith('.hdf5') and name.count('.') == 1
+        ]
+    else:
+        candidates = [(os.path.splitext(data_csv)[0] + '.hdf5',
+                       os.path.splitext(data_csv)[0] + '.json')]
+
+    for data_hdf5_fp, metadata_json_fp in candidates:
+        cache_key = read_cache_key(data_hdf5_fp)
+        if (cache_key is not None and
+                cache_key.startswith(data_fingerprint + '_') and
+                os.path.isfile(metadata_json_fp) and
+                load_json(metadata_json_fp) == train_set_metadata):
+            return data_hdf5_fp
+    return None
+
+
 def preprocess_for_prediction(
         model_path,
         split,
@@ -630,19 +1701,25 @@ def preprocess_for_prediction(
         model_definition['preprocessing']
     )
 
+    train_set_metadata = load_metadata(train_set_metadata)
+
     # Check if hdf5 and json already exist
     if data_csv is not None:
-        data_hdf5_fp = os.path.splitext(data_csv)[0] + '.hdf5'
-        if os.path.isfile(data_hdf5_fp):
+        data_hdf5_fp = find_preprocessed_data(
+            data_csv,
+            train_set_metadata,
+            preprocessing_params
+        )
+        if data_hdf5_fp is not None:
             logging.info(
-                'Found hdf5 with the same filename of the csv, using it instead'
+                'Found hdf5 preprocessed from the same csv '
+                'with the same metadata, using it instead'
             )
             data_csv = None
             data_hdf5 = data_hdf5_fp
 
     # Load data
     _, _, build_dataset, _ = get_dataset_fun(dataset_type)
-    train_set_metadata = load_metadata(train_set_metadata)
     features = (model_definition['input_features'] +
                 ([] if only_predictions
                  else model_definition['output_features']))
@@ -652,7 +1729,8 @@ def preprocess_for_prediction(
                 data_hdf5,
                 model_definition['input_features'],
                 [] if only_predictions else model_definition['output_features'],
-                split_data=False, shuffle_training=False
+                split_data=False, shuffle_training=False,
+                in_memory=preprocessing_params['in_memory']
             )
         else:
             dataset, train_set_metadata = build_dataset(
@@ -667,7 +1745,8 @@ def preprocess_for_prediction(
                 data_hdf5,
                 model_definition['input_features'],
                 [] if only_predictions else model_definition['output_features'],
-                shuffle_training=False
+                shuffle_training=False,
+                in_memory=preprocessing_params['in_memory']
             )
 
             if split == 'training':
@@ -684,6 +1763,9 @@ def preprocess_for_prediction(
                 train_set_metadata=train_set_metadata
             )
 
+    if isinstance(dataset, Dataset):
+        return dataset, train_set_metadata
+
     replace_text_feature_level(model_definition, [dataset])
 
     dataset = Dataset(
@@ -696,24 +1778,122 @@ def preprocess_for_prediction(
     return dataset, train_set_metadata
 
 
+def get_row_ranges(data_hdf5_fp):
+    """Reads the provenance of the rows of an hdf5 file the rows of other
+    csv files were appended to.
+    :param data_hdf5_fp: path to the hdf5 file
+    :return: list of dictionaries containing the source csv and the start
+             and end of the range of rows preprocessed from it
+    """
+    with h5py.File(data_hdf5_fp, 'r') as h5_file:
+        row_ranges = h5_file.attrs.get(row_ranges_attribute)
+        num_rows = h5_file['split'].shape[0]
+    if row_ranges is None:
+        return [{'source': None, 'start': 0, 'end': num_rows}]
+    if isinstance(row_ranges, bytes):
+        row_ranges = row_ranges.decode('utf-8')
+    return json.loads(row_ranges)
+
+
+def append_dataset(
+        data_csv,
+        data_hdf5,
+        train_set_metadata_json,
+        model_definition,
+        dataset_type='generic',
+        random_seed=default_random_seed
+):
+    """Preprocesses the rows of a csv file with the train set metadata of
+    previously preprocessed data, without updating it, and appends them to
+    the hdf5 file of that data, so that the cost of ingesting new data
+    depends only on the number of new rows.
+    :param data_csv: path to the csv file containing the new rows
+    :param data_hdf5: path to the hdf5 file the rows are appended to
+    :param train_set_metadata_json: path to the train set metadata json
+    :param model_definition: model definition containing the features
+           and the preprocessing parameters
+    :param dataset_type: type of dataset
+    :param random_seed: random seed used for splitting the new rows
+    :returns: the start and end of the range of appended rows
+    """
+    features = (model_definition['input_features'] +
+                model_definition['output_features'])
+    for feature in features:
+        if feature['type'] == IMAGE and not feature.get('in_memory', True):
+            raise ValueError(
+                'Appending image features that are not in memory '
+                'is not supported: {}'.format(feature['name'])
+            )
+
+    row_ranges = get_row_ranges(data_hdf5)
+    hdf5_options = get_hdf5_options(
+        merge_dict(
+            default_preprocessing_parameters,
+            model_definition['preprocessing']
+        ),
+        model_definition.get('training', {}).get(
+            'batch_size',
+            default_training_params['batch_size']
+        )
+    )
+    # files are written contiguous, to be memory mapped, so the first
+    # append rewrites them with resizable datasets
+    if make_hdf5_resizable(data_hdf5, hdf5_options['chunk_rows']):
+        logging.info('Rewrote {} with resizable datasets'.format(data_hdf5))
+
+    train_set_metadata = load_metadata(train_set_metadata_json)
+    _, _, build_dataset, _ = get_dataset_fun(dataset_type)
+    logging.info('Building dataset with the existing metadata')
+    data, _ = build_dataset(
+        data_csv,
+        features,
+        model_definition['preprocessing'],
+        train_set_metadata=train_set_metadata,
+        random_seed=random_seed
+    )
+
+    start = row_ranges[-1]['end']
+    end = start + len(data['split'])
+    logging.info('Appending rows {} to {} to {}'.format(start, end, data_hdf5))
+    append_hdf5(data_hdf5, data, train_set_metadata, **hdf5_options)
+
+    # the rows are no longer the ones of the csv the
+    # file was preprocessed from, so it can't be reused for it
+    clear_cache_keys(data_hdf5)
+    row_ranges.append({
+        'source': os.path.abspath(data_csv),
+        'start': start,
+        'end': end
+    })
+    with h5py.File(data_hdf5, 'r+') as h5_file:
+        h5_file.attrs[row_ranges_attribute] = json.dumps(row_ranges)
+
+    return start, end
+
+
 def replace_text_feature_level(model_definition, datasets):
     for feature in (model_definition['input_features'] +
                     model_definition['output_features']):
         if feature['type'] == TEXT:
             for dataset in datasets:
                 if dataset is not None:
-                    dataset[feature['name']] = dataset[
-                        '{}_{}'.format(
-                            feature['name'],
-                            feature['level']
+                    name_level = '{}_{}'.format(
+                        feature['name'],
+                        feature['level']
+                    )
+                    dataset[feature['name']] = dataset[name_level]
+                    if sequence_lengths_field(name_level) in dataset:
+                        dataset[sequence_lengths_field(feature['name'])] = (
+                            dataset[sequence_lengths_field(name_level)]
                         )
-                    ]
                     for level in ('word', 'char'):
                         name_level = '{}_{}'.format(
                             feature['name'],
                             level)
-                        if name_level in dataset:
-                            del dataset[name_level]
+                        for field in (name_level,
+                                      sequence_lengths_field(name_level)):
+                            if field in dataset:
+                                del dataset[field]
 
 
 if __name__ == '__main__':
@@ -27,6 +27,7 @@ from pprint import pformat
 import yaml
 
 from ludwig.data.postprocessing import postprocess
+from ludwig.data.preprocessing import preprocess_for_horovod_training
 from ludwig.data.preprocessing import preprocess_for_training
 from ludwig.globals import LUDWIG_VERSION, set_on_master, is_on_master
 from ludwig.globals import TRAIN_SET_METADATA_FILE_NAME
@@ -230,13 +231,17 @@ def experiment(
             logging.info('{}: {}'.format(key, pformat(value, indent=4)))
         logging.info('')
 
-    # preprocess
+    # preprocess, with horovod only once on the master
+    if use_horovod:
+        preprocess = preprocess_for_horovod_training
+    else:
+        preprocess = preprocess_for_training
     (
         training_set,
         validation_set,
         test_set,
         train_set_metadata
-    ) = preprocess_for_training(
+    ) = preprocess(
         model_definition,
         data_csv=data_csv,
         data_train_csv=data_train_csv,
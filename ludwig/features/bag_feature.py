@@ -15,7 +15,6 @@
 # limitations under the License.
 # ==============================================================================
 import logging
-from collections import Counter
 
 import numpy as np
 import tensorflow as tf
@@ -23,10 +22,13 @@ import tensorflow as tf
 from ludwig.constants import *
 from ludwig.features.base_feature import BaseFeature
 from ludwig.features.base_feature import InputFeature
-from ludwig.features.feature_utils import set_str_to_idx
+from ludwig.features.feature_utils import idx_lists_to_csr
+from ludwig.features.feature_utils import set_units_to_idx
 from ludwig.models.modules.embedding_modules import EmbedWeighted
 from ludwig.utils.misc import set_default_value
-from ludwig.utils.strings_utils import create_vocabulary
+from ludwig.utils.strings_utils import create_vocabulary_from_counts
+from ludwig.utils.strings_utils import get_unit_counts
+from ludwig.utils.strings_utils import tokenize
 
 
 class BagBaseFeature(BaseFeature):
@@ -43,13 +45,29 @@ class BagBaseFeature(BaseFeature):
     }
 
     @staticmethod
-    def get_feature_meta(column, preprocessing_parameters):
-        idx2str, str2idx, str2freq, max_size = create_vocabulary(
+    def get_feature_stats(column, preprocessing_parameters):
+        unit_counts, max_size = get_unit_counts(
             column,
             preprocessing_parameters['format'],
-            num_most_frequent=preprocessing_parameters['most_common'],
             lowercase=preprocessing_parameters['lowercase']
         )
+        return {'unit_counts': unit_counts, 'max_size': max_size}
+
+    @staticmethod
+    def get_feature_meta(column, preprocessing_parameters):
+        return BagBaseFeature.get_feature_meta_from_stats(
+            BagBaseFeature.get_feature_stats(column, preprocessing_parameters),
+            preprocessing_parameters
+        )
+
+    @staticmethod
+    def get_feature_meta_from_stats(stats, preprocessing_parameters):
+        idx2str, str2idx, str2freq, max_size = create_vocabulary_from_counts(
+            stats['unit_counts'],
+            stats['max_size'],
+            preprocessing_parameters['format'],
+            num_most_frequent=preprocessing_parameters['most_common']
+        )
         return {
             'idx2str': idx2str,
             'str2idx': str2idx,
@@ -60,20 +78,21 @@ class BagBaseFeature(BaseFeature):
 
     @staticmethod
     def feature_data(column, metadata, preprocessing_parameters):
-        bag_matrix = np.zeros(
-            (len(column),
-             len(metadata['str2idx'])),
-            dtype=float
+        # duplicate indices are summed, so each entry
+        # is the number of occurrences of the element
+        bag_matrix = idx_lists_to_csr(
+            [
+                set_units_to_idx(units, metadata['str2idx'])
+                for units in tokenize(
+                    column,
+                    preprocessing_parameters['format'],
+                    lowercase=preprocessing_parameters['lowercase']
+                )
+            ],
+            len(metadata['str2idx']),
+            dtype=np.float32
         )
-
-        for i in range(len(column)):
-            col_counter = Counter(set_str_to_idx(
-                column[i],
-                metadata['str2idx'],
-                preprocessing_parameters['format'])
-            )
-            bag_matrix[i, list(col_counter.keys())] = list(col_counter.values())
-
+        bag_matrix.sum_duplicates()
         return bag_matrix
 
     @staticmethod
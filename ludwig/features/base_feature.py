@@ -14,6 +14,7 @@
 # limitations under the License.
 # ==============================================================================
 from abc import ABC, abstractmethod
+from collections import Counter
 
 import tensorflow as tf
 
@@ -31,6 +32,32 @@ class BaseFeature:
         self.name = feature['name']
         self.type = None
 
+    # parameters outside of the preprocessing section of the feature
+    # definition that change its preprocessed data
+    feature_preprocessing_keys = ()
+
+    @staticmethod
+    def get_feature_stats(column, preprocessing_parameters):
+        return {}
+
+    @staticmethod
+    def merge_feature_stats(stats, other_stats):
+        # stats computed on different parts of a column are merged by adding
+        # up unit counts and by keeping the largest of the other values
+        merged_stats = dict(stats)
+        for key, value in other_stats.items():
+            if key not in merged_stats:
+                merged_stats[key] = value
+            elif isinstance(value, Counter):
+                merged_stats[key] = merged_stats[key] + value
+            else:
+                merged_stats[key] = max(merged_stats[key], value)
+        return merged_stats
+
+    @staticmethod
+    def get_feature_meta_from_stats(stats, preprocessing_parameters):
+        return {}
+
     def overwrite_defaults(self, feature):
         attributes = self.__dict__.keys()
 
@@ -37,7 +37,10 @@ from ludwig.utils.math_utils import softmax
 from ludwig.utils.metrics_utils import ConfusionMatrix
 from ludwig.utils.misc import set_default_value
 from ludwig.utils.strings_utils import UNKNOWN_SYMBOL
-from ludwig.utils.strings_utils import create_vocabulary
+from ludwig.utils.strings_utils import create_vocabulary_from_counts
+from ludwig.utils.strings_utils import get_unit_counts
+from ludwig.utils.strings_utils import ids_to_units
+from ludwig.utils.strings_utils import units_to_ids
 
 
 class CategoryBaseFeature(BaseFeature):
@@ -53,11 +56,28 @@ class CategoryBaseFeature(BaseFeature):
     }
 
     @staticmethod
-    def get_feature_meta(column, preprocessing_parameters):
-        idx2str, str2idx, str2freq, _ = create_vocabulary(
+    def get_feature_stats(column, preprocessing_parameters):
+        unit_counts, _ = get_unit_counts(
             column, 'stripped',
+            lowercase=preprocessing_parameters['lowercase']
+        )
+        return {'unit_counts': unit_counts}
+
+    @staticmethod
+    def get_feature_meta(column, preprocessing_parameters):
+        return CategoryBaseFeature.get_feature_meta_from_stats(
+            CategoryBaseFeature.get_feature_stats(
+                column,
+                preprocessing_parameters
+            ),
+            preprocessing_parameters
+        )
+
+    @staticmethod
+    def get_feature_meta_from_stats(stats, preprocessing_parameters):
+        idx2str, str2idx, str2freq, _ = create_vocabulary_from_counts(
+            stats['unit_counts'], 0, 'stripped',
             num_most_frequent=preprocessing_parameters['most_common'],
-            lowercase=preprocessing_parameters['lowercase'],
             add_padding=False
         )
         return {
@@ -69,15 +89,11 @@ class CategoryBaseFeature(BaseFeature):
 
     @staticmethod
     def feature_data(column, metadata):
-        return np.array(
-            column.map(
-                lambda x: (
-                    metadata['str2idx'][x] if x in metadata['str2idx']
-                    else metadata['str2idx'][UNKNOWN_SYMBOL]
-                )
-            ),
-            dtype=int_type(metadata['vocab_size'])
-        )
+        return units_to_ids(
+            column,
+            metadata['str2idx'],
+            count=len(column)
+        ).astype(int_type(metadata['vocab_size']))
 
     @staticmethod
     def add_feature_data(
@@ -132,8 +148,9 @@ class CategoryInputFeature(CategoryBaseFeature, InputFeature):
         input_feature['vocab'] = feature_metadata['idx2str']
 
     def _get_input_placeholder(self):
+        # ids are fed with the integer type they are stored with
         return tf.placeholder(
-            tf.int32,
+            tf.as_dtype(int_type(len(self.vocab))),
             shape=[None],  # None is for dealing with variable batch size
             name='{}_placeholder'.format(self.name)
         )
@@ -150,7 +167,7 @@ class CategoryInputFeature(CategoryBaseFeature, InputFeature):
 
         # ================ Embeddings ================
         embedded, embedding_size = self.embed(
-            placeholder,
+            tf.cast(placeholder, tf.int32),
             regularizer,
             dropout_rate,
             is_training=is_training
@@ -220,8 +237,9 @@ class CategoryOutputFeature(CategoryBaseFeature, OutputFeature):
     ])
 
     def _get_output_placeholder(self):
+        # ids are fed with the integer type they are stored with
         return tf.placeholder(
-            tf.int64,
+            tf.as_dtype(int_type(self.num_classes)),
             [None],  # None is for dealing with variable batch size
             name='{}_placeholder'.format(self.name)
         )
@@ -408,9 +426,10 @@ class CategoryOutputFeature(CategoryBaseFeature, OutputFeature):
         output_tensors = {}
 
         # ================ Placeholder ================
-        targets = self._get_output_placeholder()
-        output_tensors[self.name] = targets
-        logging.debug('  targets_placeholder: {0}'.format(targets))
+        placeholder = self._get_output_placeholder()
+        output_tensors[self.name] = placeholder
+        logging.debug('  targets_placeholder: {0}'.format(placeholder))
+        targets = tf.cast(placeholder, tf.int64)
 
         # ================ Predictions ================
         outs = self._get_predictions(
@@ -556,9 +575,10 @@ class CategoryOutputFeature(CategoryBaseFeature, OutputFeature):
         if PREDICTIONS in result and len(result[PREDICTIONS]) > 0:
             preds = result[PREDICTIONS]
             if 'idx2str' in metadata:
-                postprocessed[PREDICTIONS] = [
-                    metadata['idx2str'][pred] for pred in preds
-                ]
+                postprocessed[PREDICTIONS] = ids_to_units(
+                    preds,
+                    metadata['idx2str']
+                )
 
             else:
                 postprocessed[PREDICTIONS] = preds
@@ -585,10 +605,10 @@ class CategoryOutputFeature(CategoryBaseFeature, OutputFeature):
 
             preds_top_k = result['predictions_top_k']
             if 'idx2str' in metadata:
-                postprocessed['predictions_top_k'] = [
-                    [metadata['idx2str'][pred] for pred in pred_top_k]
-                    for pred_top_k in preds_top_k
-                ]
+                postprocessed['predictions_top_k'] = ids_to_units(
+                    preds_top_k,
+                    metadata['idx2str']
+                )
             else:
                 postprocessed['predictions_top_k'] = preds_top_k
 
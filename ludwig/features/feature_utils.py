@@ -14,7 +14,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ==============================================================================
+from itertools import chain
+
 import numpy as np
+from scipy import sparse
 
 from ludwig.constants import SEQUENCE
 from ludwig.constants import TEXT
@@ -41,7 +44,85 @@ def set_str_to_idx(set_string, feature_dict, format_func):
     except ValueError:
         raise Exception('Format {} not supported'.format(format_func))
 
+    return set_units_to_idx(format_function(set_string), feature_dict)
+
+
+def set_units_to_idx(units, feature_dict):
     out = [feature_dict.get(item, feature_dict[UNKNOWN_SYMBOL]) for item in
-           format_function(set_string)]
+           units]
 
     return np.array(out, dtype=np.int32)
+
+
+def idx_lists_to_csr(idx_lists, num_columns, dtype=bool):
+    """Builds a CSR matrix with a row for each list of column indices,
+    with a one for each index. Memory scales with the number of indices
+    rather than with the number of rows times the number of columns.
+    Duplicate indices are kept, call sum_duplicates() to merge them.
+    """
+    lengths = np.fromiter(
+        (len(idx_list) for idx_list in idx_lists),
+        dtype=np.int64,
+        count=len(idx_lists)
+    )
+    indptr = np.zeros(len(idx_lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    if len(idx_lists) > 0:
+        indices = np.concatenate(idx_lists).astype(np.int32)
+    else:
+        indices = np.zeros(0, dtype=np.int32)
+    return sparse.csr_matrix(
+        (np.ones(len(indices), dtype=dtype), indices, indptr),
+        shape=(len(idx_lists), num_columns)
+    )
+
+
+def trim_to_lengths(matrix, lengths):
+    """Trims each row of a padded matrix of sequence outputs to its length,
+    gathering all the kept steps at once. As numpy would build from the
+    trimmed rows, rows that all have the same length are returned as a
+    matrix and rows of different lengths as an object array of lists.
+    """
+    # lengths longer than the matrix are clipped, as slicing the rows would
+    lengths = np.minimum(np.asarray(lengths), matrix.shape[1])
+    if len(lengths) == 0:
+        return matrix[:, :0]
+    if np.all(lengths == lengths[0]):
+        return matrix[:, :lengths[0]]
+    mask = np.arange(matrix.shape[1]) < lengths[:, np.newaxis]
+    rows = np.split(matrix[mask], np.cumsum(lengths)[:-1])
+    trimmed = np.empty(len(rows), dtype=object)
+    for i, row in enumerate(rows):
+        trimmed[i] = list(row)
+    return trimmed
+
+
+def sequence_probabilities(probs):
+    """Computes the probability of the predicted unit at each step of the
+    sequences and the probability of the whole sequences.
+    :param probs: matrix of the probabilities of each unit at each step, or
+           object array with a list of them for each sequence, as returned
+           by trim_to_lengths
+    :return: the probabilities of the predicted units, in the same layout,
+             and the probability of each sequence
+    """
+    if not (len(probs) > 0 and isinstance(probs[0], list)):
+        probs = np.amax(probs, axis=-1)
+        return probs, np.prod(probs, axis=-1)
+
+    lengths = np.array([len(sequence_probs) for sequence_probs in probs])
+    if lengths.sum() > 0:
+        unit_probs = np.amax(np.stack(list(chain.from_iterable(probs))), axis=-1)
+    else:
+        unit_probs = np.zeros(0, dtype=np.float32)
+    starts = np.cumsum(lengths) - lengths
+    rows = np.split(unit_probs, starts[1:])
+    if np.all(lengths > 0):
+        prob = list(np.multiply.reduceat(unit_probs, starts))
+    else:
+        prob = [np.prod(row) for row in rows]
+
+    max_probs = np.empty(len(rows), dtype=object)
+    for i, row in enumerate(rows):
+        max_probs[i] = list(row)
+    return max_probs, prob
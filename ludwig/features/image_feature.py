@@ -16,23 +16,32 @@
 # ==============================================================================
 import logging
 import os
+import sys
+from functools import partial
+from multiprocessing import Pool
 
 import h5py
 import numpy as np
 import tensorflow as tf
 
 from skimage.io import imread
+from tqdm import tqdm
 
 from ludwig.constants import *
 from ludwig.features.base_feature import BaseFeature
 from ludwig.features.base_feature import InputFeature
+from ludwig.globals import is_progressbar_disabled
 from ludwig.models.modules.image_encoders import ResNetEncoder
 from ludwig.models.modules.image_encoders import Stacked2DCNN
+from ludwig.utils.data_utils import close_hdf5_file
 from ludwig.utils.image_utils import resize_image
 from ludwig.utils.misc import get_from_registry
 from ludwig.utils.misc import set_default_value
 
 
+image_chunksize = 16
+
+
 class ImageBaseFeature(BaseFeature):
     def __init__(self, feature):
         super().__init__(feature)
@@ -42,6 +51,13 @@ class ImageBaseFeature(BaseFeature):
         'missing_value_strategy': BACKFILL
     }
 
+    feature_preprocessing_keys = (
+        'in_memory',
+        HEIGHT,
+        WIDTH,
+        'resize_method'
+    )
+
     @staticmethod
     def get_feature_meta(column, preprocessing_parameters):
         return {}
@@ -82,56 +98,111 @@ class ImageBaseFeature(BaseFeature):
             'in_memory': feature['in_memory']
         }
 
+        read_image_fn = partial(
+            read_image,
+            csv_path=csv_path,
+            shape=(im_height, im_width, num_channels),
+            should_resize=feature['should_resize'],
+            resize_method=feature.get('resize_method')
+        )
+        filenames = dataset_df[feature['name']]
+        num_processes = feature.get('num_processes', 1)
+
         if feature['in_memory']:
             data[feature['name']] = np.empty(
                 (num_images, im_height, im_width, num_channels),
-                dtype=np.int8
+                dtype=np.uint8
+            )
+            ImageBaseFeature.read_images(
+                read_image_fn,
+                filenames,
+                data[feature['name']],
+                num_processes
             )
-            for i in range(len(dataset_df)):
-                filename = os.path.join(
-                    csv_path,
-                    dataset_df[feature['name']][i]
-                )
-                img = imread(filename)
-                if img.ndim == 2:
-                    img = img.reshape((img.shape[0], img.shape[1], 1))
-                if feature['should_resize']:
-                    img = resize_image(
-                        img,
-                        (im_height, im_width),
-                        feature['resize_method']
-                    )
-                data[feature['name']][i, :, :, :] = img
         else:
             data_fp = os.path.splitext(dataset_df.csv)[0] + '.hdf5'
             mode = 'w'
             if os.path.isfile(data_fp):
                 mode = 'r+'
+            close_hdf5_file(data_fp)
             with h5py.File(data_fp, mode) as h5_file:
                 image_dataset = h5_file.create_dataset(
                     feature['name'] + '_data',
                     (num_images, im_height, im_width, num_channels),
                     dtype=np.uint8
                 )
-                for i in range(len(dataset_df)):
-                    filename = os.path.join(
-                        csv_path,
-                        dataset_df[feature['name']][i]
-                    )
-                    img = imread(filename)
-                    if img.ndim == 2:
-                        img = img.reshape((img.shape[0], img.shape[1], 1))
-                    if feature['should_resize']:
-                        img = resize_image(
-                            img,
-                            (im_height, im_width),
-                            feature['resize_method'],
-                        )
-
-                    image_dataset[i, :im_height, :im_width, :] = img
+                ImageBaseFeature.read_images(
+                    read_image_fn,
+                    filenames,
+                    image_dataset,
+                    num_processes
+                )
 
             data[feature['name']] = np.arange(num_images)
 
+    @staticmethod
+    def read_images(read_image_fn, filenames, images, num_processes=1):
+        if num_processes > 1:
+            pool = Pool(num_processes)
+            results = pool.imap(
+                read_image_fn,
+                filenames,
+                chunksize=image_chunksize
+            )
+        else:
+            pool = None
+            results = map(read_image_fn, filenames)
+
+        failures = []
+        try:
+            for i, (img, error) in enumerate(tqdm(
+                    results,
+                    desc='Reading images',
+                    total=len(filenames),
+                    file=sys.stdout,
+                    disable=is_progressbar_disabled()
+            )):
+                if error is None:
+                    images[i, :, :, :] = img
+                else:
+                    images[i, :, :, :] = 0
+                    failures.append((i, filenames[i], error))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if failures:
+            logging.warning(
+                '{} out of {} images could not be read and were replaced '
+                'by zeros:\n{}{}'.format(
+                    len(failures),
+                    len(filenames),
+                    '\n'.join(
+                        '  row {}, {}: {}'.format(i, filename, error)
+                        for i, filename, error in failures[:10]
+                    ),
+                    '\n  ...' if len(failures) > 10 else ''
+                )
+            )
+
+
+def read_image(filename, csv_path, shape, should_resize, resize_method):
+    try:
+        img = imread(os.path.join(csv_path, filename))
+        if img.ndim == 2:
+            img = img.reshape((img.shape[0], img.shape[1], 1))
+        if should_resize:
+            img = resize_image(img, shape[:2], resize_method)
+        if img.shape != shape:
+            raise ValueError(
+                'Image shape {} differs from {}, '
+                'set height and width to resize it'.format(img.shape, shape)
+            )
+        return img, None
+    except Exception as e:
+        return None, '{}: {}'.format(type(e).__name__, e)
+
 
 class ImageInputFeature(ImageBaseFeature, InputFeature):
     def __init__(self, feature):
@@ -159,9 +230,10 @@ class ImageInputFeature(ImageBaseFeature, InputFeature):
         )
 
     def _get_input_placeholder(self):
-        # None dimension is for dealing with variable batch size
+        # None dimension is for dealing with variable batch size,
+        # images are fed as they are stored and cast in the graph
         return tf.placeholder(
-            tf.float32,
+            tf.uint8,
             shape=[None, self.height, self.width, self.num_channels],
             name=self.name,
         )
@@ -177,7 +249,7 @@ class ImageInputFeature(ImageBaseFeature, InputFeature):
         logging.debug('  targets_placeholder: {0}'.format(placeholder))
 
         feature_representation, feature_representation_size = self.encoder_obj(
-            placeholder,
+            tf.cast(placeholder, tf.float32),
             regularizer,
             dropout_rate,
             is_training,
@@ -211,6 +283,7 @@ class ImageInputFeature(ImageBaseFeature, InputFeature):
     @staticmethod
     def populate_defaults(input_feature):
         set_default_value(input_feature, 'in_memory', True)
+        set_default_value(input_feature, 'num_processes', 1)
 
         if 'height' in input_feature or 'width' in input_feature:
             input_feature['should_resize'] = True
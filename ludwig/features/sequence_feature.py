@@ -25,6 +25,7 @@ from ludwig.constants import *
 from ludwig.features.base_feature import BaseFeature
 from ludwig.features.base_feature import InputFeature
 from ludwig.features.base_feature import OutputFeature
+from ludwig.features.feature_utils import sequence_probabilities
 from ludwig.models.modules.loss_modules import seq2seq_sequence_loss
 from ludwig.models.modules.loss_modules import \
     sequence_sampled_softmax_cross_entropy
@@ -40,6 +41,8 @@ from ludwig.models.modules.sequence_encoders import ParallelCNN
 from ludwig.models.modules.sequence_encoders import RNN
 from ludwig.models.modules.sequence_encoders import StackedCNN
 from ludwig.models.modules.sequence_encoders import StackedParallelCNN
+from ludwig.utils.data_utils import sequence_lengths_field
+from ludwig.utils.math_utils import int_type
 from ludwig.utils.math_utils import softmax
 from ludwig.utils.metrics_utils import ConfusionMatrix
 from ludwig.utils.misc import get_from_registry
@@ -47,7 +50,11 @@ from ludwig.utils.misc import set_default_value
 from ludwig.utils.strings_utils import PADDING_SYMBOL
 from ludwig.utils.strings_utils import UNKNOWN_SYMBOL
 from ludwig.utils.strings_utils import build_sequence_matrix
-from ludwig.utils.strings_utils import create_vocabulary
+from ludwig.utils.strings_utils import create_vocabulary_from_counts
+from ludwig.utils.strings_utils import get_sequence_lengths
+from ludwig.utils.strings_utils import get_unit_counts
+from ludwig.utils.strings_utils import ids_to_units
+from ludwig.utils.strings_utils import sequences_to_units
 
 
 class SequenceBaseFeature(BaseFeature):
@@ -68,10 +75,28 @@ class SequenceBaseFeature(BaseFeature):
     }
 
     @staticmethod
-    def get_feature_meta(column, preprocessing_parameters):
-        idx2str, str2idx, str2freq, max_length = create_vocabulary(
+    def get_feature_stats(column, preprocessing_parameters):
+        unit_counts, max_length = get_unit_counts(
             column, preprocessing_parameters['format'],
-            lowercase=preprocessing_parameters['lowercase'],
+            lowercase=preprocessing_parameters['lowercase']
+        )
+        return {'unit_counts': unit_counts, 'max_length': max_length}
+
+    @staticmethod
+    def get_feature_meta(column, preprocessing_parameters):
+        return SequenceBaseFeature.get_feature_meta_from_stats(
+            SequenceBaseFeature.get_feature_stats(
+                column,
+                preprocessing_parameters
+            ),
+            preprocessing_parameters
+        )
+
+    @staticmethod
+    def get_feature_meta_from_stats(stats, preprocessing_parameters):
+        idx2str, str2idx, str2freq, max_length = create_vocabulary_from_counts(
+            stats['unit_counts'], stats['max_length'],
+            preprocessing_parameters['format'],
             num_most_frequent=preprocessing_parameters['most_common']
         )
         max_length = min(
@@ -109,6 +134,12 @@ class SequenceBaseFeature(BaseFeature):
             dataset_df[feature['name']].astype(str),
             metadata[feature['name']], preprocessing_parameters)
         data[feature['name']] = sequence_data
+        data[sequence_lengths_field(feature['name'])] = get_sequence_lengths(
+            sequence_data,
+            metadata[feature['name']]['str2idx'][
+                preprocessing_parameters['padding_symbol']
+            ]
+        )
 
 
 class SequenceInputFeature(SequenceBaseFeature, InputFeature):
@@ -117,6 +148,8 @@ class SequenceInputFeature(SequenceBaseFeature, InputFeature):
 
         self.encoder = 'parallel_cnn'
         self.length = 0
+        # the vocabulary is left to the encoder, only its size is kept
+        self.vocab_size = len(feature.get('vocab', []))
 
         encoder_parameters = self.overwrite_defaults(feature)
 
@@ -129,9 +162,10 @@ class SequenceInputFeature(SequenceBaseFeature, InputFeature):
         )
 
     def _get_input_placeholder(self):
-        # None dimension is for dealing with variable batch size
+        # None dimension is for dealing with variable batch size,
+        # ids are fed with the integer type they are stored with
         return tf.placeholder(
-            tf.int32,
+            tf.as_dtype(int_type(self.vocab_size)),
             shape=[None, None],
             name='{}_placeholder'.format(self.name)
         )
@@ -163,7 +197,7 @@ class SequenceInputFeature(SequenceBaseFeature, InputFeature):
             is_training
     ):
         feature_representation, feature_representation_size = encoder(
-            placeholder,
+            tf.cast(placeholder, tf.int32),
             regularizer=regularizer,
             dropout_rate=dropout_rate,
             is_training=is_training
@@ -676,10 +710,10 @@ class SequenceOutputFeature(SequenceBaseFeature, OutputFeature):
         if PREDICTIONS in result and len(result[PREDICTIONS]) > 0:
             preds = result[PREDICTIONS]
             if 'idx2str' in metadata:
-                postprocessed[PREDICTIONS] = [
-                    [metadata['idx2str'][token] for token in pred]
-                    for pred in preds
-                ]
+                postprocessed[PREDICTIONS] = sequences_to_units(
+                    preds,
+                    metadata['idx2str']
+                )
             else:
                 postprocessed[PREDICTIONS] = preds
 
@@ -691,9 +725,10 @@ class SequenceOutputFeature(SequenceBaseFeature, OutputFeature):
         if LAST_PREDICTIONS in result and len(result[LAST_PREDICTIONS]) > 0:
             last_preds = result[LAST_PREDICTIONS]
             if 'idx2str' in metadata:
-                postprocessed[LAST_PREDICTIONS] = [
-                    metadata['idx2str'][last_pred] for last_pred in last_preds
-                ]
+                postprocessed[LAST_PREDICTIONS] = ids_to_units(
+                    last_preds,
+                    metadata['idx2str']
+                )
             else:
                 postprocessed[LAST_PREDICTIONS] = last_preds
 
@@ -706,15 +741,7 @@ class SequenceOutputFeature(SequenceBaseFeature, OutputFeature):
             probs = result[PROBABILITIES]
             if probs is not None:
 
-                if len(probs) > 0 and isinstance(probs[0], list):
-                    prob = []
-                    for i in range(len(probs)):
-                        for j in range(len(probs[i])):
-                            probs[i][j] = np.max(probs[i][j])
-                        prob.append(np.prod(probs[i]))
-                else:
-                    probs = np.amax(probs, axis=-1)
-                    prob = np.prod(probs, axis=-1)
+                probs, prob = sequence_probabilities(probs)
 
                 postprocessed[PROBABILITIES] = probs
                 postprocessed['probability'] = prob
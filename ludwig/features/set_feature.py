@@ -25,11 +25,15 @@ from ludwig.constants import *
 from ludwig.features.base_feature import BaseFeature
 from ludwig.features.base_feature import InputFeature
 from ludwig.features.base_feature import OutputFeature
-from ludwig.features.feature_utils import set_str_to_idx
+from ludwig.features.feature_utils import idx_lists_to_csr
+from ludwig.features.feature_utils import set_units_to_idx
 from ludwig.models.modules.embedding_modules import EmbedSparse
 from ludwig.models.modules.initializer_modules import get_initializer
 from ludwig.utils.misc import set_default_value
-from ludwig.utils.strings_utils import create_vocabulary
+from ludwig.utils.strings_utils import create_vocabulary_from_counts
+from ludwig.utils.strings_utils import get_unit_counts
+from ludwig.utils.strings_utils import idx2str_to_array
+from ludwig.utils.strings_utils import tokenize
 
 
 class SetBaseFeature(BaseFeature):
@@ -46,13 +50,29 @@ class SetBaseFeature(BaseFeature):
     }
 
     @staticmethod
-    def get_feature_meta(column, preprocessing_parameters):
-        idx2str, str2idx, str2freq, max_size = create_vocabulary(
+    def get_feature_stats(column, preprocessing_parameters):
+        unit_counts, max_size = get_unit_counts(
             column,
             preprocessing_parameters['format'],
-            num_most_frequent=preprocessing_parameters['most_common'],
             lowercase=preprocessing_parameters['lowercase']
         )
+        return {'unit_counts': unit_counts, 'max_size': max_size}
+
+    @staticmethod
+    def get_feature_meta(column, preprocessing_parameters):
+        return SetBaseFeature.get_feature_meta_from_stats(
+            SetBaseFeature.get_feature_stats(column, preprocessing_parameters),
+            preprocessing_parameters
+        )
+
+    @staticmethod
+    def get_feature_meta_from_stats(stats, preprocessing_parameters):
+        idx2str, str2idx, str2freq, max_size = create_vocabulary_from_counts(
+            stats['unit_counts'],
+            stats['max_size'],
+            preprocessing_parameters['format'],
+            num_most_frequent=preprocessing_parameters['most_common']
+        )
         return {
             'idx2str': idx2str,
             'str2idx': str2idx,
@@ -63,25 +83,19 @@ class SetBaseFeature(BaseFeature):
 
     @staticmethod
     def feature_data(column, metadata, preprocessing_parameters):
-        feature_vector = np.array(
-            column.map(
-                lambda x: set_str_to_idx(
-                    x,
-                    metadata['str2idx'],
-                    preprocessing_parameters['format']
+        set_matrix = idx_lists_to_csr(
+            [
+                set_units_to_idx(units, metadata['str2idx'])
+                for units in tokenize(
+                    column,
+                    preprocessing_parameters['format'],
+                    lowercase=preprocessing_parameters['lowercase']
                 )
-            )
-        )
-
-        set_matrix = np.zeros(
-            (len(column),
-             len(metadata['str2idx'])),
+            ],
+            len(metadata['str2idx']),
             dtype=bool
         )
-
-        for i in range(len(column)):
-            set_matrix[i, feature_vector[i]] = 1
-
+        set_matrix.sum_duplicates()
         return set_matrix
 
     @staticmethod
@@ -128,9 +142,10 @@ class SetInputFeature(SetBaseFeature, InputFeature):
         )
 
     def _get_input_placeholder(self):
-        # None is for dealing with variable batch size
+        # None is for dealing with variable batch size,
+        # sets are fed as the boolean matrices they are stored as
         return tf.placeholder(
-            tf.int32,
+            tf.bool,
             shape=[None, len(self.vocab)],
             name=self.name
         )
@@ -146,7 +161,7 @@ class SetInputFeature(SetBaseFeature, InputFeature):
         logging.debug('  placeholder: {0}'.format(placeholder))
 
         embedded, embedding_size = self.embed_sparse(
-            placeholder,
+            tf.cast(placeholder, tf.int32),
             regularizer,
             dropout_rate,
             is_training=is_training
@@ -373,9 +388,18 @@ class SetOutputFeature(SetBaseFeature, OutputFeature):
         if PREDICTIONS in result and len(result[PREDICTIONS]) > 0:
             preds = result[PREDICTIONS]
             if 'idx2str' in metadata:
+                # the predicted units of all the rows at once, split at
+                # the rows they belong to
+                rows, columns = np.nonzero(preds == True)
+                units = np.take(
+                    idx2str_to_array(metadata['idx2str']),
+                    columns
+                )
                 postprocessed[PREDICTIONS] = [
-                    [metadata['idx2str'][i] for i, pred in enumerate(pred_set)
-                     if pred == True] for pred_set in preds
+                    set_units.tolist() for set_units in np.split(
+                        units,
+                        np.searchsorted(rows, np.arange(1, len(preds)))
+                    )
                 ]
             else:
                 postprocessed[PREDICTIONS] = preds
@@ -23,15 +23,22 @@ import tensorflow as tf
 
 from ludwig.constants import *
 from ludwig.features.base_feature import BaseFeature
+from ludwig.features.feature_utils import sequence_probabilities
 from ludwig.features.sequence_feature import SequenceInputFeature
 from ludwig.features.sequence_feature import SequenceOutputFeature
+from ludwig.utils.data_utils import sequence_lengths_field
+from ludwig.utils.math_utils import int_type
 from ludwig.utils.math_utils import softmax
 from ludwig.utils.metrics_utils import ConfusionMatrix
 from ludwig.utils.misc import set_default_value
 from ludwig.utils.strings_utils import PADDING_SYMBOL
 from ludwig.utils.strings_utils import UNKNOWN_SYMBOL
 from ludwig.utils.strings_utils import build_sequence_matrix
-from ludwig.utils.strings_utils import create_vocabulary
+from ludwig.utils.strings_utils import create_vocabulary_from_counts
+from ludwig.utils.strings_utils import get_sequence_lengths
+from ludwig.utils.strings_utils import get_unit_counts
+from ludwig.utils.strings_utils import ids_to_units
+from ludwig.utils.strings_utils import sequences_to_units
 
 
 class TextBaseFeature(BaseFeature):
@@ -50,64 +57,67 @@ class TextBaseFeature(BaseFeature):
         'unknown_symbol': UNKNOWN_SYMBOL,
         'padding': 'right',
         'lowercase': True,
+        'tokenizer_batch_size': 1000,
+        'tokenizer_num_processes': 1,
         'missing_value_strategy': FILL_WITH_CONST,
         'fill_value': ''
     }
 
     @staticmethod
-    def feature_meta(column, most_common_characters, most_common_words,
-                     lowercase):
-        (
-            char_idx2str,
-            char_str2idx,
-            char_str2freq,
-            char_max_len
-        ) = create_vocabulary(
+    def get_feature_stats(column, preprocessing_parameters):
+        char_unit_counts, char_max_len = get_unit_counts(
             column,
-            'characters',
-            num_most_frequent=most_common_characters,
-            lowercase=lowercase
+            preprocessing_parameters['char_format'],
+            lowercase=preprocessing_parameters['lowercase']
         )
-        (
-            word_idx2str,
-            word_str2idx,
-            word_str2freq,
-            word_max_len
-        ) = create_vocabulary(
+        word_unit_counts, word_max_len = get_unit_counts(
             column,
-            'english_tokenize',
-            num_most_frequent=most_common_words,
-            lowercase=lowercase
-        )
-        return (
-            char_idx2str,
-            char_str2idx,
-            char_str2freq,
-            char_max_len,
-            word_idx2str,
-            word_str2idx,
-            word_str2freq,
-            word_max_len
+            preprocessing_parameters['word_format'],
+            lowercase=preprocessing_parameters['lowercase'],
+            batch_size=preprocessing_parameters['tokenizer_batch_size'],
+            num_processes=preprocessing_parameters['tokenizer_num_processes']
         )
+        return {
+            'char_unit_counts': char_unit_counts,
+            'char_max_len': char_max_len,
+            'word_unit_counts': word_unit_counts,
+            'word_max_len': word_max_len
+        }
 
     @staticmethod
     def get_feature_meta(column, preprocessing_parameters):
-        tf_meta = TextBaseFeature.feature_meta(
-            column,
-            preprocessing_parameters['char_most_common'],
-            preprocessing_parameters['word_most_common'],
-            preprocessing_parameters['lowercase']
+        return TextBaseFeature.get_feature_meta_from_stats(
+            TextBaseFeature.get_feature_stats(
+                column,
+                preprocessing_parameters
+            ),
+            preprocessing_parameters
         )
+
+    @staticmethod
+    def get_feature_meta_from_stats(stats, preprocessing_parameters):
         (
             char_idx2str,
             char_str2idx,
             char_str2freq,
-            char_max_len,
+            char_max_len
+        ) = create_vocabulary_from_counts(
+            stats['char_unit_counts'],
+            stats['char_max_len'],
+            preprocessing_parameters['char_format'],
+            num_most_frequent=preprocessing_parameters['char_most_common']
+        )
+        (
             word_idx2str,
             word_str2idx,
             word_str2freq,
             word_max_len
-        ) = tf_meta
+        ) = create_vocabulary_from_counts(
+            stats['word_unit_counts'],
+            stats['word_max_len'],
+            preprocessing_parameters['word_format'],
+            num_most_frequent=preprocessing_parameters['word_most_common']
+        )
         char_max_len = min(
             preprocessing_parameters['char_sequence_length_limit'],
             char_max_len
@@ -147,7 +157,9 @@ class TextBaseFeature(BaseFeature):
             metadata['word_max_sequence_length'],
             preprocessing_parameters['padding_symbol'],
             preprocessing_parameters['padding'],
-            preprocessing_parameters['lowercase']
+            preprocessing_parameters['lowercase'],
+            batch_size=preprocessing_parameters['tokenizer_batch_size'],
+            num_processes=preprocessing_parameters['tokenizer_num_processes']
         )
 
         return char_data, word_data
@@ -166,6 +178,15 @@ class TextBaseFeature(BaseFeature):
         )
         data['{}_char'.format(feature['name'])] = chars_data
         data['{}_word'.format(feature['name'])] = words_data
+        for level, level_data in (('char', chars_data), ('word', words_data)):
+            data[sequence_lengths_field(
+                '{}_{}'.format(feature['name'], level)
+            )] = get_sequence_lengths(
+                level_data,
+                metadata[feature['name']]['{}_str2idx'.format(level)][
+                    preprocessing_parameters['padding_symbol']
+                ]
+            )
 
 
 class TextInputFeature(TextBaseFeature, SequenceInputFeature):
@@ -183,8 +204,9 @@ class TextInputFeature(TextBaseFeature, SequenceInputFeature):
         self.encoder_obj = self.get_sequence_encoder(encoder_parameters)
 
     def _get_input_placeholder(self):
+        # ids are fed with the integer type they are stored with
         return tf.placeholder(
-            tf.int32, shape=[None, None],
+            tf.as_dtype(int_type(self.vocab_size)), shape=[None, None],
             name='{}_placeholder'.format(self.name)
         )
 
@@ -418,10 +440,10 @@ class TextOutputFeature(TextBaseFeature, SequenceOutputFeature):
         if PREDICTIONS in result and len(result[PREDICTIONS]) > 0:
             preds = result[PREDICTIONS]
             if level_idx2str in metadata:
-                postprocessed[PREDICTIONS] = [
-                    [metadata[level_idx2str][token] for token in pred]
-                    for pred in preds
-                ]
+                postprocessed[PREDICTIONS] = sequences_to_units(
+                    preds,
+                    metadata[level_idx2str]
+                )
             else:
                 postprocessed[PREDICTIONS] = preds
 
@@ -433,10 +455,10 @@ class TextOutputFeature(TextBaseFeature, SequenceOutputFeature):
         if LAST_PREDICTIONS in result and len(result[LAST_PREDICTIONS]) > 0:
             last_preds = result[LAST_PREDICTIONS]
             if level_idx2str in metadata:
-                postprocessed[LAST_PREDICTIONS] = [
-                    metadata[level_idx2str][last_pred] for last_pred in
-                    last_preds
-                ]
+                postprocessed[LAST_PREDICTIONS] = ids_to_units(
+                    last_preds,
+                    metadata[level_idx2str]
+                )
             else:
                 postprocessed[LAST_PREDICTIONS] = last_preds
 
@@ -449,15 +471,7 @@ class TextOutputFeature(TextBaseFeature, SequenceOutputFeature):
             probs = result[PROBABILITIES]
             if probs is not None:
 
-                if len(probs) > 0 and isinstance(probs[0], list):
-                    prob = []
-                    for i in range(len(probs)):
-                        for j in range(len(probs[i])):
-                            probs[i][j] = np.max(probs[i][j])
-                        prob.append(np.prod(probs[i]))
-                else:
-                    probs = np.amax(probs, axis=-1)
-                    prob = np.prod(probs, axis=-1)
+                probs, prob = sequence_probabilities(probs)
 
                 postprocessed[PROBABILITIES] = probs
                 postprocessed['probability'] = prob
@@ -49,7 +49,7 @@ class TimeseriesBaseFeature(BaseFeature):
     }
 
     @staticmethod
-    def get_feature_meta(column, preprocessing_parameters):
+    def get_feature_stats(column, preprocessing_parameters):
         format_function = get_from_registry(
             preprocessing_parameters['format'],
             format_registry
@@ -58,9 +58,24 @@ class TimeseriesBaseFeature(BaseFeature):
         for timeseries in column:
             processed_line = format_function(timeseries)
             max_length = max(max_length, len(processed_line))
+
+        return {'max_length': max_length}
+
+    @staticmethod
+    def get_feature_meta(column, preprocessing_parameters):
+        return TimeseriesBaseFeature.get_feature_meta_from_stats(
+            TimeseriesBaseFeature.get_feature_stats(
+                column,
+                preprocessing_parameters
+            ),
+            preprocessing_parameters
+        )
+
+    @staticmethod
+    def get_feature_meta_from_stats(stats, preprocessing_parameters):
         max_length = min(
             preprocessing_parameters['timeseries_length_limit'],
-            max_length
+            stats['max_length']
         )
 
         return {'max_timeseries_length': max_length}
@@ -0,0 +1,295 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import math
+from collections import OrderedDict
+
+import numpy as np
+import tensorflow as tf
+
+from ludwig.data.dataset import LazyDataset
+from ludwig.features.feature_registries import input_type_registry
+from ludwig.features.feature_registries import output_type_registry
+from ludwig.utils.misc import get_from_registry
+
+
+def get_placeholders_specs(input_features, output_features):
+    """Returns the dtype and shape of the placeholders of the input and
+    output features, as declared by the feature classes, building them in a
+    scratch graph.
+
+    :param input_features: list of input feature definitions
+    :param output_features: list of output feature definitions
+    :return: ordered dictionary from feature name to (dtype, shape)
+    """
+    specs = OrderedDict()
+    with tf.Graph().as_default():
+        for input_feature in input_features:
+            placeholder = get_from_registry(
+                input_feature['type'],
+                input_type_registry
+            )(input_feature)._get_input_placeholder()
+            specs[input_feature['name']] = (placeholder.dtype,
+                                            placeholder.shape)
+        for output_feature in output_features:
+            placeholder = get_from_registry(
+                output_feature['type'],
+                output_type_registry
+            )(output_feature)._get_output_placeholder()
+            specs[output_feature['name']] = (placeholder.dtype,
+                                             placeholder.shape)
+    return specs
+
+
+def feed_placeholder_from(feature_obj, get_placeholder_name, tensor):
+    """Replaces the method building the placeholder of a feature with one
+    building a placeholder that reads from the tensor unless it is fed,
+    with the same dtype, shape and name of the one declared by the feature.
+
+    :param feature_obj: input or output feature object
+    :param get_placeholder_name: name of the method building the placeholder
+    :param tensor: tensor the placeholder defaults to
+    """
+    get_placeholder = getattr(feature_obj, get_placeholder_name)
+
+    def get_placeholder_with_default():
+        with tf.Graph().as_default():
+            placeholder = get_placeholder()
+        return tf.placeholder_with_default(
+            tensor,
+            placeholder.shape,
+            name=placeholder.op.name
+        )
+
+    setattr(feature_obj, get_placeholder_name, get_placeholder_with_default)
+
+
+class InputPipeline(object):
+    """tf.data pipeline the placeholders of a model default to. Datasets are
+    plugged in by initializing its iterator, then each session.run reads the
+    next batch inside TensorFlow instead of copying a dictionary of numpy
+    arrays through feed_dict. The indices of the rows are shuffled and
+    batched, then the rows are gathered from the arrays of the dataset, which
+    are copied once per session into variables that are neither trained nor
+    saved, or read with Dataset.get in parallel calls when they are sparse,
+    not in memory or read from hdf5, and the following batches are
+    prefetched.
+    """
+
+    def __init__(self, specs, graph, num_parallel_calls=4, prefetch_batches=2):
+        self.specs = specs
+        self.graph = graph
+        self.num_parallel_calls = num_parallel_calls
+        self.prefetch_batches = max(prefetch_batches, 1)
+        self.iterator = tf.data.Iterator.from_structure(
+            OrderedDict((name, dtype) for name, (dtype, _) in specs.items()),
+            OrderedDict((name, shape) for name, (_, shape) in specs.items())
+        )
+        self.tensors = self.iterator.get_next()
+        # initializers are built once for each dataset and batching
+        # so that the graph does not grow every epoch
+        self.initializers = {}
+        # variables holding the arrays of in memory datasets, by dataset
+        self.datasets_rows = {}
+
+    def supports(self, dataset):
+        return all(name in dataset.features for name in self.specs)
+
+    def in_memory(self, dataset):
+        if isinstance(dataset, LazyDataset):
+            return False
+        for name in self.specs:
+            feature = dataset.features[name]
+            value = dataset.dataset[name]
+            if (not isinstance(value, np.ndarray) or value.dtype.hasobject or
+                    (dataset.data_hdf5_fp is not None and
+                     not feature.get('in_memory', True))):
+                return False
+        return True
+
+    def load_rows(self, dataset):
+        """Builds the variables the arrays of a dataset are copied into, with
+        the op copying them and the feed_dict it is run with. The variables
+        are in no collection, so they are not initialized with the model
+        variables and not saved in its checkpoints, and are shared by all
+        the batch sizes the dataset is read with.
+        """
+        key = id(dataset)
+        if key not in self.datasets_rows:
+            arrays = OrderedDict()
+            feed_dict = {}
+            for name in self.specs:
+                value = dataset.dataset[name][:dataset.size]
+                placeholder = tf.placeholder(
+                    tf.as_dtype(value.dtype),
+                    [None] + list(value.shape[1:]),
+                    name='{}_rows'.format(name)
+                )
+                arrays[name] = tf.Variable(
+                    placeholder,
+                    trainable=False,
+                    collections=[],
+                    validate_shape=False,
+                    name='{}_rows_data'.format(name)
+                )
+                feed_dict[placeholder] = value
+            is_loaded = tf.is_variable_initialized(
+                next(iter(arrays.values()))
+            )
+            load = tf.group(*[array.initializer for array in arrays.values()])
+            # the dataset is referenced so that its id is not reused
+            self.datasets_rows[key] = (
+                dataset,
+                arrays,
+                (is_loaded, load, feed_dict)
+            )
+        return self.datasets_rows[key][1:]
+
+    def gather_rows(self, dataset):
+        arrays, load = self.load_rows(dataset)
+
+        def gather(indices):
+            batch = OrderedDict()
+            for name, (dtype, _) in self.specs.items():
+                batch[name] = tf.cast(tf.gather(arrays[name], indices), dtype)
+            return batch
+
+        return gather, load
+
+    def read_rows(self, dataset):
+        names = list(self.specs)
+
+        def read_batch(indices):
+            return [
+                np.asarray(
+                    dataset.get(name, indices),
+                    dtype=self.specs[name][0].as_numpy_dtype
+                )
+                for name in names
+            ]
+
+        def read(indices):
+            values = tf.py_func(
+                read_batch,
+                [indices],
+                [self.specs[name][0] for name in names],
+                stateful=False
+            )
+            batch = OrderedDict()
+            for name, value in zip(names, values):
+                value.set_shape(self.specs[name][1])
+                batch[name] = value
+            return batch
+
+        return read, None
+
+    def get_initializer(self, dataset, batch_size, should_shuffle=True,
+                        ignore_last=False):
+        key = (id(dataset), batch_size, should_shuffle, ignore_last)
+        if key not in self.initializers:
+            with self.graph.as_default():
+                seed = tf.placeholder(tf.int64, [], name='shuffle_seed')
+                indices = tf.data.Dataset.range(dataset.size)
+                if should_shuffle:
+                    indices = indices.shuffle(dataset.size, seed=seed)
+                indices = indices.batch(batch_size, drop_remainder=ignore_last)
+                if self.in_memory(dataset):
+                    map_fn, load = self.gather_rows(dataset)
+                else:
+                    map_fn, load = self.read_rows(dataset)
+                batches = indices.map(
+                    map_fn,
+                    num_parallel_calls=self.num_parallel_calls
+                ).prefetch(self.prefetch_batches)
+                initializer = self.iterator.make_initializer(batches)
+            # the dataset is referenced so that its id is not reused
+            self.initializers[key] = (dataset, initializer, seed, load)
+        return self.initializers[key][1:]
+
+    def initialize(self, session, dataset, batch_size, should_shuffle=True,
+                   ignore_last=False):
+        initializer, seed, load = self.get_initializer(
+            dataset,
+            batch_size,
+            should_shuffle,
+            ignore_last
+        )
+        if load is not None:
+            # arrays are copied in the first time the dataset
+            # is read in a session, not every epoch
+            is_loaded, load_op, load_feed_dict = load
+            if not session.run(is_loaded):
+                session.run(load_op, feed_dict=load_feed_dict)
+        # a new seed every epoch, drawn from the seeded numpy generator
+        session.run(
+            initializer,
+            feed_dict={seed: np.random.randint(np.iinfo(np.int32).max)}
+        )
+
+
+class PipelineBatcher(object):
+    """Batcher interface over an input pipeline. Batches are read by the
+    model from the pipeline, so next_batch returns an empty batch and only
+    keeps track of the position in the epoch.
+    """
+
+    def __init__(self, pipeline, session, dataset, batch_size=128,
+                 should_shuffle=True, ignore_last=False):
+        self.pipeline = pipeline
+        self.session = session
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.should_shuffle = should_shuffle
+        self.ignore_last = ignore_last
+        self.total_size = dataset.size
+        self.index = 0
+        self.last_batch_size = 0
+        self.initialized = False
+
+    @property
+    def steps_per_epoch(self):
+        if self.ignore_last:
+            return self.total_size // self.batch_size
+        return int(math.ceil(self.total_size / self.batch_size))
+
+    def next_batch(self):
+        if self.last_batch():
+            self.reset()
+        if not self.initialized:
+            self.pipeline.initialize(
+                self.session,
+                self.dataset,
+                self.batch_size,
+                should_shuffle=self.should_shuffle,
+                ignore_last=self.ignore_last
+            )
+            self.initialized = True
+
+        self.last_batch_size = min(self.batch_size,
+                                   self.total_size - self.index)
+        self.index += self.batch_size
+        return {}
+
+    def last_batch(self):
+        if self.ignore_last:
+            return self.index + self.batch_size > self.total_size
+        return self.index >= self.total_size
+
+    def reset(self):
+        # the iterator is shared with the other datasets,
+        # so it is initialized again at the start of every epoch
+        self.index = 0
+        self.initialized = False
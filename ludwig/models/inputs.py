@@ -19,6 +19,7 @@ from collections import OrderedDict
 import tensorflow as tf
 
 from ludwig.features.feature_registries import input_type_registry
+from ludwig.models.input_pipeline import feed_placeholder_from
 from ludwig.utils.algorithms_utils import topological_sort_feature_dependencies
 from ludwig.utils.misc import get_from_registry
 
@@ -27,16 +28,20 @@ def build_inputs(input_features,
                  regularizer,
                  dropout_rate,
                  is_training=True,
+                 pipeline_tensors=None,
                  **kwargs):
     # ================ Inputs =============
     feature_representations = OrderedDict()
     input_features = topological_sort_feature_dependencies(input_features)
     for input_feature in input_features:
-        feature_representation = build_single_input(input_feature,
-                                                    regularizer,
-                                                    dropout_rate,
-                                                    is_training=is_training,
-                                                    **kwargs)
+        feature_representation = build_single_input(
+            input_feature,
+            regularizer,
+            dropout_rate,
+            is_training=is_training,
+            pipeline_tensors=pipeline_tensors,
+            **kwargs
+        )
         feature_representations[input_feature['name']] = feature_representation
     return feature_representations
 
@@ -45,6 +50,7 @@ def build_single_input(input_feature,
                        regularizer,
                        dropout_rate,
                        is_training=True,
+                       pipeline_tensors=None,
                        **kwargs):
     scope_name = input_feature['name']
     logging.debug('- Input {} feature {}'.format(
@@ -60,6 +66,12 @@ def build_single_input(input_feature,
             input_type_registry
         )
         input_feature_obj = input_feature_class(input_feature)
+        if pipeline_tensors is not None:
+            feed_placeholder_from(
+                input_feature_obj,
+                '_get_input_placeholder',
+                pipeline_tensors[input_feature['name']]
+            )
         feature_representation = input_feature_obj.build_input(
             regularizer=regularizer,
             dropout_rate=dropout_rate, is_training=is_training,
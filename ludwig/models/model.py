@@ -40,6 +40,7 @@ from tqdm import tqdm
 from ludwig.constants import *
 from ludwig.features.feature_registries import output_type_registry
 from ludwig.features.feature_utils import SEQUENCE_TYPES
+from ludwig.features.feature_utils import trim_to_lengths
 from ludwig.globals import MODEL_HYPERPARAMETERS_FILE_NAME
 from ludwig.globals import MODEL_WEIGHTS_FILE_NAME
 from ludwig.globals import MODEL_WEIGHTS_PROGRESS_FILE_NAME
@@ -47,6 +48,9 @@ from ludwig.globals import TRAINING_PROGRESS_FILE_NAME
 from ludwig.globals import is_on_master
 from ludwig.globals import is_progressbar_disabled
 from ludwig.models.combiners import get_build_combiner
+from ludwig.models.input_pipeline import InputPipeline
+from ludwig.models.input_pipeline import PipelineBatcher
+from ludwig.models.input_pipeline import get_placeholders_specs
 from ludwig.models.inputs import build_inputs, dynamic_length_encoders
 from ludwig.models.modules.loss_modules import regularizer_registry
 from ludwig.models.modules.measure_modules import get_improved_fun
@@ -57,6 +61,8 @@ from ludwig.utils import time_utils
 from ludwig.utils.batcher import Batcher
 from ludwig.utils.batcher import BucketedBatcher
 from ludwig.utils.batcher import DistributedBatcher
+from ludwig.utils.batcher import PrefetchBatcher
+from ludwig.utils.batcher import trim_batch
 from ludwig.utils.data_utils import load_json
 from ludwig.utils.data_utils import load_object
 from ludwig.utils.data_utils import save_object
@@ -152,12 +158,29 @@ class Model:
             self.dropout_rate = tf.placeholder(tf.float32, name='dropout_rate')
             self.is_training = tf.placeholder(tf.bool, [], name='is_training')
 
+            # ================ Input pipeline ================
+            # placeholders read from a tf.data pipeline unless they are fed
+            self.input_pipeline = None
+            pipeline_tensors = None
+            if training.get('input_pipeline') == 'tf_data':
+                self.input_pipeline = InputPipeline(
+                    get_placeholders_specs(input_features, output_features),
+                    graph,
+                    num_parallel_calls=training.get(
+                        'input_pipeline_parallel_calls',
+                        4
+                    ),
+                    prefetch_batches=training.get('prefetch_batches', 2)
+                )
+                pipeline_tensors = self.input_pipeline.tensors
+
             # ================ Inputs ================
             feature_encodings = build_inputs(
                 input_features,
                 self.regularizer,
                 self.dropout_rate,
-                is_training=self.is_training
+                is_training=self.is_training,
+                pipeline_tensors=pipeline_tensors
             )
 
             for fe_name, fe_properties in feature_encodings.items():
@@ -181,7 +204,8 @@ class Model:
                 hidden_size,
                 regularizer=self.regularizer,
                 dropout_rate=self.dropout_rate,
-                is_training=self.is_training
+                is_training=self.is_training,
+                pipeline_tensors=pipeline_tensors
             )
 
             (
@@ -252,9 +276,11 @@ class Model:
             self.learning_rate: learning_rate,
             self.dropout_rate: dropout_rate
         }
+        # batches of the input pipeline are read inside the graph
         for input_feature in input_features:
-            feed_dict[getattr(self, input_feature['name'])] = batch[
-                input_feature['name']]
+            if input_feature['name'] in batch:
+                feed_dict[getattr(self, input_feature['name'])] = batch[
+                    input_feature['name']]
         for output_feature in output_features:
             if output_feature['name'] in batch:
                 feed_dict[getattr(self, output_feature['name'])] = batch[
@@ -274,6 +300,9 @@ class Model:
             learning_rate=0.001,
             batch_size=128,
             bucketing_field=None,
+            bucketing_num_buckets=10,
+            bucketing_boundaries=None,
+            dynamic_padding=False,
             dropout_rate=0.0,
             early_stop=20,
             reduce_learning_rate_on_plateau=0,
@@ -284,6 +313,9 @@ class Model:
             increase_batch_size_on_plateau_rate=2,
             increase_batch_size_on_plateau_max=512,
             learning_rate_warmup_epochs=5,  # used when training with Horovod
+            prefetch_batches=2,
+            shuffle_block_size=None,
+            shuffle_buffer_size=None,
             resume=False,
             skip_save_model=False,
             skip_save_progress=False,
@@ -315,8 +347,21 @@ class Model:
         :type batch_size: Integer
         :param bucketing_field:when batching, buckets datapoints based the
                length of a field together. Bucketing on text length speeds up
-               training of RNNs consistently, 30% in some cases
-        :type bucketing_field:
+               training of RNNs consistently, 30% in some cases. A list of
+               fields buckets on the combination of their lengths
+        :type bucketing_field: str or list
+        :param bucketing_num_buckets: Number of buckets of each bucketing
+               field, with boundaries on the quantiles of the lengths
+        :type bucketing_num_buckets: Integer
+        :param bucketing_boundaries: Maximum lengths of each bucket but the
+               last one, or a dictionary of them by bucketing field. They
+               replace the quantile boundaries
+        :type bucketing_boundaries: list or dict
+        :param dynamic_padding: Trims the padding of the sequence and text
+               inputs of each batch to their longest sequence, when their
+               encoder accepts inputs of any length. It also applies to
+               evaluation and prediction batches
+        :type dynamic_padding: Boolean
         :param dropout_rate: dropout_rate probability (probability of dropping
                a neuron in a given layer)
         :type dropout_rate: Float
@@ -347,6 +392,18 @@ class Model:
         :param learning_rate_warmup_epochs: The number of epochs to warmup the
                learning rate for.
         :type learning_rate_warmup_epochs: Integer
+        :param prefetch_batches: Number of training batches built in advance
+               in a background thread while the model is training on the
+               current one. 0 disables prefetching.
+        :type prefetch_batches: Integer
+        :param shuffle_block_size: If specified, the training set is shuffled
+               in blocks of this many contiguous rows and then rows are
+               shuffled within buffers of `shuffle_buffer_size` rows, so that
+               batches are read from few contiguous ranges of rows.
+        :type shuffle_block_size: Integer
+        :param shuffle_buffer_size: Number of rows that are shuffled together
+               when shuffling in blocks, by default one block.
+        :type shuffle_buffer_size: Integer
         :param resume: Resume training a model that was being trained.
         :type resume: Boolean
         :param skip_save_model: disables
@@ -460,8 +517,20 @@ class Model:
         batcher = self.initialize_batcher(
             training_set,
             batch_size,
-            bucketing_field
+            bucketing_field,
+            shuffle_block_size=shuffle_block_size,
+            shuffle_buffer_size=shuffle_buffer_size,
+            bucketing_num_buckets=bucketing_num_buckets,
+            bucketing_boundaries=bucketing_boundaries,
+            dynamic_padding=dynamic_padding
         )
+        if prefetch_batches > 0 and not isinstance(batcher, PipelineBatcher):
+            batcher = PrefetchBatcher(batcher, prefetch_batches)
+        sequence_input_names = [
+            feature['name']
+            for feature in self.hyperparameters['input_features']
+            if feature['type'] in (SEQUENCE, TEXT)
+        ]
 
         # ================ Training Loop ================
         while progress_tracker.epoch < self.epochs:
@@ -487,8 +556,24 @@ class Model:
                 )
 
             # training step loop
+            train_start_time = time.time()
+            train_samples = 0
+            train_batches = 0
+            padded_cells = 0
+            padding_cells = 0
             while not batcher.last_batch():
                 batch = batcher.next_batch()
+                if isinstance(batcher, PipelineBatcher):
+                    train_samples += batcher.last_batch_size
+                else:
+                    train_samples += len(next(iter(batch.values())))
+                train_batches += 1
+                for name in sequence_input_names:
+                    if name not in batch:
+                        continue
+                    padded_cells += batch[name].size
+                    padding_cells += (batch[name].size -
+                                      np.count_nonzero(batch[name]))
 
                 if self.horovod:
                     current_learning_rate = learning_rate_warmup(
@@ -527,8 +612,28 @@ class Model:
                     bar.update(1)
 
             # post training
+            train_time = time.time() - train_start_time
             if is_on_master():
                 bar.close()
+                logging.info(
+                    'Training throughput: {:.1f} samples/s, '
+                    '{:.1f} batches/s'.format(
+                        train_samples / train_time,
+                        train_batches / train_time
+                    )
+                )
+                if isinstance(batcher, PrefetchBatcher):
+                    logging.info(
+                        'Time spent waiting for batches: {}'.format(
+                            time_utils.strdelta(batcher.wait_time * 1000.0)
+                        )
+                    )
+                if padded_cells > 0:
+                    logging.info(
+                        'Padding in sequence inputs: {:.1%}'.format(
+                            padding_cells / padded_cells
+                        )
+                    )
 
             progress_tracker.epoch += 1
             batcher.reset()  # todo this may be useless, doublecheck
@@ -1084,16 +1189,18 @@ class Model:
                 if LENGTHS in output_stats[field_name]:
                     lengths = output_stats[field_name][LENGTHS]
                     if PREDICTIONS in output_stats[field_name]:
-                        output_stats[field_name][PREDICTIONS] = np.array(
-                            [list(output_stats[field_name][PREDICTIONS][i,
-                                  0:lengths[i]])
-                             for i in range(len(lengths))]
+                        output_stats[field_name][PREDICTIONS] = (
+                            trim_to_lengths(
+                                output_stats[field_name][PREDICTIONS],
+                                lengths
+                            )
                         )
                     if PROBABILITIES in output_stats[field_name]:
-                        output_stats[field_name][PROBABILITIES] = np.array(
-                            [list(output_stats[field_name][PROBABILITIES][i,
-                                  0:lengths[i]]) for i in
-                             range(len(lengths))]
+                        output_stats[field_name][PROBABILITIES] = (
+                            trim_to_lengths(
+                                output_stats[field_name][PROBABILITIES],
+                                lengths
+                            )
                         )
 
         if not only_predictions:
@@ -1223,6 +1330,50 @@ class Model:
 
         return predict_stats
 
+    def predict_batch(self, batch, session=None):
+        """Predicts a batch with a single session run, without batchers and
+        progress bars, for small batches where their overhead dominates.
+
+        :param batch: dictionary from input feature name to array
+        :param session: session to run, by default the one of the model
+        :return: predictions in the format returned by predict with
+                 only_predictions
+        """
+        if session is None:
+            if self.session is None:
+                session = self.initialize_session()
+
+                # load parameters
+                if self.weights_save_path:
+                    self.restore(session, self.weights_save_path)
+            else:
+                session = self.session
+
+        if self.hyperparameters['training'].get('dynamic_padding', False):
+            batch = trim_batch(dict(batch), self.get_trim_fields())
+        result = session.run(
+            self.get_output_nodes(
+                collect_predictions=True,
+                only_predictions=True
+            ),
+            feed_dict=self.feed_dict(
+                batch,
+                dropout_rate=0.0,
+                is_training=False
+            )
+        )
+
+        output_stats = self.get_outputs_stats()
+        for output_feature in self.hyperparameters['output_features']:
+            field_name = output_feature['name']
+            output_config = output_type_registry[
+                output_feature['type']].output_config
+            for stat in output_config:
+                if output_config[stat]['type'] == PREDICTION:
+                    output_stats[field_name][stat] = result[field_name][
+                        output_config[stat]['output']]
+        return output_stats
+
     def collect_activations(
             self,
             dataset,
@@ -1403,14 +1554,48 @@ class Model:
         stat_names['combined'] = [LOSS, ACCURACY]
         return stat_names
 
+    def get_padding_side(self, feature):
+        if 'padding' in feature.get('preprocessing', {}):
+            return feature['preprocessing']['padding']
+        return self.hyperparameters['preprocessing'][feature['type']][
+            'padding']
+
+    def get_trim_fields(self):
+        """Returns the sequence and text input features whose padding can be
+        trimmed to the longest sequence of each batch, that are the ones with
+        encoders that accept inputs of any length, mapped to the side their
+        padding is on. Sequence outputs are never trimmed, as the generator
+        decoder always decodes up to their max_sequence_length and the
+        tagger one aligns them to the length of its inputs.
+        """
+        return {
+            feature['name']: self.get_padding_side(feature)
+            for feature in self.hyperparameters['input_features']
+            if feature['type'] in (SEQUENCE, TEXT) and
+            feature['encoder'] in dynamic_length_encoders
+        }
+
     def initialize_batcher(
             self,
             dataset,
             batch_size=128,
             bucketing_field=None,
             should_shuffle=True,
-            ignore_last=False
+            ignore_last=False,
+            shuffle_block_size=None,
+            shuffle_buffer_size=None,
+            bucketing_num_buckets=10,
+            bucketing_boundaries=None,
+            dynamic_padding=None
     ):
+        # evaluation and prediction use the setting the model was trained with
+        if dynamic_padding is None:
+            dynamic_padding = self.hyperparameters['training'].get(
+                'dynamic_padding',
+                False
+            )
+        trim_fields = self.get_trim_fields() if dynamic_padding else None
+
         if self.horovod:
             batcher = DistributedBatcher(
                 dataset,
@@ -1418,46 +1603,63 @@ class Model:
                 self.horovod,
                 batch_size,
                 should_shuffle=should_shuffle,
-                ignore_last=ignore_last
+                ignore_last=ignore_last,
+                shuffle_block_size=shuffle_block_size,
+                shuffle_buffer_size=shuffle_buffer_size,
+                trim_fields=trim_fields,
+                random_seed=self.hyperparameters['random_seed']
             )
         elif bucketing_field is not None:
-            input_features = self.hyperparameters['input_features']
-            bucketing_feature = [
-                feature for feature in input_features if
-                feature['name'] == bucketing_field
-            ]
-            if not bucketing_feature:
-                raise ValueError(
-                    'Bucketing field {} not present in input features'.format(
-                        bucketing_field
+            if isinstance(bucketing_field, str):
+                bucketing_field = [bucketing_field]
+            input_features = {
+                feature['name']: feature
+                for feature in self.hyperparameters['input_features']
+            }
+            should_trim = {}
+            trim_side = {}
+            for field in bucketing_field:
+                if field not in input_features:
+                    raise ValueError(
+                        'Bucketing field {} not present in '
+                        'input features'.format(field)
                     )
-                )
-            else:
-                bucketing_feature = bucketing_feature[0]
-            should_trim = bucketing_feature[
-                              'encoder'] in dynamic_length_encoders
-            if 'preprocessing' in bucketing_feature:
-                trim_side = bucketing_feature['preprocessing']['padding']
-            else:
-                trim_side = self.hyperparameters['preprocessing'][
-                    bucketing_feature['type']]['padding']
+                bucketing_feature = input_features[field]
+                should_trim[field] = bucketing_feature[
+                                         'encoder'] in dynamic_length_encoders
+                trim_side[field] = self.get_padding_side(bucketing_feature)
 
             batcher = BucketedBatcher(
                 dataset,
                 bucketing_field=bucketing_field,
                 batch_size=batch_size,
-                buckets=10,
+                buckets=bucketing_num_buckets,
                 ignore_last=ignore_last,
                 should_shuffle=should_shuffle,
                 should_trim=should_trim,
-                trim_side=trim_side
+                trim_side=trim_side,
+                boundaries=bucketing_boundaries,
+                trim_fields=trim_fields
+            )
+        elif (self.input_pipeline is not None and not trim_fields and
+              self.input_pipeline.supports(dataset)):
+            batcher = PipelineBatcher(
+                self.input_pipeline,
+                self.session,
+                dataset,
+                batch_size,
+                should_shuffle=should_shuffle,
+                ignore_last=ignore_last
             )
         else:
             batcher = Batcher(
                 dataset,
                 batch_size,
                 should_shuffle=should_shuffle,
-                ignore_last=ignore_last
+                ignore_last=ignore_last,
+                shuffle_block_size=shuffle_block_size,
+                shuffle_buffer_size=shuffle_buffer_size,
+                trim_fields=trim_fields
             )
         return batcher
 
@@ -19,13 +19,14 @@ from collections import OrderedDict
 import tensorflow as tf
 
 from ludwig.features.feature_registries import output_type_registry
+from ludwig.models.input_pipeline import feed_placeholder_from
 from ludwig.utils.algorithms_utils import topological_sort_feature_dependencies
 from ludwig.utils.misc import get_from_registry
 
 
 def build_outputs(output_features, hidden, hidden_size, regularizer,
                   dropout_rate,
-                  is_training=True, **kwargs):
+                  is_training=True, pipeline_tensors=None, **kwargs):
     output_features = topological_sort_feature_dependencies(output_features)
     output_tensors = OrderedDict()
     final_hidden = {}
@@ -40,6 +41,7 @@ def build_outputs(output_features, hidden, hidden_size, regularizer,
             dropout_rate,
             regularizer,
             is_training,
+            pipeline_tensors=pipeline_tensors,
             **kwargs
         )
         output_train_losses.append(of_train_mean_loss)
@@ -72,7 +74,8 @@ def build_outputs(output_features, hidden, hidden_size, regularizer,
 
 def build_single_output(output_feature, feature_hidden, feature_hidden_size,
                         final_hidden,
-                        dropout_rate, regularizer, is_training=True, **kwargs):
+                        dropout_rate, regularizer, is_training=True,
+                        pipeline_tensors=None, **kwargs):
     logging.debug('- Output {} feature {}'.format(
         output_feature['type'],
         output_feature['name']
@@ -83,6 +86,12 @@ def build_single_output(output_feature, feature_hidden, feature_hidden_size,
             output_type_registry
         )
         feature = feature_class(output_feature)
+        if pipeline_tensors is not None:
+            feed_placeholder_from(
+                feature,
+                '_get_output_placeholder',
+                pipeline_tensors[output_feature['name']]
+            )
         weighted_train_mean_loss, weighted_eval_loss, output_tensors = feature.concat_dependencies_and_build_output(
             feature_hidden,
             feature_hidden_size,
@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+from ludwig.data.compiled_preprocessing import compile_feature_encoders
+from ludwig.data.compiled_preprocessing import encode_columns
+from ludwig.data.compiled_preprocessing import encode_records
+from ludwig.data.postprocessing import postprocess_columns
+
+
+class Predictor(object):
+    """Predicts small batches of raw values with a loaded model, for online
+    inference. Inputs are preprocessed by feature encoders built once from
+    the train set metadata instead of through DataFrames, the whole batch is
+    predicted with a single session run and predictions are returned as
+    plain dictionaries, with the same values LudwigModel.predict returns.
+    """
+
+    def __init__(self, model, model_definition, train_set_metadata,
+                 feature_encoders=None):
+        """
+        :param model: loaded Model, with an open session
+        :param model_definition: model definition of the model
+        :param train_set_metadata: train set metadata of the model
+        :param feature_encoders: encoders of the input features, by default
+               compiled from the train set metadata
+        """
+        self.model = model
+        self.output_features = model_definition['output_features']
+        self.train_set_metadata = train_set_metadata
+        if feature_encoders is None:
+            feature_encoders = compile_feature_encoders(
+                model_definition['input_features'],
+                train_set_metadata,
+                model_definition['preprocessing']
+            )
+        self.feature_encoders = feature_encoders
+
+    def predict(self, data):
+        """
+        :param data: list of dictionaries from input feature name to raw
+               value, or dictionary from input feature name to a list or
+               numpy array of raw values
+        :return: dictionary with the columns of the DataFrame returned by
+                 LudwigModel.predict
+        """
+        if isinstance(data, dict):
+            batch = encode_columns(self.feature_encoders, data)
+        else:
+            batch = encode_records(self.feature_encoders, data)
+        return postprocess_columns(
+            self.model.predict_batch(batch),
+            self.output_features,
+            self.train_set_metadata
+        )
+
+    def predict_records(self, records):
+        """
+        :param records: list of dictionaries from input feature name to raw
+               value
+        :return: list of dictionaries from column name to the prediction of
+                 each record
+        """
+        columns = self.predict(records)
+        return [
+            {name: column[i] for name, column in columns.items()}
+            for i in range(len(records))
+        ]
@@ -0,0 +1,415 @@
+#! /usr/bin/env python
+# coding=utf-8
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import argparse
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+
+import numpy as np
+
+from ludwig.api import LudwigModel
+from ludwig.globals import LUDWIG_VERSION
+from ludwig.globals import set_disable_progressbar
+from ludwig.utils.data_utils import NumpyEncoder
+from ludwig.utils.print_utils import logging_level_registry
+from ludwig.utils.print_utils import print_ludwig
+
+
+class PendingPrediction(object):
+    """Records of a request waiting for their predictions."""
+
+    def __init__(self, records):
+        self.records = records
+        self.arrival_time = time.time()
+        self.done = threading.Event()
+        self.predictions = None
+        self.error = None
+
+
+class PredictionServer(object):
+    """Keeps a model loaded and predicts the records of concurrent requests
+    in micro-batches. A single worker thread runs the model: it waits for a
+    request, then keeps collecting the following ones until either
+    `max_batch_size` records are collected or `max_latency_ms` milliseconds
+    passed since the first one arrived, and predicts all their records at
+    once, so that under load the cost of a session run is shared by many
+    requests while a lone request waits at most `max_latency_ms`.
+    """
+
+    def __init__(
+            self,
+            ludwig_model,
+            max_batch_size=128,
+            max_latency_ms=5.0,
+            num_latencies=10000
+    ):
+        """
+        :param ludwig_model: loaded LudwigModel predictions are made with
+        :param max_batch_size: maximum number of records predicted at once,
+               a request with more records is predicted alone
+        :param max_latency_ms: maximum time in milliseconds the first
+               request of a batch waits for other requests to join it
+        :param num_latencies: number of latencies of the last requests the
+               percentiles are computed on
+        """
+        self.ludwig_model = ludwig_model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.input_names = [
+            feature['name']
+            for feature in ludwig_model.model_definition['input_features']
+        ]
+
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=num_latencies)
+        self.num_requests = 0
+        self.num_records = 0
+        self.num_batches = 0
+        self.num_errors = 0
+        self.start_time = None
+
+    def start(self):
+        self.start_time = time.time()
+        self.worker.start()
+
+    def stop(self):
+        self.queue.put(None)
+        self.worker.join()
+
+    def predict(self, records):
+        """Predicts the records, blocking until their batch is predicted.
+        :param records: list of dictionaries from input feature name to
+               the raw value of the feature
+        :return: list of dictionaries of the postprocessed predictions
+        """
+        pending = PendingPrediction(records)
+        self.queue.put(pending)
+        pending.done.wait()
+
+        latency = time.time() - pending.arrival_time
+        with self.lock:
+            self.latencies.append(latency)
+            self.num_requests += 1
+            if pending.error is not None:
+                self.num_errors += 1
+        if pending.error is not None:
+            raise pending.error
+        return pending.predictions
+
+    def next_batch(self):
+        pending = self.queue.get()
+        if pending is None:
+            return None
+        batch = [pending]
+        num_records = len(pending.records)
+        deadline = pending.arrival_time + self.max_latency
+        while num_records < self.max_batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                pending = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if pending is None:
+                # predict what was collected, then stop
+                self.queue.put(None)
+                break
+            batch.append(pending)
+            num_records += len(pending.records)
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                return
+            self.predict_batch(batch)
+
+    def predict_batch(self, batch):
+        records = [record for pending in batch for record in pending.records]
+        try:
+            columns = self.ludwig_model.predict_batch(records)
+            predictions = [
+                {name: column[i] for name, column in columns.items()}
+                for i in range(len(records))
+            ]
+        except Exception as e:
+            if len(batch) > 1:
+                # a bad value in one request fails the whole batch,
+                # so requests are predicted alone for only that one to fail
+                logging.warning(
+                    'Prediction of a batch of {} requests failed, '
+                    'predicting them one at a time: {}'.format(len(batch), e)
+                )
+                for pending in batch:
+                    self.predict_batch([pending])
+                return
+            logging.exception('Prediction of a request failed')
+            batch[0].error = e
+            batch[0].done.set()
+            return
+
+        with self.lock:
+            self.num_records += len(records)
+            self.num_batches += 1
+        start = 0
+        for pending in batch:
+            end = start + len(pending.records)
+            pending.predictions = predictions[start:end]
+            start = end
+            pending.done.set()
+
+    def stats(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000.0
+            elapsed_time = time.time() - self.start_time
+            stats = {
+                'requests': self.num_requests,
+                'records': self.num_records,
+                'batches': self.num_batches,
+                'errors': self.num_errors,
+                'mean_batch_size': (self.num_records / self.num_batches
+                                    if self.num_batches else 0.0),
+                'requests_per_second': self.num_requests / elapsed_time,
+                'records_per_second': self.num_records / elapsed_time
+            }
+        for percentile in (50, 99):
+            stats['p{}_latency_ms'.format(percentile)] = (
+                np.percentile(latencies, percentile) if len(latencies)
+                else None
+            )
+        return stats
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def get_request_handler(prediction_server):
+    class PredictionRequestHandler(BaseHTTPRequestHandler):
+        """Predicts the JSON record, or list of records, posted to /predict
+        and returns the server stats on GET /stats.
+        """
+
+        def send_json(self, code, content):
+            body = json.dumps(content, cls=NumpyEncoder).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/stats':
+                self.send_json(404, {'error': 'Not found'})
+                return
+            self.send_json(200, prediction_server.stats())
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self.send_json(404, {'error': 'Not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                content = json.loads(self.rfile.read(length).decode('utf-8'))
+            except ValueError as e:
+                self.send_json(400, {'error': 'Invalid JSON: {}'.format(e)})
+                return
+
+            records = content if isinstance(content, list) else [content]
+            for record in records:
+                missing = [name for name in prediction_server.input_names
+                           if not isinstance(record, dict) or
+                           name not in record]
+                if missing:
+                    self.send_json(400, {
+                        'error': 'Missing input features: {}'.format(
+                            ', '.join(missing)
+                        )
+                    })
+                    return
+
+            try:
+                predictions = prediction_server.predict(records)
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+                return
+            self.send_json(
+                200,
+                predictions if isinstance(content, list) else predictions[0]
+            )
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return PredictionRequestHandler
+
+
+def serve(
+        model_path,
+        host='127.0.0.1',
+        port=8000,
+        max_batch_size=128,
+        max_latency_ms=5.0,
+        stats_interval=60,
+        **kwargs
+):
+    """Loads a model and serves its predictions over HTTP until interrupted.
+    :param model_path: path of the model to serve
+    :param host: address the server listens on
+    :param port: port the server listens on
+    :param max_batch_size: maximum number of records predicted at once
+    :param max_latency_ms: maximum time in milliseconds a request waits for
+           other requests to be predicted with
+    :param stats_interval: seconds between the logs of the server stats,
+           0 disables them
+    """
+    ludwig_model = LudwigModel.load(
+        model_path,
+        logging_level=logging.getLogger().level
+    )
+    set_disable_progressbar(True)
+
+    prediction_server = PredictionServer(
+        ludwig_model,
+        max_batch_size=max_batch_size,
+        max_latency_ms=max_latency_ms
+    )
+    prediction_server.start()
+    http_server = ThreadingHTTPServer(
+        (host, port),
+        get_request_handler(prediction_server)
+    )
+
+    stop_logging = threading.Event()
+
+    def log_stats():
+        while not stop_logging.wait(stats_interval):
+            logging.info('Stats: {}'.format(
+                json.dumps(prediction_server.stats(), sort_keys=True)
+            ))
+
+    if stats_interval > 0:
+        threading.Thread(target=log_stats, daemon=True).start()
+
+    logging.info('Serving {} on http://{}:{}'.format(model_path, host, port))
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_logging.set()
+        http_server.server_close()
+        prediction_server.stop()
+        ludwig_model.close()
+
+
+def cli(sys_argv):
+    parser = argparse.ArgumentParser(
+        description='This script serves the predictions of a pretrained '
+                    'model over HTTP, predicting concurrent requests '
+                    'in micro-batches.',
+        prog='ludwig serve',
+        usage='%(prog)s [options]'
+    )
+
+    # ----------------
+    # Model parameters
+    # ----------------
+    parser.add_argument(
+        '-m',
+        '--model_path',
+        help='model to load',
+        required=True
+    )
+
+    # -----------------
+    # Server parameters
+    # -----------------
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='address the server listens on'
+    )
+    parser.add_argument(
+        '-p',
+        '--port',
+        type=int,
+        default=8000,
+        help='port the server listens on'
+    )
+    parser.add_argument(
+        '-mbs',
+        '--max_batch_size',
+        type=int,
+        default=128,
+        help='maximum number of records predicted at once'
+    )
+    parser.add_argument(
+        '-ml',
+        '--max_latency_ms',
+        type=float,
+        default=5.0,
+        help='maximum milliseconds a request waits for other requests '
+             'to be predicted in the same batch'
+    )
+    parser.add_argument(
+        '-si',
+        '--stats_interval',
+        type=float,
+        default=60,
+        help='seconds between the logs of latency and throughput stats, '
+             '0 disables them'
+    )
+
+    # ------------------
+    # Generic parameters
+    # ------------------
+    parser.add_argument(
+        '-l',
+        '--logging_level',
+        default='info',
+        help='the level of logging to use',
+        choices=['critical', 'error', 'warning', 'info', 'debug', 'notset']
+    )
+
+    args = parser.parse_args(sys_argv)
+
+    logging.basicConfig(
+        stream=sys.stdout,
+        level=logging_level_registry[args.logging_level],
+        format='%(message)s'
+    )
+
+    print_ludwig('Serve', LUDWIG_VERSION)
+
+    serve(**vars(args))
+
+
+if __name__ == '__main__':
+    cli(sys.argv[1:])
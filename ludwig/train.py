@@ -26,6 +26,7 @@ from pprint import pformat
 
 import yaml
 
+from ludwig.data.preprocessing import preprocess_for_horovod_training
 from ludwig.data.preprocessing import preprocess_for_training
 from ludwig.features.feature_registries import input_type_registry
 from ludwig.features.feature_registries import output_type_registry
@@ -221,13 +222,17 @@ def full_train(
             logging.info('{}: {}'.format(key, pformat(value, indent=4)))
         logging.info('\n')
 
-    # preprocess
+    # preprocess, with horovod only once on the master
+    if use_horovod:
+        preprocess = preprocess_for_horovod_training
+    else:
+        preprocess = preprocess_for_training
     (
         training_set,
         validation_set,
         test_set,
         train_set_metadata
-    ) = preprocess_for_training(
+    ) = preprocess(
         model_definition,
         data_csv=data_csv,
         data_train_csv=data_train_csv,
@@ -15,21 +15,86 @@
 # limitations under the License.
 # ==============================================================================
 import math
+import queue
+import threading
+import time
 
 import numpy as np
 
-from ludwig.utils.data_utils import shuffle_dict_unison_inplace, shuffle_inplace
+from ludwig.utils.defaults import default_random_seed
+
+
+def get_permutation(size, random_state=np.random, block_size=None,
+                    buffer_size=None):
+    """Returns a random permutation of the indices of the rows of a dataset.
+    With block_size, contiguous blocks of rows are shuffled and then rows are
+    shuffled within buffers of buffer_size consecutive rows of the permutation
+    (one block by default), so that each batch is read from a few contiguous
+    ranges of rows.
+
+    :param size: number of rows
+    :param random_state: numpy RandomState
+    :param block_size: number of rows of each block, if None rows are
+           shuffled individually
+    :param buffer_size: number of rows rows are shuffled within
+    :return: array of row indices
+    """
+    if not block_size:
+        return random_state.permutation(size)
+    block_starts = random_state.permutation(np.arange(0, size, block_size))
+    permutation = (block_starts[:, None] + np.arange(block_size)).ravel()
+    permutation = permutation[permutation < size]
+    if buffer_size is None:
+        buffer_size = block_size
+    for start in range(0, size, buffer_size):
+        random_state.shuffle(permutation[start:start + buffer_size])
+    return permutation
+
+
+def trim_sequences(sequences, trim_side='right'):
+    """Trims the padding of a matrix of sequences padded with zeros to the
+    length of its longest sequence.
+
+    :param sequences: matrix of sequences
+    :param trim_side: side the padding is on, either 'right' or 'left'
+    :return: trimmed matrix of sequences
+    """
+    if len(sequences) == 0:
+        return sequences
+    max_length = max(np.count_nonzero(sequences, axis=1).max(), 1)
+    if trim_side == 'right':
+        return sequences[:, :max_length]
+    elif trim_side == 'left':
+        return sequences[:, -max_length:]
+    else:
+        raise ValueError('Invalid trim side:', trim_side)
+
+
+def trim_batch(batch, trim_fields):
+    """Trims the padding of the sequence fields of a batch in place.
+
+    :param batch: dictionary of the fields of a batch
+    :param trim_fields: dictionary from the fields to trim to the side
+           their padding is on
+    :return: the batch
+    """
+    for field, trim_side in trim_fields.items():
+        if field in batch:
+            batch[field] = trim_sequences(batch[field], trim_side)
+    return batch
 
 
 class Batcher(object):
     def __init__(self, dataset, batch_size=128, should_shuffle=True,
-                 ignore_last=False):
+                 ignore_last=False, shuffle_block_size=None,
+                 shuffle_buffer_size=None, trim_fields=None):
         self.should_shuffle = should_shuffle
+        self.shuffle_block_size = shuffle_block_size
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.trim_fields = trim_fields
 
         # store our dataset as well
         self.dataset = dataset
-        if should_shuffle:
-            shuffle_inplace(self.dataset.get_dataset())
 
         self.ignore_last = ignore_last
         self.batch_size = batch_size
@@ -37,21 +102,31 @@ class Batcher(object):
         self.steps_per_epoch = int(math.ceil(self.total_size / self.batch_size))
         self.index = 0
 
+        # batches are gathered from the dataset through a permutation
+        # of the row indices instead of shuffling the dataset itself
+        self.permutation = np.arange(self.total_size)
+        if should_shuffle:
+            self.shuffle()
+
+    def shuffle(self):
+        self.permutation = get_permutation(
+            self.total_size,
+            block_size=self.shuffle_block_size,
+            buffer_size=self.shuffle_buffer_size
+        )
+
     def next_batch(self):
         if self.last_batch():
-            if self.should_shuffle:
-                self.dataset = shuffle_dict_unison_inplace(self.dataset)
             self.reset()
 
         sub_batch = {}
         for features_name in self.dataset.features:
             sub_batch[features_name] = self.dataset.get(
                 features_name,
-                range(
-                    self.index,
-                    min(self.index + self.batch_size, self.total_size)
-                )
+                self.permutation[self.index:self.index + self.batch_size]
             )
+        if self.trim_fields:
+            trim_batch(sub_batch, self.trim_fields)
 
         self.index += self.batch_size
         return sub_batch
@@ -62,43 +137,91 @@ class Batcher(object):
                 self.index + self.batch_size >= self.total_size)
 
     def reset(self):
+        # every epoch reads the rows in a new order
         self.index = 0
+        if self.should_shuffle:
+            self.shuffle()
 
 
 class BucketedBatcher(object):
+    """Groups datapoints in buckets by the length of one or more sequence
+    fields and samples each batch from a single bucket, so that padding can
+    be trimmed to the longest datapoint of the batch.
+
+    :param bucketing_field: name of a field or list of names of fields.
+           With more than one field, datapoints are bucketed by the
+           combination of the buckets of each field
+    :param buckets: number of buckets of each field, built from the
+           quantiles of the lengths so that they contain the same number
+           of datapoints, when boundaries are not specified
+    :param should_trim: whether to trim the padding of the bucketing fields,
+           either a boolean or a dictionary by field
+    :param trim_side: side the padding is on, either 'right', 'left' or a
+           dictionary by field
+    :param boundaries: list of the maximum lengths of each bucket but the
+           last one, or dictionary of lists by field
+    :param trim_fields: dictionary from other fields to trim to the side
+           their padding is on
+    """
+
     def __init__(self, dataset, bucketing_field, batch_size=128, buckets=10,
                  should_shuffle=True, ignore_last=False,
-                 should_trim=False, trim_side='right'):
+                 should_trim=False, trim_side='right', boundaries=None,
+                 trim_fields=None):
         self.should_shuffle = should_shuffle
-        self.bucketing_field = bucketing_field
+        if isinstance(bucketing_field, str):
+            bucketing_field = [bucketing_field]
+        self.bucketing_fields = bucketing_field
+        if not isinstance(should_trim, dict):
+            should_trim = {field: should_trim for field in bucketing_field}
         self.should_trim = should_trim
+        if not isinstance(trim_side, dict):
+            trim_side = {field: trim_side for field in bucketing_field}
         self.trim_side = trim_side
+        self.trim_fields = dict(trim_fields or {})
+        for field in bucketing_field:
+            if should_trim[field]:
+                self.trim_fields[field] = trim_side[field]
 
         # store our dataset as well
         self.dataset = dataset
 
-        field = dataset.get_dataset()[bucketing_field]
-        field_lengths = np.apply_along_axis(lambda x: np.sign(x).sum(), 1,
-                                            field)
-        sorted_idcs = np.argsort(field_lengths)
-        self.buckets_idcs = []
-        datapoints_per_bucket = len(field) // buckets
-        for b in range(buckets):
-            start = datapoints_per_bucket * b
-            end = datapoints_per_bucket * (b + 1) if b < buckets - 1 else len(
-                sorted_idcs)
-            self.buckets_idcs.append(sorted_idcs[start:end])
+        bucket_ids = np.zeros(dataset.size, dtype=np.int64)
+        for field in self.bucketing_fields:
+            # lengths are precomputed during preprocessing
+            field_lengths = dataset.get_lengths(field)
+            if isinstance(boundaries, dict):
+                field_boundaries = boundaries.get(field)
+            else:
+                field_boundaries = boundaries
+            if field_boundaries is None:
+                field_boundaries = np.unique(np.percentile(
+                    field_lengths,
+                    np.linspace(0, 100, buckets + 1)[1:-1],
+                    interpolation='lower'
+                ))
+            field_buckets = np.digitize(
+                field_lengths,
+                np.sort(field_boundaries),
+                right=True
+            )
+            bucket_ids = (bucket_ids * (len(field_boundaries) + 1) +
+                          field_buckets)
+        self.buckets_idcs = [
+            np.flatnonzero(bucket_ids == bucket_id)
+            for bucket_id in np.unique(bucket_ids)
+        ]
 
         if should_shuffle:
             self.shuffle(self.buckets_idcs)
 
         self.ignore_last = ignore_last
         self.batch_size = batch_size
-        self.total_size = min(map(len, dataset.get_dataset().values()))
+        self.total_size = dataset.size
         self.bucket_sizes = np.array([x for x in map(len, self.buckets_idcs)])
         self.steps_per_epoch = int(
             np.asscalar(np.sum(np.ceil(self.bucket_sizes / self.batch_size))))
-        self.indices = np.array([0] * buckets)
+        self.indices = np.array([0] * len(self.buckets_idcs))
 
     def shuffle(self, buckets_idcs):
         for i in range(len(buckets_idcs)):
@@ -122,19 +245,10 @@ class BucketedBatcher(object):
                         self.indices[i]:self.indices[i] + self.batch_size]
 
         sub_batch = {}
-        for key in self.dataset.get_dataset():
-            if key == self.bucketing_field and self.should_trim:
-                selected_samples = self.dataset.get(key, selected_idcs)
-                max_length = np.sign(selected_samples).sum(axis=1).max()
-                if self.trim_side == 'right':
-                    sub_batch[key] = selected_samples[:, :max_length]
-                elif self.trim_side == 'left':
-                    sub_batch[key] = selected_samples[:, -max_length:]
-                else:
-                    raise ValueError('Invalid trim side:', self.trim_side)
-
-            else:
-                sub_batch[key] = self.dataset.get(key, selected_idcs)
+        for key in self.dataset.features:
+            sub_batch[key] = self.dataset.get(key, selected_idcs)
+        if self.trim_fields:
+            trim_batch(sub_batch, self.trim_fields)
 
         self.indices[i] += self.batch_size
         return sub_batch
@@ -150,57 +264,238 @@ class BucketedBatcher(object):
         self.indices = np.array([0] * len(self.buckets_idcs))
 
 
+class DistributedSampler(object):
+    """Samples the indices of the rows a worker reads in each epoch of
+    distributed training. All workers derive the same permutation of the
+    rows from the random seed and the epoch, without shuffling the data, and
+    take their own shard of it.
+
+    With equal_shards, every shard gets the same number of rows, so that all
+    workers run the same number of steps and none of them waits for the
+    others in the gradient allreduce: the rows that do not divide evenly
+    among the shards are either dropped, with drop_remainder, or repeated
+    from the beginning of the permutation. Otherwise shards are contiguous
+    ranges of rows and the last one also gets the remainder, so that no row
+    is read twice, which is what evaluation needs.
+
+    :param size: number of rows of the dataset
+    :param num_shards: number of shards, usually the number of workers
+    :param shard_index: index of the shard of this worker
+    :param random_seed: seed shared by all workers
+    :param should_shuffle: whether to permute the rows every epoch
+    :param equal_shards: whether all shards have the same size
+    :param drop_remainder: whether to drop rows instead of repeating them
+           to make shards of equal size
+    :param interleaved: whether shards take every num_shards-th row of the
+           permutation instead of a contiguous range of it
+    :param block_size: shuffle contiguous blocks of rows, see get_permutation
+    :param buffer_size: see get_permutation
+    """
+
+    def __init__(self, size, num_shards=1, shard_index=0,
+                 random_seed=default_random_seed, should_shuffle=True,
+                 equal_shards=True, drop_remainder=False, interleaved=True,
+                 block_size=None, buffer_size=None):
+        self.size = size
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.random_seed = random_seed
+        self.should_shuffle = should_shuffle
+        self.equal_shards = equal_shards
+        self.drop_remainder = drop_remainder
+        self.interleaved = interleaved
+        self.block_size = block_size
+        self.buffer_size = buffer_size
+
+    def get_permutation(self, epoch):
+        if not self.should_shuffle:
+            return np.arange(self.size)
+        return get_permutation(
+            self.size,
+            random_state=np.random.RandomState([self.random_seed, epoch]),
+            block_size=self.block_size,
+            buffer_size=self.buffer_size
+        )
+
+    def get_indices(self, epoch=0):
+        """Returns the indices of the rows of the shard for an epoch."""
+        permutation = self.get_permutation(epoch)
+        if not self.equal_shards:
+            shard_size = self.size // self.num_shards
+            start = shard_size * self.shard_index
+            if self.shard_index == self.num_shards - 1:
+                return permutation[start:]
+            return permutation[start:start + shard_size]
+
+        if self.drop_remainder:
+            shard_size = self.size // self.num_shards
+            permutation = permutation[:shard_size * self.num_shards]
+        else:
+            shard_size = -(-self.size // self.num_shards)
+            permutation = np.resize(permutation, shard_size * self.num_shards)
+        if self.interleaved:
+            return permutation[self.shard_index::self.num_shards]
+        start = shard_size * self.shard_index
+        return permutation[start:start + shard_size]
+
+    def __len__(self):
+        if not self.equal_shards:
+            shard_size = self.size // self.num_shards
+            if self.shard_index == self.num_shards - 1:
+                return self.size - shard_size * self.shard_index
+            return shard_size
+        if self.drop_remainder:
+            return self.size // self.num_shards
+        return -(-self.size // self.num_shards)
+
+
 class DistributedBatcher(object):
+    """Batches the shard of the rows of a worker in distributed training.
+    When training, all the workers read the same number of rows each epoch,
+    from a permutation that depends only on the random seed and the epoch.
+    Datasets that were loaded with the partition of the rows of this worker
+    only are read whole, as the rows were already dealt to the workers.
+    """
+
     def __init__(self, dataset, partition_number, horovod, batch_size=128,
-                 should_shuffle=True, ignore_last=False):
+                 should_shuffle=True, ignore_last=False,
+                 shuffle_block_size=None, shuffle_buffer_size=None,
+                 trim_fields=None, random_seed=default_random_seed):
         self.should_shuffle = should_shuffle
+        self.trim_fields = trim_fields
 
         # store our dataset as well
-        partition_size = dataset.size // horovod.size()
-        if partition_number == horovod.size() - 1:
-            self.partition = (partition_size * partition_number, dataset.size)
-        else:
-            self.partition = (partition_size * partition_number,
-                              partition_size * (partition_number + 1))
         self.dataset = dataset
-        if should_shuffle:
-            shuffle_inplace(self.dataset.get_dataset())
+        if dataset.partitioned:
+            num_shards, shard_index = 1, 0
+        else:
+            num_shards, shard_index = horovod.size(), partition_number
+        # evaluation reads every row exactly once,
+        # while training needs the same number of steps on every worker
+        self.sampler = DistributedSampler(
+            dataset.size,
+            num_shards=num_shards,
+            shard_index=shard_index,
+            random_seed=random_seed,
+            should_shuffle=should_shuffle,
+            equal_shards=should_shuffle,
+            drop_remainder=ignore_last,
+            block_size=shuffle_block_size,
+            buffer_size=shuffle_buffer_size
+        )
 
         self.ignore_last = ignore_last
         self.batch_size = batch_size
-        self.total_size = self.partition[1] - self.partition[0]
+        self.total_size = len(self.sampler)
         self.steps_per_epoch = int(math.ceil(self.total_size / self.batch_size))
-        self.index = self.partition[0]
-        self.max_index = self.partition[1]
+        self.index = 0
         self.epoch = 0
+        self.indices = self.sampler.get_indices(self.epoch)
 
     def next_batch(self):
         if self.last_batch():
-            if self.should_shuffle:
-                self.dataset = shuffle_dict_unison_inplace(
-                    self.dataset,
-                    np.random.RandomState(self.epoch)
-                )
             self.reset()
-            self.epoch += 1
 
         sub_batch = {}
         for features_name in self.dataset.features:
             sub_batch[features_name] = self.dataset.get(
                 features_name,
-                range(
-                    self.index,
-                    min(self.index + self.batch_size, self.max_index)
-                )
+                self.indices[self.index:self.index + self.batch_size]
             )
+        if self.trim_fields:
+            trim_batch(sub_batch, self.trim_fields)
 
         self.index += self.batch_size
         return sub_batch
 
     def last_batch(self):
-        return self.index >= self.max_index or (
+        return self.index >= self.total_size or (
                 self.ignore_last and
-                self.index + self.batch_size >= self.max_index)
+                self.index + self.batch_size >= self.total_size)
+
+    def reset(self):
+        # every reset starts a new epoch, with its own permutation
+        self.index = 0
+        self.epoch += 1
+        self.indices = self.sampler.get_indices(self.epoch)
+
+
+class PrefetchBatcher(object):
+    """Wraps a batcher and builds the next batches of the epoch in a
+    background thread, keeping up to `depth` of them in a bounded queue, so
+    that gathering batches overlaps with the computation on the previous ones.
+    """
+
+    def __init__(self, batcher, depth=2):
+        self.batcher = batcher
+        self.depth = depth
+        self.queue = None
+        self.thread = None
+        self.should_stop = False
+        self.next = None
+        self.wait_time = 0.0
+
+    @property
+    def batch_size(self):
+        return self.batcher.batch_size
+
+    @batch_size.setter
+    def batch_size(self, batch_size):
+        self.batcher.batch_size = batch_size
+
+    @property
+    def steps_per_epoch(self):
+        return self.batcher.steps_per_epoch
+
+    def produce(self):
+        try:
+            while not self.batcher.last_batch() and not self.should_stop:
+                self.queue.put((self.batcher.next_batch(), None))
+            self.queue.put((None, None))
+        except Exception as e:
+            self.queue.put((None, e))
+
+    def start(self):
+        self.queue = queue.Queue(maxsize=self.depth)
+        self.should_stop = False
+        self.thread = threading.Thread(target=self.produce)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def peek(self):
+        if self.thread is None:
+            self.start()
+        if self.next is None:
+            start_time = time.time()
+            self.next = self.queue.get()
+            self.wait_time += time.time() - start_time
+        batch, error = self.next
+        if error is not None:
+            raise error
+        return batch
+
+    def next_batch(self):
+        batch = self.peek()
+        self.next = None
+        return batch
+
+    def last_batch(self):
+        return self.peek() is None
+
+    def stop(self):
+        if self.thread is not None:
+            self.should_stop = True
+            while self.thread.is_alive():
+                try:
+                    self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.thread.join()
+        self.thread = None
+        self.queue = None
+        self.next = None
 
     def reset(self):
-        self.index = self.partition[0]
+        self.stop()
+        self.batcher.reset()
+        self.wait_time = 0.0
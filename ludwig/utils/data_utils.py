@@ -26,6 +26,7 @@ import h5py
 import numpy as np
 import pandas as pd
 from pandas.errors import ParserError
+from scipy import sparse
 
 
 def load_csv(data_fp):
@@ -52,6 +53,30 @@ def read_csv(data_fp, header=0):
     return df
 
 
+def read_csv_chunks(data_fp, chunk_size, header=0):
+    """
+    Helper generator to read a csv file in chunks of rows, so that files that
+    do not fit in memory can be processed. Each chunk has its index reset so
+    that rows are indexed from 0 like in a dataframe returned by read_csv
+    :param data_fp: path to the csv file
+    :param chunk_size: number of rows in each chunk
+    :return: Pandas dataframes with at most chunk_size rows each
+    """
+    try:
+        reader = pd.read_csv(data_fp, header=header, chunksize=chunk_size)
+        chunk = next(reader, None)
+    except ParserError:
+        logging.warning('Failed to parse the CSV with pandas default way,'
+                        ' trying \\ as escape character.')
+        reader = pd.read_csv(data_fp, header=header, chunksize=chunk_size,
+                             escapechar='\\')
+        chunk = next(reader, None)
+
+    while chunk is not None:
+        yield chunk.reset_index(drop=True)
+        chunk = next(reader, None)
+
+
 def save_csv(data_fp, data):
     with open(data_fp, 'w', encoding='utf-8') as csv_file:
         writer = csv.writer(csv_file)
@@ -84,20 +109,177 @@ def load_hdf5(data_fp):
     data = {}
     with h5py.File(data_fp, 'r') as h5_file:
         for key in h5_file.keys():
-            data[key] = h5_file[key].value
+            data[key] = load_hdf5_value(h5_file[key])
     return data
 
 
+def load_hdf5_value(h5_object):
+    """
+    Reads a dataset of an hdf5 file in memory. Sparse matrices are stored as
+    groups containing the data, indices and indptr arrays of their CSR
+    representation and are returned as scipy CSR matrices.
+    :param h5_object: hdf5 dataset or group
+    :return: numpy array or scipy CSR matrix
+    """
+    if isinstance(h5_object, h5py.Group):
+        return sparse.csr_matrix(
+            (
+                h5_object['data'].value,
+                h5_object['indices'].value,
+                h5_object['indptr'].value
+            ),
+            shape=tuple(h5_object.attrs['shape'])
+        )
+    return h5_object.value
+
+
+def save_sparse_hdf5(h5_file, key, value, compression=None,
+                     compression_opts=None):
+    value = value.tocsr()
+    group = h5_file.create_group(key)
+    group.attrs['shape'] = value.shape
+    for array_name in ('data', 'indices', 'indptr'):
+        array = getattr(value, array_name)
+        group.create_dataset(
+            array_name,
+            data=array,
+            maxshape=(None,),
+            chunks=True,
+            compression=compression,
+            compression_opts=compression_opts
+        )
+
+
+def append_sparse_hdf5(group, value):
+    value = value.tocsr()
+    num_values = group['indptr'][-1]
+    for array_name, array in (
+            ('data', value.data),
+            ('indices', value.indices),
+            ('indptr', value.indptr[1:] + num_values)
+    ):
+        dataset = group[array_name]
+        offset = dataset.shape[0]
+        dataset.resize(offset + len(array), axis=0)
+        dataset[offset:] = array
+    group.attrs['shape'] = (
+        group.attrs['shape'][0] + value.shape[0],
+        group.attrs['shape'][1]
+    )
+
+
+# handles of hdf5 files opened for reading, by process and path
+hdf5_files = {}
+
+# chunk cache of the handles, large enough to hold
+# a few chunks of image datasets instead of the 1MB default
+hdf5_chunk_cache_size = 64 * 1024 * 1024
+hdf5_chunk_cache_slots = 10007
+
+# chunks of a few megabytes keep the overhead of
+# reading a chunk low without wasting the chunk cache
+hdf5_max_chunk_size = 4 * 1024 * 1024
+
+
+def get_hdf5_file(data_fp):
+    """
+    Returns a read only handle on an hdf5 file that is opened once per
+    process and then reused. The handle is reopened if the file is replaced
+    or modified after it was opened.
+    :param data_fp: path to the hdf5 file
+    :return: the h5py File
+    """
+    key = (os.getpid(), os.path.abspath(data_fp))
+    stat = os.stat(data_fp)
+    version = (stat.st_ino, stat.st_mtime)
+    if key in hdf5_files:
+        h5_file, file_version = hdf5_files[key]
+        if file_version == version and h5_file.id.valid:
+            return h5_file
+        close_hdf5_file(data_fp)
+    h5_file = h5py.File(
+        data_fp,
+        'r',
+        rdcc_nbytes=hdf5_chunk_cache_size,
+        rdcc_nslots=hdf5_chunk_cache_slots
+    )
+    hdf5_files[key] = (h5_file, version)
+    return h5_file
+
+
+def close_hdf5_file(data_fp):
+    """
+    Closes the handle on an hdf5 file opened with get_hdf5_file, if any,
+    so that the file can be written.
+    :param data_fp: path to the hdf5 file
+    """
+    key = (os.getpid(), os.path.abspath(data_fp))
+    if key in hdf5_files:
+        h5_file, _ = hdf5_files.pop(key)
+        if h5_file.id.valid:
+            h5_file.close()
+
+
+def get_hdf5_chunks(value, chunk_rows=None):
+    """
+    Returns the chunk shape of a dataset resizable along the first dimension,
+    made of chunk_rows rows, so that a batch of contiguous rows is read
+    from as few chunks as possible, but of at most hdf5_max_chunk_size bytes.
+    :param value: array the dataset is created with
+    :param chunk_rows: number of rows of each chunk, if None the shape
+           is guessed by h5py
+    :return: the chunk shape or True
+    """
+    row_shape = value.shape[1:]
+    if chunk_rows is None or not all(row_shape):
+        return True
+    row_size = value.dtype.itemsize * int(np.prod(row_shape))
+    chunk_rows = max(1, min(chunk_rows, hdf5_max_chunk_size // row_size))
+    return (chunk_rows,) + row_shape
+
+
 # def save_hdf5(data_fp: str, data: Dict[str, object]):
-def save_hdf5(data_fp, data, metadata=None):
+def save_hdf5(data_fp, data, metadata=None, compression=None,
+              compression_opts=None, chunk_rows=None, resizable=False):
+    """
+    Writes the arrays in data to an hdf5 file. Datasets are contiguous, so
+    that they can be memory mapped when read, unless they are compressed or
+    resizable, which requires them to be chunked.
+    :param data_fp: path to the hdf5 file
+    :param data: dictionary of arrays with the same number of rows
+    :param metadata: train set metadata, used for the in_memory attribute
+    :param compression: compression filter of the datasets, gzip or lzf
+    :param compression_opts: compression level for gzip
+    :param chunk_rows: number of rows of each chunk of chunked datasets
+    :param resizable: whether datasets are resizable along the first
+           dimension, so that rows can be appended with append_hdf5
+    """
     if metadata is None:
         metadata = {}
+    close_hdf5_file(data_fp)
     mode = 'w'
     if os.path.isfile(data_fp):
         mode = 'r+'
     with h5py.File(data_fp, mode) as h5_file:
         for key, value in data.items():
-            dataset = h5_file.create_dataset(key, data=value)
+            if sparse.issparse(value):
+                save_sparse_hdf5(h5_file, key, value, compression,
+                                 compression_opts)
+                continue
+            value = np.asarray(value)
+            if resizable or compression is not None:
+                dataset = h5_file.create_dataset(
+                    key,
+                    data=value,
+                    maxshape=(
+                        (None,) + value.shape[1:] if resizable else None
+                    ),
+                    chunks=get_hdf5_chunks(value, chunk_rows),
+                    compression=compression,
+                    compression_opts=compression_opts
+                )
+            else:
+                dataset = h5_file.create_dataset(key, data=value)
             if key in metadata:
                 if 'in_memory' in metadata[key]:
                     if metadata[key]['in_memory']:
@@ -106,6 +288,105 @@ def save_hdf5(data_fp, data, metadata=None):
                         dataset.attrs['in_memory'] = False
 
 
+def append_hdf5(data_fp, data, metadata=None, compression=None,
+                compression_opts=None, chunk_rows=None):
+    """
+    Appends the arrays in data to the datasets with the same name in the
+    hdf5 file, creating them as resizable along the first dimension if they
+    do not exist yet, so that a dataset can be written a chunk at a time
+    :param data_fp: path to the hdf5 file
+    :param data: dictionary of arrays with the same number of rows
+    :param metadata: train set metadata, used for the in_memory attribute
+    :param compression: compression filter of the datasets that are created,
+           gzip or lzf
+    :param compression_opts: compression level for gzip
+    :param chunk_rows: number of rows of each chunk of the datasets
+           that are created
+    """
+    if metadata is None:
+        metadata = {}
+    close_hdf5_file(data_fp)
+    with h5py.File(data_fp, 'a') as h5_file:
+        for key, value in data.items():
+            if sparse.issparse(value):
+                if key in h5_file:
+                    append_sparse_hdf5(h5_file[key], value)
+                else:
+                    save_sparse_hdf5(h5_file, key, value, compression,
+                                     compression_opts)
+                continue
+            value = np.asarray(value)
+            if key in h5_file:
+                dataset = h5_file[key]
+                offset = dataset.shape[0]
+                dataset.resize(offset + value.shape[0], axis=0)
+                dataset[offset:] = value
+            else:
+                dataset = h5_file.create_dataset(
+                    key,
+                    data=value,
+                    maxshape=(None,) + value.shape[1:],
+                    chunks=get_hdf5_chunks(value, chunk_rows),
+                    compression=compression,
+                    compression_opts=compression_opts
+                )
+                if key in metadata:
+                    if 'in_memory' in metadata[key]:
+                        if metadata[key]['in_memory']:
+                            dataset.attrs['in_memory'] = True
+                        else:
+                            dataset.attrs['in_memory'] = False
+
+
+def make_hdf5_resizable(data_fp, chunk_rows=None):
+    """
+    Rewrites an hdf5 file whose datasets are not all resizable along the
+    first dimension, copying them into resizable chunked datasets, so that
+    rows can be appended with append_hdf5. Chunked datasets can't be memory
+    mapped and are read through the hdf5 library, which is why files are
+    only made resizable when rows are appended to them.
+    :param data_fp: path to the hdf5 file
+    :param chunk_rows: number of rows of each chunk of the datasets
+    :return: whether the file was rewritten
+    """
+    close_hdf5_file(data_fp)
+    with h5py.File(data_fp, 'r') as h5_file:
+        if all(not isinstance(value, h5py.Dataset) or
+               len(value.shape) == 0 or value.maxshape[0] is None
+               for value in h5_file.values()):
+            return False
+
+    resizable_fp = data_fp + '.resizable'
+    with h5py.File(data_fp, 'r') as h5_file, \
+            h5py.File(resizable_fp, 'w') as resizable_file:
+        for key, value in h5_file.attrs.items():
+            resizable_file.attrs[key] = value
+        for key, value in h5_file.items():
+            if (not isinstance(value, h5py.Dataset) or
+                    len(value.shape) == 0 or value.maxshape[0] is None):
+                h5_file.copy(value, resizable_file, name=key)
+                continue
+            dataset = resizable_file.create_dataset(
+                key,
+                shape=value.shape,
+                dtype=value.dtype,
+                maxshape=(None,) + value.shape[1:],
+                chunks=get_hdf5_chunks(value, chunk_rows),
+                compression=value.compression,
+                compression_opts=value.compression_opts
+            )
+            # copied a few chunks at a time, not to load it in memory
+            block_rows = dataset.chunks[0] * 16
+            for start in range(0, value.shape[0], block_rows):
+                dataset[start:start + block_rows] = (
+                    value[start:start + block_rows]
+                )
+            for attr_key, attr_value in value.attrs.items():
+                dataset.attrs[attr_key] = attr_value
+    os.replace(resizable_fp, data_fp)
+    return True
+
+
 def load_object(object_fp):
     with open(object_fp, 'rb') as f:
         return pickle.load(f)
@@ -193,11 +474,13 @@ def split_data(split, data):
 
 def shuffle_unison_inplace(list_of_lists, random_state=None):
     if list_of_lists:
-        assert all(len(l) == len(list_of_lists[0]) for l in list_of_lists)
+        # shape and not len, as len of sparse matrices is ambiguous
+        num_rows = list_of_lists[0].shape[0]
+        assert all(l.shape[0] == num_rows for l in list_of_lists)
         if random_state is not None:
-            random_state.permutation(len(list_of_lists[0]))
+            p = random_state.permutation(num_rows)
         else:
-            p = np.random.permutation(len(list_of_lists[0]))
+            p = np.random.permutation(num_rows)
         return [l[p] for l in list_of_lists]
     return None
 
@@ -246,7 +529,7 @@ def split_dataset(dataset, split, value_to_split=0):
     splitted_dataset = {}
     for key in dataset:
         splitted_dataset[key] = dataset[key][split == value_to_split]
-        if len(splitted_dataset[key]) == 0:
+        if splitted_dataset[key].shape[0] == 0:
             return None
     return splitted_dataset
 
@@ -265,11 +548,15 @@ def text_feature_data_field(text_feature):
     return text_feature['name'] + '_' + text_feature['level']
 
 
+def sequence_lengths_field(field):
+    return field + '_lengths'
+
+
 def load_from_file(file_name, field=None, dtype=int):
     if file_name.endswith('.hdf5') and field is not None:
         hdf5_data = h5py.File(file_name, 'r')
         split = hdf5_data['split'].value
-        column = hdf5_data[field].value
+        column = load_hdf5_value(hdf5_data[field])
         hdf5_data.close()
         array = column[split == 2]  # ground truth
     elif file_name.endswith('.npy'):
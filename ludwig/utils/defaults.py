@@ -27,11 +27,31 @@ default_random_seed = 42
 default_preprocessing_force_split = False
 default_preprocessing_split_probabilities = (0.7, 0.1, 0.2)
 default_preprocessing_stratify = None
+default_preprocessing_chunk_size = None
+default_preprocessing_num_processes = 1
+default_preprocessing_in_memory = True
+default_preprocessing_cache_dir = None
+default_preprocessing_cache_content_hash = False
+default_preprocessing_cache_max_size = None
+default_preprocessing_cache_max_age = None
+default_preprocessing_hdf5_compression = None
+default_preprocessing_hdf5_compression_level = None
+default_preprocessing_hdf5_chunk_rows = None
 
 default_preprocessing_parameters = {
     'force_split': default_preprocessing_force_split,
     'split_probabilities': default_preprocessing_split_probabilities,
-    'stratify': default_preprocessing_stratify
+    'stratify': default_preprocessing_stratify,
+    'chunk_size': default_preprocessing_chunk_size,
+    'num_processes': default_preprocessing_num_processes,
+    'in_memory': default_preprocessing_in_memory,
+    'cache_dir': default_preprocessing_cache_dir,
+    'cache_content_hash': default_preprocessing_cache_content_hash,
+    'cache_max_size': default_preprocessing_cache_max_size,
+    'cache_max_age': default_preprocessing_cache_max_age,
+    'hdf5_compression': default_preprocessing_hdf5_compression,
+    'hdf5_compression_level': default_preprocessing_hdf5_compression_level,
+    'hdf5_chunk_rows': default_preprocessing_hdf5_chunk_rows
 }
 default_preprocessing_parameters.update({
     name: base_type.preprocessing_defaults for name, base_type in
@@ -64,7 +84,15 @@ default_training_params = {
     'validation_field': 'combined',
     'validation_measure': LOSS,
     'bucketing_field': None,
-    'learning_rate_warmup_epochs': 5
+    'bucketing_num_buckets': 10,
+    'bucketing_boundaries': None,
+    'dynamic_padding': False,
+    'learning_rate_warmup_epochs': 5,
+    'prefetch_batches': 2,
+    'shuffle_block_size': None,
+    'shuffle_buffer_size': None,
+    'input_pipeline': 'feed_dict',
+    'input_pipeline_parallel_calls': 4
 }
 
 default_optimizer_params_registry = {
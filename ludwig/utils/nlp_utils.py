@@ -81,6 +81,28 @@ def process_text(
             ]
 
 
+def process_texts(
+        texts,
+        nlp_pipeline,
+        batch_size=1000,
+        return_lemma=False,
+        filter_numbers=False,
+        filter_punctuation=False,
+        filter_short_tokens=False,
+        filter_stopwords=False
+):
+    return [
+        [token.lemma_ if return_lemma else token.text
+         for token in doc if pass_filters(token,
+                                          filter_numbers,
+                                          filter_punctuation,
+                                          filter_short_tokens,
+                                          filter_stopwords)
+         ]
+        for doc in nlp_pipeline.tokenizer.pipe(texts, batch_size=batch_size)
+    ]
+
+
 # class Lemmatizer(object):
 #     def __init__(self):
 #         self.pipeline = load_nlp_pipeline()
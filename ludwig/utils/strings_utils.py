@@ -14,16 +14,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ==============================================================================
+import hashlib
 import json
 import logging
 import re
 import unicodedata
 from collections import Counter
+from collections import OrderedDict
+from functools import partial
+from itertools import chain
+from itertools import repeat
+from multiprocessing import Pool
+from multiprocessing import current_process
 
 import numpy as np
+import pandas as pd
 
+from ludwig.utils.math_utils import int_type
 from ludwig.utils.misc import get_from_registry
-from ludwig.utils.nlp_utils import load_nlp_pipeline, process_text
+from ludwig.utils.nlp_utils import load_nlp_pipeline
+from ludwig.utils.nlp_utils import process_text
+from ludwig.utils.nlp_utils import process_texts
 
 UNKNOWN_SYMBOL = '<UNK>'
 PADDING_SYMBOL = '<PAD>'
@@ -33,6 +44,11 @@ SPLIT_PUNCTUATION_REGEX = re.compile(r'\w+|[^\w\s]')
 COMMA_REGEX = re.compile(r'\s*,\s*')
 UNDERSCORE_REGEX = re.compile(r'\s*_\s*')
 
+# tokenized columns of the current preprocessing run, so that the metadata
+# and the data of a feature are computed tokenizing each column only once
+tokenization_cache = OrderedDict()
+tokenization_cache_size = 8
+
 
 def make_safe_filename(s):
     def safe_char(c):
@@ -72,26 +88,112 @@ def match_replace(string_to_match, list_regex):
     return string_to_match, matched
 
 
+def get_column_hash(data):
+    row_hashes = pd.util.hash_pandas_object(pd.Series(data), index=False)
+    return hashlib.md5(row_hashes.values.tobytes()).hexdigest()
+
+
+def clear_tokenization_cache():
+    tokenization_cache.clear()
+
+
+def tokenize(data, format='space', lowercase=True,
+             batch_size=1000, num_processes=1, use_cache=True):
+    """Splits each string in data into a list of units using the format
+    function. English formats go through the spaCy tokenizer in batches of
+    batch_size texts, distributed across num_processes processes.
+    The last tokenization_cache_size tokenized columns are cached by content,
+    format and lowercasing, the returned lists must not be modified.
+    Hashing the column costs more than tokenizing a few strings, so small
+    batches that are tokenized once should not use the cache.
+    """
+    if not use_cache:
+        return _tokenize(data, format, lowercase, batch_size, num_processes)
+
+    key = (get_column_hash(data), len(data), format, lowercase)
+    if key in tokenization_cache:
+        tokenization_cache.move_to_end(key)
+        return tokenization_cache[key]
+
+    tokenized = _tokenize(data, format, lowercase, batch_size, num_processes)
+
+    tokenization_cache[key] = tokenized
+    while len(tokenization_cache) > tokenization_cache_size:
+        tokenization_cache.popitem(last=False)
+    return tokenized
+
+
+def _tokenize(data, format, lowercase, batch_size, num_processes):
+    if lowercase:
+        data = [line.lower() for line in data]
+
+    if format not in english_format_parameters:
+        format_function = get_from_registry(
+            format,
+            format_registry
+        )
+        return [format_function(line) for line in data]
+
+    tokenize_batch = partial(
+        english_tokenize_batch,
+        format=format,
+        batch_size=batch_size
+    )
+    # pool workers are daemonic and cannot start pools of their own
+    if (num_processes > 1 and len(data) > batch_size and
+            not current_process().daemon):
+        batches = [data[i:i + batch_size]
+                   for i in range(0, len(data), batch_size)]
+        with Pool(num_processes) as pool:
+            return list(chain.from_iterable(pool.map(tokenize_batch, batches)))
+    return tokenize_batch(data)
+
+
+def get_unit_counts(data, format='space', lowercase=True,
+                    batch_size=1000, num_processes=1):
+    max_line_length = 0
+    unit_counts = Counter()
+
+    for processed_line in tokenize(data, format, lowercase=lowercase,
+                                   batch_size=batch_size,
+                                   num_processes=num_processes):
+        unit_counts.update(processed_line)
+        max_line_length = max(max_line_length, len(processed_line))
+
+    return unit_counts, max_line_length
+
+
 def create_vocabulary(data, format='space', custom_vocabulary=(),
                       add_unknown=True, add_padding=True,
                       lowercase=True,
                       num_most_frequent=None):
-    max_line_length = 0
-    unit_counts = Counter()
-
     if format == 'custom':
-        vocab = sorted(list(set(custom_vocabulary)))
+        unit_counts, max_line_length = Counter(), 0
     else:
-        format_function = get_from_registry(
+        unit_counts, max_line_length = get_unit_counts(
+            data,
             format,
-            format_registry
+            lowercase=lowercase
         )
-        for line in data:
-            processed_line = format_function(
-                line.lower() if lowercase else line)
-            unit_counts.update(processed_line)
-            max_line_length = max(max_line_length, len(processed_line))
 
+    return create_vocabulary_from_counts(
+        unit_counts,
+        max_line_length,
+        format=format,
+        custom_vocabulary=custom_vocabulary,
+        add_unknown=add_unknown,
+        add_padding=add_padding,
+        num_most_frequent=num_most_frequent
+    )
+
+
+def create_vocabulary_from_counts(unit_counts, max_line_length,
+                                  format='space', custom_vocabulary=(),
+                                  add_unknown=True, add_padding=True,
+                                  num_most_frequent=None):
+    if format == 'custom':
+        vocab = sorted(list(set(custom_vocabulary)))
+    else:
         vocab = [unit for unit, count in
                  unit_counts.most_common(num_most_frequent)]
 
@@ -112,10 +214,7 @@ def get_sequence_vector(sequence, format, unit_to_id, lowercase=True):
         format,
         format_registry
     )
-    format_dtype = get_from_registry(
-        format,
-        format_dtype_registry
-    )
+    format_dtype = int_type(len(unit_to_id))
     return _get_sequence_vector(sequence, format_function, format_dtype,
                                 unit_to_id, lowercase=lowercase)
 
@@ -123,37 +222,33 @@ def get_sequence_vector(sequence, format, unit_to_id, lowercase=True):
 def _get_sequence_vector(sequence, format_function, format_dtype, unit_to_id,
                          lowercase=True):
     unit_sequence = format_function(sequence.lower() if lowercase else sequence)
-    unit_indices_vector = np.empty(len(unit_sequence), dtype=format_dtype)
-    for i in range(len(unit_sequence)):
-        curr_unit = unit_sequence[i]
-        if curr_unit in unit_to_id:
-            unit_indices_vector[i] = unit_to_id[curr_unit]
-        else:
-            unit_indices_vector[i] = unit_to_id[UNKNOWN_SYMBOL]
-    return unit_indices_vector
+    return _get_units_vector(unit_sequence, format_dtype, unit_to_id)
+
+
+def _get_units_vector(unit_sequence, format_dtype, unit_to_id):
+    return units_to_ids(
+        unit_sequence,
+        unit_to_id,
+        count=len(unit_sequence)
+    ).astype(format_dtype)
 
 
 def build_sequence_matrix(sequences, inverse_vocabulary, format, length_limit,
                           padding_symbol, padding='right',
-                          lowercase=True):
-    format_function = get_from_registry(
-        format,
-        format_registry
+                          lowercase=True, batch_size=1000, num_processes=1,
+                          use_cache=True):
+    # the smallest integer type that can hold all the ids of the vocabulary
+    format_dtype = int_type(len(inverse_vocabulary))
+    unit_sequences = tokenize(sequences, format, lowercase=lowercase,
+                              batch_size=batch_size,
+                              num_processes=num_processes,
+                              use_cache=use_cache)
+    lengths = np.fromiter(
+        (len(unit_sequence) for unit_sequence in unit_sequences),
+        dtype=np.int64,
+        count=len(unit_sequences)
     )
-    format_dtype = get_from_registry(
-        format,
-        format_dtype_registry
-    )
-    max_length = 0
-    unit_vectors = []
-    for sequence in sequences:
-        unit_indices_vector = _get_sequence_vector(sequence, format_function,
-                                                   format_dtype,
-                                                   inverse_vocabulary,
-                                                   lowercase=lowercase)
-        unit_vectors.append(unit_indices_vector)
-        if len(unit_indices_vector) > max_length:
-            max_length = len(unit_indices_vector)
+    max_length = lengths.max() if len(lengths) > 0 else 0
 
     if max_length < length_limit:
         logging.debug('max length of {0}: {1} < limit: {2}'.format(
@@ -163,15 +258,141 @@ def build_sequence_matrix(sequences, inverse_vocabulary, format, length_limit,
     sequence_matrix = np.full((len(sequences), max_length),
                               inverse_vocabulary[padding_symbol],
                               dtype=format_dtype)
-    for i, vector in enumerate(unit_vectors):
-        limit = min(vector.shape[0], max_length)
-        if padding == 'right':
-            sequence_matrix[i, :limit] = vector[:limit]
-        else:  # if padding == 'left
-            sequence_matrix[i, max_length - limit:] = vector[:limit]
+
+    # all units are mapped at once and scattered into the matrix,
+    # row i holding the first min(lengths[i], max_length) units
+    unit_ids = units_to_ids(
+        chain.from_iterable(unit_sequences),
+        inverse_vocabulary,
+        count=lengths.sum()
+    )
+    rows = np.repeat(np.arange(len(unit_sequences)), lengths)
+    positions = np.arange(len(unit_ids)) - np.repeat(
+        np.cumsum(lengths) - lengths,
+        lengths
+    )
+    kept = positions < max_length
+    rows = rows[kept]
+    positions = positions[kept]
+    if padding == 'left':
+        positions += max_length - np.minimum(lengths, max_length)[rows]
+    sequence_matrix[rows, positions] = unit_ids[kept].astype(format_dtype)
     return sequence_matrix
 
 
+def get_sequence_lengths(sequence_matrix, padding_id=0):
+    """Counts the units of each row of a sequence matrix that are not padding,
+    stored along with the matrix so that batchers don't need to recompute it.
+    """
+    return np.count_nonzero(
+        sequence_matrix != padding_id,
+        axis=1
+    ).astype(int_type(sequence_matrix.shape[1] + 1))
+
+
+class VocabularyTable(object):
+    """Vocabulary backed by arrays instead of a dictionary, that looks up
+    all the units of a batch at once with a binary search. It is built from
+    idx2str alone, and pickles to a couple of arrays, so it is cheap to
+    build, to save and to send to other processes.
+    """
+
+    def __init__(self, idx2str, unknown_symbol=UNKNOWN_SYMBOL):
+        units = np.array(idx2str, dtype=np.str_)
+        self.ids = np.argsort(units, kind='mergesort')
+        self.sorted_units = units[self.ids]
+        if unknown_symbol in idx2str:
+            self.unknown_id = idx2str.index(unknown_symbol)
+        else:
+            self.unknown_id = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, unit):
+        position = np.searchsorted(self.sorted_units, unit)
+        if (position == len(self.ids) or
+                self.sorted_units[position] != unit):
+            raise KeyError(unit)
+        return int(self.ids[position])
+
+    def lookup(self, units):
+        """Returns the ids of a list of units, the one of the unknown symbol
+        for units that are not in the vocabulary, or -1 if it has none.
+        """
+        units = np.array(units, dtype=np.str_)
+        if len(self.ids) == 0:
+            return np.full(len(units), -1, dtype=np.int64)
+        positions = np.minimum(
+            np.searchsorted(self.sorted_units, units),
+            len(self.ids) - 1
+        )
+        found = self.sorted_units[positions] == units
+        return np.where(
+            found,
+            self.ids[positions],
+            -1 if self.unknown_id is None else self.unknown_id
+        ).astype(np.int64)
+
+
+def units_to_ids(units, unit_to_id, count=-1):
+    """Maps an iterable of units to an array of their ids, looking them up
+    without a Python level loop. Units that are not in the vocabulary are
+    mapped to the id of the unknown symbol.
+    :param unit_to_id: dictionary from unit to id or VocabularyTable
+    """
+    if isinstance(unit_to_id, VocabularyTable):
+        return unit_to_id.lookup(list(units))
+
+    unit_ids = np.fromiter(
+        map(unit_to_id.get, units, repeat(-1)),
+        dtype=np.int64,
+        count=count
+    )
+    unknown = unit_ids == -1
+    if unknown.any():
+        unit_ids[unknown] = unit_to_id[UNKNOWN_SYMBOL]
+    return unit_ids
+
+
+def idx2str_to_array(idx2str):
+    """Returns idx2str as an object array, so that ids can be mapped to
+    their units with np.take and the units are still Python strings.
+    """
+    units = np.empty(len(idx2str), dtype=object)
+    units[:] = idx2str
+    return units
+
+
+def ids_to_units(ids, idx2str):
+    """Maps an array of ids of any shape to nested lists of their units."""
+    return np.take(idx2str_to_array(idx2str), ids).tolist()
+
+
+def sequences_to_units(sequences, idx2str):
+    """Maps sequences of ids to lists of their units. Sequences of
+    different lengths, in an object array of lists, are mapped with a
+    single np.take on all their ids and split back afterwards.
+    """
+    if isinstance(sequences, np.ndarray) and not sequences.dtype.hasobject:
+        return ids_to_units(sequences, idx2str)
+    if len(sequences) == 0:
+        return []
+    lengths = [len(sequence) for sequence in sequences]
+    units = np.take(
+        idx2str_to_array(idx2str),
+        np.fromiter(
+            chain.from_iterable(sequences),
+            dtype=np.int64,
+            count=sum(lengths)
+        )
+    )
+    return [
+        sequence_units.tolist()
+        for sequence_units in np.split(units, np.cumsum(lengths)[:-1])
+    ]
+
+
 def ids_array_to_string(matrix, idx2str):
     texts = []
     for row in matrix:
@@ -190,7 +411,7 @@ def space_string_to_list(s):
 
 
 def space_punctuation_string_to_list(s):
-    return SPLIT_PUNCTUATION_REGEX.split(s.strip())
+    return SPLIT_PUNCTUATION_REGEX.findall(s.strip())
 
 def underscore_string_to_list(s):
     return UNDERSCORE_REGEX.split(s.strip())
@@ -245,6 +466,40 @@ def characters_to_list(s):
     return s
 
 
+def english_tokenize_batch(texts, format, batch_size=1000):
+    return process_texts(
+        texts,
+        load_nlp_pipeline(),
+        batch_size=batch_size,
+        **english_format_parameters[format]
+    )
+
+
+english_format_parameters = {
+    'english_tokenize': {},
+    'english_tokenize_filter': {
+        'filter_numbers': True,
+        'filter_punctuation': True,
+        'filter_short_tokens': True
+    },
+    'english_tokenize_remove_stopwords': {
+        'filter_stopwords': True
+    },
+    'english_lemmatize': {
+        'return_lemma': True
+    },
+    'english_lemmatize_filter': {
+        'return_lemma': True,
+        'filter_numbers': True,
+        'filter_punctuation': True,
+        'filter_short_tokens': True
+    },
+    'english_lemmatize_remove_stopwords': {
+        'return_lemma': True,
+        'filter_stopwords': True
+    }
+}
+
 format_registry = {
     'json': json_string_to_list,
     'space': space_string_to_list,
@@ -261,20 +516,3 @@ format_registry = {
     'english_lemmatize_remove_stopwords': english_lemmatize_remove_stopwords,
     'characters': characters_to_list
 }
-
-format_dtype_registry = {
-    'json': np.int32,
-    'space': np.int32,
-    'space_punct': np.int32,
-    'underscore': np.int32,
-    'comma': np.int32,
-    'untokenized': np.int32,
-    'stripped': np.int32,
-    'english_tokenize': np.int32,
-    'english_tokenize_filter': np.int32,
-    'english_tokenize_remove_stopwords': np.int32,
-    'english_lemmatize': np.int32,
-    'english_lemmatize_filter': np.int32,
-    'english_lemmatize_remove_stopwords': np.int32,
-    'characters': np.int8
-}
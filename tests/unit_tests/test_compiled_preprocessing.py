@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from ludwig.constants import *
+from ludwig.data.compiled_preprocessing import compile_feature_encoders
+from ludwig.data.compiled_preprocessing import encode_columns
+from ludwig.data.compiled_preprocessing import encode_records
+from ludwig.data.compiled_preprocessing import load_feature_encoders
+from ludwig.data.compiled_preprocessing import save_feature_encoders
+from ludwig.data.preprocessing import build_data
+from ludwig.data.preprocessing import build_metadata
+from ludwig.utils.data_utils import text_feature_data_field
+from ludwig.utils.defaults import default_preprocessing_parameters
+from ludwig.utils.misc import merge_dict
+
+features = [
+    {'name': 'binary', 'type': BINARY},
+    {'name': 'numerical', 'type': NUMERICAL},
+    {'name': 'numerical_mode', 'type': NUMERICAL,
+     'preprocessing': {'missing_value_strategy': FILL_WITH_MODE}},
+    {'name': 'numerical_bfill', 'type': NUMERICAL,
+     'preprocessing': {'missing_value_strategy': 'bfill'}},
+    {'name': 'category', 'type': CATEGORY},
+    {'name': 'set', 'type': SET},
+    {'name': 'bag', 'type': BAG},
+    {'name': 'sequence', 'type': SEQUENCE},
+    {'name': 'sequence_left', 'type': SEQUENCE,
+     'preprocessing': {'padding': 'left'}},
+    {'name': 'text', 'type': TEXT, 'level': 'word'},
+    {'name': 'text_char', 'type': TEXT, 'level': 'char'},
+    {'name': 'timeseries', 'type': TIMESERIES},
+    {'name': 'timeseries_left', 'type': TIMESERIES,
+     'preprocessing': {'padding': 'left'}},
+]
+
+train_rows = {
+    'binary': [True, False, True, False],
+    'numerical': [1.5, 2.0, -3.0, 4.25],
+    'numerical_mode': [1.0, 2.0, 2.0, 3.0],
+    'numerical_bfill': [1.0, 2.0, 3.0, 4.0],
+    'category': ['a', 'b', 'b', 'c'],
+    'set': ['a b', 'b c', 'c', 'a'],
+    'bag': ['a a b', 'b', 'c c c', 'a'],
+    'sequence': ['a b c', 'b c', 'a', 'c a'],
+    'sequence_left': ['a b c', 'b c', 'a', 'c a'],
+    'text': ['hello world', 'hello there', 'world', 'there hello'],
+    'text_char': ['hello world', 'hello there', 'world', 'there hello'],
+    'timeseries': ['1 2 3', '4 5', '6', '7 8'],
+    'timeseries_left': ['1 2 3', '4 5', '6', '7 8'],
+}
+
+# missing values, units that are not in the vocabulary, empty rows and
+# sequences longer than the longest training sequence, except for timeseries
+# that have no missing values or empty rows
+test_rows = {
+    'binary': [True, None, False, True, None],
+    'numerical': [None, 2.5, 7.0, None, 1.0],
+    'numerical_mode': [None, 4.0, 4.0, 1.0, None],
+    'numerical_bfill': [None, 2.0, None, None, 5.0],
+    'category': ['a', None, 'zzz', 'c', 'b'],
+    'set': ['a zzz', None, '', 'a b c', 'c'],
+    'bag': ['a a zzz zzz', None, '', 'b b c', 'c'],
+    'sequence': ['a zzz c', None, '', 'a b c a b c', 'c'],
+    'sequence_left': ['a zzz c', None, '', 'a b c a b c', 'c'],
+    'text': ['hello unknown', None, '', 'hello world hello there', 'world'],
+    'text_char': ['hello xyz', None, '', 'hello world hello there', 'w'],
+    # the missing value fill of timeseries, an empty string, does not parse
+    'timeseries': ['1 2', '3', '2 2', '1 2 3 4 5 6', '9'],
+    'timeseries_left': ['1 2', '3', '2 2', '1 2 3 4 5 6', '9'],
+}
+
+
+def get_field(feature):
+    if feature['type'] == TEXT:
+        return text_feature_data_field(feature)
+    return feature['name']
+
+
+def to_array(value):
+    if sparse.issparse(value):
+        return value.toarray()
+    return np.asarray(value)
+
+
+@pytest.fixture(scope='module')
+def preprocessed():
+    preprocessing_parameters = merge_dict(
+        default_preprocessing_parameters,
+        {'num_processes': 1}
+    )
+    train_set_metadata = build_metadata(
+        pd.DataFrame(train_rows),
+        features,
+        preprocessing_parameters
+    )
+    data = build_data(
+        pd.DataFrame(test_rows),
+        features,
+        train_set_metadata,
+        preprocessing_parameters
+    )
+    feature_encoders = compile_feature_encoders(
+        features,
+        train_set_metadata,
+        preprocessing_parameters
+    )
+    return data, feature_encoders
+
+
+@pytest.mark.parametrize(
+    'feature',
+    features,
+    ids=[feature['name'] for feature in features]
+)
+def test_encode_columns_matches_build_data(preprocessed, feature):
+    data, feature_encoders = preprocessed
+    encoded = encode_columns(feature_encoders, test_rows)
+
+    expected = to_array(data[get_field(feature)])
+    actual = encoded[feature['name']]
+    assert isinstance(actual, np.ndarray)
+    assert actual.dtype == expected.dtype
+    assert actual.shape == expected.shape
+    assert np.array_equal(actual, expected)
+
+
+def test_encode_records_matches_encode_columns(preprocessed):
+    _, feature_encoders = preprocessed
+    records = [
+        {name: column[i] for name, column in test_rows.items()}
+        for i in range(len(test_rows['binary']))
+    ]
+    by_columns = encode_columns(feature_encoders, test_rows)
+    by_records = encode_records(feature_encoders, records)
+    assert set(by_columns) == set(by_records)
+    for name in by_columns:
+        assert by_records[name].dtype == by_columns[name].dtype
+        assert np.array_equal(by_records[name], by_columns[name])
+
+
+def test_pickled_encoders_encode_the_same(preprocessed):
+    _, feature_encoders = preprocessed
+    unpickled = pickle.loads(pickle.dumps(feature_encoders))
+    encoded = encode_columns(feature_encoders, test_rows)
+    for name, value in encode_columns(unpickled, test_rows).items():
+        assert value.dtype == encoded[name].dtype
+        assert np.array_equal(value, encoded[name])
+
+
+def test_load_feature_encoders_falls_back(preprocessed, tmpdir):
+    _, feature_encoders = preprocessed
+    feature_encoders_fp = str(tmpdir.join('feature_encoders.pkl'))
+    save_feature_encoders(feature_encoders_fp, feature_encoders)
+    loaded = load_feature_encoders(feature_encoders_fp)
+    assert [encoder.name for encoder in loaded] == [
+        encoder.name for encoder in feature_encoders
+    ]
+
+    # encoders pickled without a version, or by another version
+    with open(feature_encoders_fp, 'wb') as f:
+        pickle.dump(feature_encoders, f)
+    assert load_feature_encoders(feature_encoders_fp) is None
+    with open(feature_encoders_fp, 'wb') as f:
+        pickle.dump(
+            {'ludwig_version': '0.0.0', 'feature_encoders': feature_encoders},
+            f
+        )
+    assert load_feature_encoders(feature_encoders_fp) is None
+
+    # corrupt file
+    with open(feature_encoders_fp, 'wb') as f:
+        f.write(b'not a pickle')
+    assert load_feature_encoders(feature_encoders_fp) is None
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from ludwig.constants import *
+from ludwig.data.preprocessing import build_dataset_df
+from ludwig.data.preprocessing import load_data
+from ludwig.utils.data_utils import save_hdf5
+from ludwig.utils.data_utils import shuffle_dict_unison_inplace
+
+input_features = [
+    {'name': 'set', 'type': SET},
+    {'name': 'bag', 'type': BAG},
+]
+output_features = [
+    {'name': 'row', 'type': NUMERICAL},
+]
+
+
+def test_shuffle_dict_with_sparse_values():
+    dataset = {
+        'dense': np.arange(10),
+        'sparse': sparse.csr_matrix(np.eye(10, dtype=np.float32)),
+    }
+    shuffled = shuffle_dict_unison_inplace(
+        dataset,
+        np.random.RandomState(1)
+    )
+    assert sparse.issparse(shuffled['sparse'])
+    assert shuffled['sparse'].shape == (10, 10)
+    # rows are moved together with the dense values
+    assert np.array_equal(
+        shuffled['sparse'].toarray().argmax(axis=1),
+        shuffled['dense']
+    )
+
+
+def test_load_shuffled_set_and_bag_features(tmpdir):
+    random_state = np.random.RandomState(42)
+    units = ['a', 'b', 'c', 'd', 'e']
+    num_rows = 100
+    dataset_df = pd.DataFrame({
+        'set': [' '.join(random_state.choice(units, 2, replace=False))
+                for _ in range(num_rows)],
+        'bag': [' '.join(random_state.choice(units, 4))
+                for _ in range(num_rows)],
+        'row': np.arange(num_rows, dtype=np.float32),
+    })
+    data, train_set_metadata = build_dataset_df(
+        dataset_df,
+        input_features + output_features,
+        {'num_processes': 1}
+    )
+    expected = {
+        'set': sparse.csr_matrix(data['set']).toarray(),
+        'bag': sparse.csr_matrix(data['bag']).toarray(),
+    }
+    expected_training_rows = np.flatnonzero(data['split'] == 0)
+
+    data_hdf5_fp = str(tmpdir.join('data.hdf5'))
+    save_hdf5(data_hdf5_fp, data, train_set_metadata)
+    training_set, _, _ = load_data(
+        data_hdf5_fp,
+        input_features,
+        output_features,
+        shuffle_training=True
+    )
+
+    rows = training_set['row'].astype(np.int64)
+    assert np.array_equal(np.sort(rows), expected_training_rows)
+    assert not np.array_equal(rows, expected_training_rows)
+    for name in ('set', 'bag'):
+        assert sparse.issparse(training_set[name])
+        assert np.array_equal(
+            training_set[name].toarray(),
+            expected[name][rows]
+        )
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import numpy as np
+import pytest
+
+from ludwig.data.dataset import Dataset
+from ludwig.data.preprocessing import get_partition_rows
+from ludwig.utils.batcher import Batcher
+from ludwig.utils.batcher import DistributedBatcher
+from ludwig.utils.batcher import DistributedSampler
+
+
+class FakeHorovod(object):
+    def __init__(self, size):
+        self._size = size
+
+    def size(self):
+        return self._size
+
+
+def get_shards(size, num_shards, epoch=0, **kwargs):
+    return [
+        DistributedSampler(
+            size,
+            num_shards=num_shards,
+            shard_index=shard_index,
+            **kwargs
+        ).get_indices(epoch)
+        for shard_index in range(num_shards)
+    ]
+
+
+def build_dataset(size):
+    return Dataset(
+        {'x': np.arange(size), 'y': np.arange(size) * 2},
+        [{'name': 'x', 'type': 'numerical'}],
+        [{'name': 'y', 'type': 'numerical'}],
+        None
+    )
+
+
+def read_epoch(batcher):
+    rows = []
+    while not batcher.last_batch():
+        batch = batcher.next_batch()
+        assert np.array_equal(batch['y'], batch['x'] * 2)
+        rows.append(batch['x'])
+    batcher.reset()
+    return np.concatenate(rows)
+
+
+@pytest.mark.parametrize('size', [1, 7, 12, 13, 100])
+@pytest.mark.parametrize('num_shards', [1, 2, 3, 4])
+@pytest.mark.parametrize('drop_remainder', [False, True])
+@pytest.mark.parametrize('interleaved', [False, True])
+def test_equal_shards(size, num_shards, drop_remainder, interleaved):
+    shards = get_shards(
+        size,
+        num_shards,
+        drop_remainder=drop_remainder,
+        interleaved=interleaved
+    )
+    expected_size = (size // num_shards if drop_remainder
+                     else -(-size // num_shards))
+    for shard_index, shard in enumerate(shards):
+        assert len(shard) == expected_size
+        assert len(DistributedSampler(
+            size,
+            num_shards=num_shards,
+            shard_index=shard_index,
+            drop_remainder=drop_remainder
+        )) == expected_size
+
+    rows = np.concatenate(shards)
+    if drop_remainder:
+        # shards do not overlap and only the remainder is left out
+        assert len(np.unique(rows)) == len(rows)
+        assert len(rows) == size - size % num_shards
+    else:
+        # every row is read, the remainder is made up by repeating rows
+        assert np.array_equal(np.unique(rows), np.arange(size))
+        assert len(rows) - size < num_shards
+
+
+@pytest.mark.parametrize('size', [1, 7, 12, 13, 100])
+@pytest.mark.parametrize('num_shards', [1, 2, 3, 4])
+@pytest.mark.parametrize('should_shuffle', [False, True])
+def test_evaluation_shards_read_rows_once(size, num_shards, should_shuffle):
+    shards = get_shards(
+        size,
+        num_shards,
+        should_shuffle=should_shuffle,
+        equal_shards=False
+    )
+    rows = np.concatenate(shards)
+    assert len(rows) == size
+    assert np.array_equal(np.sort(rows), np.arange(size))
+    if not should_shuffle:
+        # concatenating the shards in order of rank preserves the order
+        assert np.array_equal(rows, np.arange(size))
+
+
+@pytest.mark.parametrize('block_size', [None, 4])
+def test_same_permutation_for_same_seed_and_epoch(block_size):
+    def get_indices(random_seed, epoch):
+        return DistributedSampler(
+            50,
+            num_shards=2,
+            shard_index=1,
+            random_seed=random_seed,
+            block_size=block_size
+        ).get_indices(epoch)
+
+    assert np.array_equal(get_indices(42, 3), get_indices(42, 3))
+    assert not np.array_equal(get_indices(42, 3), get_indices(42, 4))
+    assert not np.array_equal(get_indices(42, 3), get_indices(43, 3))
+
+
+@pytest.mark.parametrize('num_partitions', [1, 2, 3, 4])
+def test_partition_rows(num_partitions):
+    split = np.array([0] * 23 + [1] * 7 + [2] * 10)
+    np.random.RandomState(1).shuffle(split)
+    partitions = [
+        get_partition_rows(split, (partition_index, num_partitions))
+        for partition_index in range(num_partitions)
+    ]
+    # every worker computes the same partitions
+    for partition_index, partition in enumerate(partitions):
+        assert np.array_equal(
+            partition,
+            get_partition_rows(split, (partition_index, num_partitions))
+        )
+
+    # training rows are dealt in partitions of the same size covering them
+    train_partitions = [partition[split[partition] == 0]
+                        for partition in partitions]
+    train_rows = np.concatenate(train_partitions)
+    assert len(set(len(rows) for rows in train_partitions)) == 1
+    assert np.array_equal(np.unique(train_rows), np.flatnonzero(split == 0))
+
+    # the other splits are read exactly once, in order of partition
+    for split_value in (1, 2):
+        rows = np.concatenate([partition[split[partition] == split_value]
+                               for partition in partitions])
+        assert np.array_equal(rows, np.flatnonzero(split == split_value))
+
+
+@pytest.mark.parametrize('batch_size', [4, 7, 50])
+@pytest.mark.parametrize('should_shuffle', [False, True])
+def test_batcher_epochs(batch_size, should_shuffle):
+    np.random.seed(42)
+    size = 30
+    batcher = Batcher(
+        build_dataset(size),
+        batch_size=batch_size,
+        should_shuffle=should_shuffle
+    )
+    epochs = [read_epoch(batcher) for _ in range(2)]
+    for rows in epochs:
+        assert np.array_equal(np.sort(rows), np.arange(size))
+    if should_shuffle:
+        assert not np.array_equal(epochs[0], epochs[1])
+    else:
+        assert np.array_equal(epochs[0], np.arange(size))
+        assert np.array_equal(epochs[1], np.arange(size))
+
+
+@pytest.mark.parametrize('num_workers', [1, 2, 3])
+def test_distributed_batcher_epochs(num_workers):
+    size = 31
+    epochs = []
+    batchers = [
+        DistributedBatcher(
+            build_dataset(size),
+            partition_number,
+            FakeHorovod(num_workers),
+            batch_size=4
+        )
+        for partition_number in range(num_workers)
+    ]
+    for _ in range(2):
+        shards = [read_epoch(batcher) for batcher in batchers]
+        assert len(set(len(rows) for rows in shards)) == 1
+        rows = np.concatenate(shards)
+        assert np.array_equal(np.unique(rows), np.arange(size))
+        epochs.append(rows)
+    assert not np.array_equal(epochs[0], epochs[1])
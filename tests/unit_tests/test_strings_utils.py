@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2019 Uber Technologies, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+import numpy as np
+import pytest
+
+from ludwig.utils.math_utils import int_type
+from ludwig.utils.strings_utils import PADDING_SYMBOL
+from ludwig.utils.strings_utils import UNKNOWN_SYMBOL
+from ludwig.utils.strings_utils import VocabularyTable
+from ludwig.utils.strings_utils import build_sequence_matrix
+from ludwig.utils.strings_utils import clear_tokenization_cache
+from ludwig.utils.strings_utils import get_sequence_vector
+
+idx2str = [PADDING_SYMBOL, UNKNOWN_SYMBOL, 'a', 'b', 'c', 'd']
+str2idx = {unit: i for i, unit in enumerate(idx2str)}
+
+# empty rows, units that are not in the vocabulary, upper case units
+# and sequences shorter, as long as and longer than the length limit
+sequences = [
+    'a b c',
+    '',
+    'a zzz b yyy',
+    'D c B a',
+    'a b c d a b c d',
+    'd',
+    'zzz',
+    'c c c c',
+]
+
+
+def build_sequence_matrix_per_row(sequences, inverse_vocabulary, format,
+                                  length_limit, padding_symbol,
+                                  padding='right', lowercase=True):
+    sequence_matrix = np.full(
+        (len(sequences), length_limit),
+        inverse_vocabulary[padding_symbol],
+        dtype=int_type(len(inverse_vocabulary))
+    )
+    for i, sequence in enumerate(sequences):
+        vector = get_sequence_vector(
+            sequence,
+            format,
+            inverse_vocabulary,
+            lowercase=lowercase
+        )
+        limit = min(vector.shape[0], length_limit)
+        if padding == 'right':
+            sequence_matrix[i, :limit] = vector[:limit]
+        else:
+            sequence_matrix[i, length_limit - limit:] = vector[:limit]
+    return sequence_matrix
+
+
+@pytest.mark.parametrize('padding', ['right', 'left'])
+@pytest.mark.parametrize('length_limit', [1, 3, 4, 10])
+@pytest.mark.parametrize('lowercase', [True, False])
+@pytest.mark.parametrize('vocabulary', ['dict', 'table'])
+def test_build_sequence_matrix(padding, length_limit, lowercase, vocabulary):
+    clear_tokenization_cache()
+    if vocabulary == 'dict':
+        inverse_vocabulary = str2idx
+    else:
+        inverse_vocabulary = VocabularyTable(idx2str)
+    expected = build_sequence_matrix_per_row(
+        sequences,
+        str2idx,
+        'space',
+        length_limit,
+        PADDING_SYMBOL,
+        padding=padding,
+        lowercase=lowercase
+    )
+    actual = build_sequence_matrix(
+        sequences,
+        inverse_vocabulary,
+        'space',
+        length_limit,
+        PADDING_SYMBOL,
+        padding=padding,
+        lowercase=lowercase
+    )
+    assert actual.dtype == expected.dtype
+    assert actual.shape == (len(sequences), length_limit)
+    assert np.array_equal(actual, expected)
+
+
+@pytest.mark.parametrize('padding', ['right', 'left'])
+def test_build_sequence_matrix_of_empty_rows(padding):
+    clear_tokenization_cache()
+    actual = build_sequence_matrix(
+        ['', '', ''],
+        str2idx,
+        'space',
+        3,
+        PADDING_SYMBOL,
+        padding=padding
+    )
+    # an empty string is split into a single empty unit,
+    # which is not in the vocabulary
+    expected = np.full((3, 3), str2idx[PADDING_SYMBOL])
+    if padding == 'right':
+        expected[:, 0] = str2idx[UNKNOWN_SYMBOL]
+    else:
+        expected[:, -1] = str2idx[UNKNOWN_SYMBOL]
+    assert np.array_equal(actual, expected)
+
+    actual = build_sequence_matrix(
+        [],
+        str2idx,
+        'space',
+        3,
+        PADDING_SYMBOL,
+        padding=padding
+    )
+    assert actual.shape == (0, 3)
+
+
+def test_build_sequence_matrix_characters():
+    clear_tokenization_cache()
+    char_str2idx = {PADDING_SYMBOL: 0, UNKNOWN_SYMBOL: 1, 'a': 2, 'b': 3}
+    for padding in ('right', 'left'):
+        expected = build_sequence_matrix_per_row(
+            ['ab', 'bxa', '', 'abababab'],
+            char_str2idx,
+            'characters',
+            5,
+            PADDING_SYMBOL,
+            padding=padding
+        )
+        actual = build_sequence_matrix(
+            ['ab', 'bxa', '', 'abababab'],
+            char_str2idx,
+            'characters',
+            5,
+            PADDING_SYMBOL,
+            padding=padding
+        )
+        assert actual.dtype == expected.dtype
+        assert np.array_equal(actual, expected)